@@ -0,0 +1,491 @@
+"""
+Cross-session crop analytics.
+A background job ingests new result rows from the local results DB and/or the
+Azure results blobs, and keeps per-language confusion matrices (prompted crop
+vs. recognized crop) and daily per-crop accuracy as NumPy count arrays.
+
+The arrays and ingest cursors are saved together as one snapshot. Under
+gunicorn only one worker at a time ingests (the one holding the snapshot's
+file lock); the others reload the snapshot it saves, and requests are always
+answered from the current snapshot rather than waiting for an ingest.
+"""
+
+import os
+import io
+import json
+import time
+import logging
+import itertools
+import threading
+from contextlib import contextmanager
+from typing import Iterable, Optional
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: saves are still atomic, but every process ingests on its own
+    fcntl = None
+
+from fuzzy_match import score_transcript
+from keyword_matcher import get_language_matcher
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Column for attempts where no crop was recognized at all
+NO_MATCH_LABEL = '(none)'
+
+# Local result rows ingested (and checkpointed in the cursor) per batch
+LOCAL_BATCH_SIZE = 500
+
+
+class LanguageAnalytics:
+    """
+    Count arrays for one language.
+
+    confusion[i, j] counts attempts prompted with labels[i] that were recognized
+    as labels[j]; correct[d, i] and total[d, i] count attempts per day and crop.
+    Arrays grow geometrically as new crops and days appear.
+    """
+
+    def __init__(self):
+        self.labels = [NO_MATCH_LABEL]
+        self.label_index = {NO_MATCH_LABEL: 0}
+        self.days = []
+        self.day_index = {}
+        self.confusion = np.zeros((8, 8), dtype=np.int32)
+        self.correct = np.zeros((8, 8), dtype=np.int32)
+        self.total = np.zeros((8, 8), dtype=np.int32)
+
+    @staticmethod
+    def _grow(array, rows: int, columns: int):
+        if rows <= array.shape[0] and columns <= array.shape[1]:
+            return array
+        grown = np.zeros((max(rows, array.shape[0] * 2), max(columns, array.shape[1] * 2)), dtype=array.dtype)
+        grown[:array.shape[0], :array.shape[1]] = array
+        return grown
+
+    def _label(self, crop_name: str) -> int:
+        index = self.label_index.get(crop_name)
+        if index is None:
+            index = self.label_index[crop_name] = len(self.labels)
+            self.labels.append(crop_name)
+            size = len(self.labels)
+            self.confusion = self._grow(self.confusion, size, size)
+            self.correct = self._grow(self.correct, self.correct.shape[0], size)
+            self.total = self._grow(self.total, self.total.shape[0], size)
+        return index
+
+    def _day(self, day: str) -> int:
+        index = self.day_index.get(day)
+        if index is None:
+            index = self.day_index[day] = len(self.days)
+            self.days.append(day)
+            self.correct = self._grow(self.correct, len(self.days), self.correct.shape[1])
+            self.total = self._grow(self.total, len(self.days), self.total.shape[1])
+        return index
+
+    def add(self, crop_name: str, recognized: str, detected: bool, day: str):
+        prompted = self._label(crop_name)
+        self.confusion[prompted, self._label(recognized)] += 1
+        day_row = self._day(day)
+        self.total[day_row, prompted] += 1
+        self.correct[day_row, prompted] += int(detected)
+
+    def to_arrays(self) -> dict:
+        """Trimmed arrays for saving"""
+        size, days = len(self.labels), len(self.days)
+        return {
+            'confusion': self.confusion[:size, :size],
+            'correct': self.correct[:days, :size],
+            'total': self.total[:days, :size]
+        }
+
+    @classmethod
+    def from_arrays(cls, labels: list, days: list, arrays: dict) -> 'LanguageAnalytics':
+        stats = cls()
+        stats.labels = list(labels)
+        stats.label_index = {label: index for index, label in enumerate(stats.labels)}
+        stats.days = list(days)
+        stats.day_index = {day: index for index, day in enumerate(stats.days)}
+        stats.confusion = stats._grow(arrays['confusion'].astype(np.int32), len(labels), len(labels))
+        stats.correct = stats._grow(arrays['correct'].astype(np.int32), len(days), len(labels))
+        stats.total = stats._grow(arrays['total'].astype(np.int32), len(days), len(labels))
+        return stats
+
+    def report(self, top: int = 25) -> dict:
+        """
+        Summarize for display.
+
+        Returns:
+            dict: crops (per-crop accuracy, worst first), confusions (largest
+                off-diagonal cells), timeline (daily accuracy) and the raw matrix
+        """
+        size, days = len(self.labels), len(self.days)
+        confusion = self.confusion[:size, :size]
+        correct = self.correct[:days, :size].sum(axis=0)
+        total = self.total[:days, :size].sum(axis=0)
+
+        crops = []
+        for index in np.flatnonzero(total):
+            row = confusion[index].copy()
+            row[index] = 0
+            crops.append({
+                'crop_name': self.labels[index],
+                'correct': int(correct[index]),
+                'total': int(total[index]),
+                'accuracy': round(float(correct[index]) / float(total[index]), 4),
+                'top_confusion': self.labels[int(row.argmax())] if row.any() else None
+            })
+        crops.sort(key=lambda crop: (crop['accuracy'], -crop['total']))
+
+        off_diagonal = confusion.copy()
+        np.fill_diagonal(off_diagonal, 0)
+        flat = np.argsort(off_diagonal, axis=None)[::-1][:top]
+        confusions = []
+        for prompted, recognized in zip(*np.unravel_index(flat, off_diagonal.shape)):
+            count = int(off_diagonal[prompted, recognized])
+            if not count:
+                break
+            confusions.append({
+                'crop_name': self.labels[prompted],
+                'recognized_as': self.labels[recognized],
+                'count': count,
+                'share': round(count / float(confusion[prompted].sum()), 4)
+            })
+
+        day_correct = self.correct[:days, :size].sum(axis=1)
+        day_total = self.total[:days, :size].sum(axis=1)
+        order = sorted(range(days), key=lambda index: self.days[index])
+        timeline = [{
+            'day': self.days[index],
+            'correct': int(day_correct[index]),
+            'total': int(day_total[index]),
+            'accuracy': round(float(day_correct[index]) / float(day_total[index]), 4) if day_total[index] else None
+        } for index in order]
+
+        return {
+            'attempts': int(total.sum()),
+            'crops': crops,
+            'confusions': confusions,
+            'timeline': timeline,
+            'labels': self.labels,
+            'matrix': confusion.tolist()
+        }
+
+
+def recognized_crop(crop_name: str, transcript: str, detected: bool, language: str) -> str:
+    """
+    The crop an attempt was heard as: the prompted crop on a hit, otherwise
+    another vocabulary crop found verbatim, otherwise the fuzzy confusion candidate.
+    """
+    if detected:
+        return crop_name
+    if not transcript:
+        return NO_MATCH_LABEL
+    matcher = get_language_matcher(language)
+    if matcher is not None:
+        for match in matcher.find_all(transcript):
+            if match.crop_name != crop_name:
+                return match.crop_name
+    return score_transcript(transcript, crop_name, language)['confusion_candidate'] or NO_MATCH_LABEL
+
+
+class CropAnalytics:
+    """
+    Incrementally maintained analytics over every ingested attempt.
+
+    Rows are ingested in batches, and each source's cursor advances only after
+    its batch has been counted, so a refresh that fails part way neither skips
+    nor double-counts rows. Refreshes take an exclusive, non-blocking lock on
+    the state file: the process that gets it continues from the saved cursors
+    and saves a new snapshot, the others reload that snapshot when it changes.
+
+    Args:
+        state_path (str): .npz file holding the arrays and ingest cursors
+        sources (tuple): 'local' (results DB) and/or 'azure' (results blobs).
+            Both hold the same attempts for this deployment, so enable Azure
+            only to pull in results written by other instances
+        refresh_interval (float): Seconds between ingest runs
+    """
+
+    def __init__(self, state_path: str, sources: tuple = ('local',), refresh_interval: float = 300.0):
+        self.state_path = state_path
+        self.sources = sources
+        self.refresh_interval = refresh_interval
+
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._languages = {}
+        self._cursors = {'local_attempt_id': 0, 'azure_blobs': {}}
+        self._reports = {}
+        # mtime of the snapshot the in-memory state came from
+        self._state_mtime = None
+        self.version = 0
+        self._metrics = {
+            'ingested': 0,
+            'refreshes': 0,
+            'reloads': 0,
+            'failed_refreshes': 0,
+            'last_refresh_seconds': 0.0,
+            'last_refresh_at': None,
+            'last_error': None
+        }
+        self._load()
+
+    def _read_state(self):
+        """(languages, cursors, mtime) from the saved snapshot, or None if there is none"""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        languages = {}
+        with np.load(self.state_path, allow_pickle=False) as saved:
+            meta = json.loads(str(saved['meta']))
+            for language, info in meta['languages'].items():
+                arrays = {name: saved[f'{language}/{name}'] for name in ('confusion', 'correct', 'total')}
+                languages[language] = LanguageAnalytics.from_arrays(info['labels'], info['days'], arrays)
+        return languages, meta['cursors'], mtime
+
+    def _load(self):
+        try:
+            state = self._read_state()
+        except Exception as e:
+            logger.error("Failed to load analytics state from %s, keeping the current state: %s", self.state_path, e)
+            return
+        if state is None:
+            return
+        with self._lock:
+            self._languages, self._cursors, self._state_mtime = state
+        logger.info("Loaded analytics state for %s languages from %s", len(state[0]), self.state_path)
+
+    def _reload_if_changed(self) -> bool:
+        """Load the snapshot if another process has saved a newer one"""
+        try:
+            mtime = os.stat(self.state_path).st_mtime_ns
+        except FileNotFoundError:
+            return False
+        if mtime == self._state_mtime:
+            return False
+        self._load()
+        with self._lock:
+            self.version += 1
+            self._reports.clear()
+            self._metrics['reloads'] += 1
+        return True
+
+    def _sync(self):
+        """Pick up a snapshot another worker saved, unless this process is refreshing itself"""
+        if self._refresh_lock.acquire(blocking=False):
+            try:
+                self._reload_if_changed()
+            finally:
+                self._refresh_lock.release()
+
+    def _save(self):
+        """Write the snapshot; the caller holds the ingest lock"""
+        arrays = {}
+        meta = {'languages': {}, 'cursors': self._cursors}
+        for language, stats in self._languages.items():
+            meta['languages'][language] = {'labels': stats.labels, 'days': stats.days}
+            for name, array in stats.to_arrays().items():
+                arrays[f'{language}/{name}'] = array
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+        temp_path = f"{self.state_path}.{os.getpid()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(buffer.getvalue())
+        os.replace(temp_path, self.state_path)
+        self._state_mtime = os.stat(self.state_path).st_mtime_ns
+
+    @contextmanager
+    def _ingest_lock(self):
+        """Yields True if this process may ingest, False if another process is ingesting"""
+        with open(f"{self.state_path}.lock", 'w') as lock_file:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    yield False
+                    return
+            yield True
+
+    def ingest(self, rows: Iterable[dict]) -> int:
+        """
+        Add result rows (crop_name, transcript, keyword_detected, language, timestamp).
+
+        Rows are matched first and counted together afterwards, so either every
+        row is counted or, if matching fails, none is.
+
+        Returns:
+            int: Rows ingested
+        """
+        prepared = []
+        for row in rows:
+            crop_name = (row.get('crop_name') or '').strip()
+            if not crop_name:
+                continue
+            language = (row.get('language') or 'unknown').lower()
+            transcript = row.get('transcript') or ''
+            detected = bool(row.get('keyword_detected'))
+            recognized = recognized_crop(crop_name, transcript, detected, language)
+            day = (row.get('timestamp') or '')[:10] or 'unknown'
+            prepared.append((language, crop_name, recognized, detected, day))
+        with self._lock:
+            for language, crop_name, recognized, detected, day in prepared:
+                stats = self._languages.get(language)
+                if stats is None:
+                    stats = self._languages[language] = LanguageAnalytics()
+                stats.add(crop_name, recognized, detected, day)
+        return len(prepared)
+
+    def _local_batches(self):
+        from results_store import get_results_store
+
+        # In attempt_id order, so a refresh that fails part way resumes after the last ingested batch
+        rows = get_results_store().iter_attempts(after_id=self._cursors['local_attempt_id'], by_session=False)
+        while True:
+            batch = list(itertools.islice(rows, LOCAL_BATCH_SIZE))
+            if not batch:
+                return
+            yield batch
+            # Reached once ingest has counted the batch and asks for the next one
+            self._cursors['local_attempt_id'] = batch[-1]['attempt_id']
+
+    def _azure_batches(self):
+        from azure_service import iter_new_result_batches
+
+        return iter_new_result_batches(self._cursors['azure_blobs'])
+
+    def refresh(self) -> int:
+        """
+        Ingest everything added since the last refresh and save the snapshot, or,
+        if another process is already ingesting, reload the snapshot it last saved.
+
+        Returns:
+            int: Rows ingested (0 when another process ingests)
+        """
+        with self._refresh_lock, self._ingest_lock() as ingester:
+            if not ingester:
+                self._reload_if_changed()
+                return 0
+            # The previous ingester may have been another worker; continue from its cursors
+            self._reload_if_changed()
+
+            started = time.monotonic()
+            cursors = json.dumps(self._cursors, sort_keys=True)
+            sources = []
+            if 'local' in self.sources:
+                sources.append(self._local_batches)
+            if 'azure' in self.sources and os.environ.get('AZURE_STORAGE_ACCOUNT_KEY'):
+                sources.append(self._azure_batches)
+            ingested = 0
+            try:
+                # Each source advances its cursor when asked for the batch after one ingested here
+                for batches in sources:
+                    for batch in batches():
+                        ingested += self.ingest(batch)
+            except Exception as e:
+                logger.error("Analytics refresh failed: %s", e)
+                with self._lock:
+                    self._metrics['failed_refreshes'] += 1
+                    self._metrics['last_error'] = str(e)
+
+            with self._lock:
+                if ingested:
+                    self.version += 1
+                    self._reports.clear()
+                # Counts and cursors are saved together, whether or not the ingest finished
+                if ingested or json.dumps(self._cursors, sort_keys=True) != cursors:
+                    self._save()
+                elapsed = time.monotonic() - started
+                self._metrics['ingested'] += ingested
+                self._metrics['refreshes'] += 1
+                self._metrics['last_refresh_seconds'] = elapsed
+                self._metrics['last_refresh_at'] = time.time()
+            logger.info("Analytics ingested %s rows in %.1fms", ingested, elapsed * 1000)
+            return ingested
+
+    def request_refresh(self):
+        """Run the background refresh now instead of at the next interval"""
+        self._wake.set()
+
+    def start(self):
+        """Start the background refresh loop"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name='crop-analytics', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.clear()
+            self.refresh()
+            self._wake.wait(self.refresh_interval)
+
+    def languages(self) -> list:
+        self._sync()
+        with self._lock:
+            return sorted(self._languages)
+
+    def report(self, language: str) -> Optional[dict]:
+        """
+        Per-crop accuracy and confusions for a language, cached until new rows arrive.
+
+        Returns:
+            dict: LanguageAnalytics.report() plus language and version, or None
+        """
+        language = language.lower()
+        self._sync()
+        with self._lock:
+            cached = self._reports.get(language)
+            if cached is not None:
+                return cached
+            stats = self._languages.get(language)
+            if stats is None:
+                return None
+            report = dict(stats.report(), language=language, version=self.version)
+            self._reports[language] = report
+            return report
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._metrics, version=self.version, languages=sorted(self._languages),
+                        refreshing=self._refresh_lock.locked(),
+                        local_attempt_id=self._cursors['local_attempt_id'],
+                        azure_blobs=len(self._cursors['azure_blobs']))
+
+
+@process_singleton
+def get_analytics() -> CropAnalytics:
+    """
+    Shared analytics job, with its refresh loop started.
+
+    Configured by ANALYTICS_STATE_PATH, ANALYTICS_SOURCES (comma-separated
+    'local', 'azure') and ANALYTICS_REFRESH_INTERVAL.
+
+    Returns:
+        CropAnalytics: Shared instance
+    """
+    sources = tuple(
+        source.strip() for source in os.environ.get('ANALYTICS_SOURCES', 'local').split(',')
+        if source.strip()
+    )
+    analytics = CropAnalytics(
+        os.environ.get('ANALYTICS_STATE_PATH', 'analytics_state.npz'),
+        sources=sources,
+        refresh_interval=float(os.environ.get('ANALYTICS_REFRESH_INTERVAL', 300))
+    )
+    analytics.start()
+    return analytics
@@ -6,16 +6,21 @@ A web-based platform for testing ASR accuracy with crop names using Azure Blob S
 
 import os
 import json
+import uuid
 import csv
 import tempfile
 import subprocess
 import soundfile as sf
 from datetime import datetime
 from pathlib import Path
-from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, flash, session
+from flask import Flask, Response, abort, render_template, request, jsonify, redirect, url_for, flash, session, stream_with_context
 from werkzeug.utils import secure_filename
 import requests
 import io
+import zipfile
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
 # Import Azure service
 from azure_service import (
@@ -23,6 +28,26 @@ from azure_service import (
     upload_single_test_result,
     recover_session_from_azure
 )
+from asr_client import get_asr_client
+from circuit_breaker import ASRUnavailableError, get_asr_guard
+from session_store import ServerSideSessionInterface, create_session_store
+from transcription_jobs import get_job_queue, QueueFullError
+from batch_transcription import iter_archive_items, iter_upload_items, run_batch
+from result_writer import get_result_writer
+from results_store import get_results_store, performance_bucket
+from keyword_matcher import compile_matcher, get_language_matcher
+from fuzzy_match import score_transcript
+from metrics import aggregate_error_rates, combine_error_rates, score_attempt
+from analytics import get_analytics
+from audio_processing import AudioConversionError, decoder_available, normalize_audio, stats as audio_stats
+from decode_pool import DecoderBusyError, get_decoder
+from vad_chunking import CHUNKING_MIN_SECONDS, transcribe_chunked
+from transcription_cache import cache_key, get_transcription_cache
+from model_comparison import PRIMARY_MODEL, compare_models_from_env, summarize_model_totals, summarize_models, transcribe_models
+from tracing import end_trace, histograms as stage_histograms, span, start_trace
+from structured_logging import configure_logging, log_event, log_payload, stats as logging_stats
+
+configure_logging()
 
 app = Flask(__name__)
 app.secret_key = 'your-secret-key-here'  # Change this in production
@@ -34,6 +59,12 @@ app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 # Force deployment - session storage fix
 
+# Keep session data server-side ('sqlite' or 'redis'); the cookie only carries a signed ID.
+# SESSION_BACKEND=cookie falls back to Flask's signed-cookie sessions.
+SESSION_BACKEND = os.environ.get('SESSION_BACKEND', 'sqlite')
+if SESSION_BACKEND != 'cookie':
+    app.session_interface = ServerSideSessionInterface(create_session_store(SESSION_BACKEND))
+
 # Configuration
 UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'csv'}
@@ -51,11 +82,41 @@ GOOGLE_REDIRECT_URI = 'https://asr-testing-platform.onrender.com/login/authorize
 # Allowed email domains (All Google accounts + Sarvam team)
 ALLOWED_DOMAINS = ['gmail.com', 'googlemail.com', 'google.com', 'sarvam.ai']  # Allow all Google accounts + Sarvam
 
+# Users whose /export_csv and /error_rates cover every QA user's sessions; everyone else sees their own
+ADMIN_EMAILS = {email.strip().lower() for email in os.environ.get('ADMIN_EMAILS', '').split(',') if email.strip()}
+
 # Saaras API Configuration
 API_KEY = os.environ.get('SARVAM_API_KEY')
-SAARAS_API_URL = "http://103.207.148.23/saaras_v2_6/audio/transcriptions"
+SAARAS_API_URL = os.environ.get('SAARAS_API_URL', "http://103.207.148.23/saaras_v2_6/audio/transcriptions")
 model_name = "/models/saaras-raft-wp20-base-v2v-v2-chunk_5-main-bs64/1-gpu"
 
+# Transcription job queue: 'sync' answers after transcription, 'async' returns a job ID
+ASR_JOB_MODE = os.environ.get('ASR_JOB_MODE', 'sync')
+ASR_JOB_MAX_WAIT = 25  # seconds a /job_status long-poll may block
+
+# Maximum concurrent ASR calls per /batch_transcribe request
+ASR_BATCH_WORKERS = int(os.environ.get('ASR_BATCH_WORKERS', 8))
+
+# Background uploads of full-session CSVs triggered by /download_csv
+archive_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='azure-archive')
+
+# Buffer per-attempt Azure uploads in a local journal and flush them in batches
+AZURE_WRITE_BEHIND = os.environ.get('AZURE_WRITE_BEHIND', 'true').lower() == 'true'
+
+# Decode, resample to 16 kHz mono, trim silence and re-encode recordings before upload
+AUDIO_PREPROCESSING = os.environ.get('AUDIO_PREPROCESSING', 'true').lower() == 'true'
+
+# Split recordings longer than ASR_CHUNKING_MIN_SECONDS at pauses and transcribe the pieces concurrently
+ASR_CHUNKING = os.environ.get('ASR_CHUNKING', 'true').lower() == 'true'
+
+# Reuse ASR responses for identical audio/language/model; live QA submissions skip the
+# lookup unless TRANSCRIPTION_CACHE_LIVE is set (or the form sends cache=use)
+TRANSCRIPTION_CACHE = os.environ.get('TRANSCRIPTION_CACHE', 'true').lower() == 'true'
+TRANSCRIPTION_CACHE_LIVE = os.environ.get('TRANSCRIPTION_CACHE_LIVE', 'false').lower() == 'true'
+
+# Extra saarika versions every recording is also sent to, concurrently, for A/B comparison
+ASR_COMPARE_MODELS = compare_models_from_env()
+
 # Language codes for Sarvam API
 BCP47_CODES = {
     "hindi": "hi-IN", 
@@ -69,7 +130,8 @@ BCP47_CODES = {
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def transcribe_audio(audio_data, language, model_name="saarika:v2.5"):
+def transcribe_audio(audio_data, language, model_name="saarika:v2.5", filename='audio.wav', content_type='audio/wav',
+                     use_cache=True):
     """
     Transcribe audio using Sarvam API (direct HTTP request as per API team specs)
     
@@ -77,22 +139,38 @@ def transcribe_audio(audio_data, language, model_name="saarika:v2.5"):
         audio_data (bytes): Raw audio data
         language (str): Language of the audio
         model_name (str): Model version to use (saarika:v2.5, saarika:v2, saarika:v1, saarika:flash)
+        filename (str): Upload filename; its extension tells the API the encoding
+        content_type (str): MIME type of audio_data
+        use_cache (bool): Serve a cached response for the same audio, language and model;
+            when False the API is always called (the response is still cached)
         
     Returns:
         dict: Response containing transcription and metadata
     """
     if not API_KEY:
         raise ValueError("SARVAM_API_KEY environment variable not set")
-        
-        if language not in BCP47_CODES:
-            raise ValueError(f"Unsupported language: {language}. Supported: {list(BCP47_CODES.keys())}")
-        
-        # Get language code
-        language_code = BCP47_CODES[language]
-        
+    
+    if language not in BCP47_CODES:
+        raise ValueError(f"Unsupported language: {language}. Supported: {list(BCP47_CODES.keys())}")
+    
+    # Get language code
+    language_code = BCP47_CODES[language]
+    
+    key = None
+    if TRANSCRIPTION_CACHE:
+        cache = get_transcription_cache()
+        key = cache_key(audio_data, language_code, model_name)
+        if not use_cache:
+            cache.record_bypass()
+        else:
+            with span('transcription_cache', language=language, model=model_name):
+                cached = cache.get(key)
+            if cached is not None:
+                return cached
+    
     # Prepare request data as per API team specifications
     files = {
-        'file': ('audio.wav', audio_data, 'audio/wav')
+        'file': (filename, audio_data, content_type)
     }
     
     data = {
@@ -105,23 +183,29 @@ def transcribe_audio(audio_data, language, model_name="saarika:v2.5"):
     }
     
     try:
-        # Make request to Saaras API
-        response = requests.post(
-            SAARAS_API_URL,
-            files=files,
-            data=data,
-            headers=headers,
-            timeout=30
-        )
+        # Make request to Saaras API over the shared keep-alive pool
+        # Refused up front while the circuit is open or the concurrency limit is full
+        with span('asr_request', language=language, model=model_name):
+            response = get_asr_guard().call(lambda: get_asr_client(SAARAS_API_URL).post(
+                files=files,
+                data=data,
+                headers=headers
+            ))
         
         if response.status_code == 200:
             result = response.json()
-            return {
+            transcription = {
                 'transcript': result.get('transcript', ''),
                 'confidence': result.get('confidence', 0.0),
                 'language': result.get('language', language_code),
                 'model': result.get('model', model_name)
             }
+            if key is not None:
+                try:
+                    get_transcription_cache().put(key, language_code, model_name, transcription)
+                except Exception as e:
+                    app.logger.warning("Transcription cache write failed: %s", e)
+            return transcription
         else:
             error_msg = f"API request failed with status {response.status_code}"
             try:
@@ -131,6 +215,8 @@ def transcribe_audio(audio_data, language, model_name="saarika:v2.5"):
                 error_msg += f": {response.text}"
             raise Exception(error_msg)
             
+    except ASRUnavailableError:
+        raise
     except requests.exceptions.Timeout:
         raise Exception("API request timed out")
     except requests.exceptions.ConnectionError:
@@ -140,52 +226,74 @@ def transcribe_audio(audio_data, language, model_name="saarika:v2.5"):
 
 def check_keyword_match(transcript, crop_name):
     """Check if crop name is detected in transcript"""
-    transcript_lower = transcript.lower().strip()
-    crop_lower = crop_name.lower().strip()
-    
-    # Direct match
-    if crop_lower in transcript_lower:
-        return True
-    
-    # Check for partial matches (useful for compound words)
-    crop_words = crop_lower.split()
-    transcript_words = transcript_lower.split()
-    
-    # If crop name has multiple words, check if all words are present
-    if len(crop_words) > 1:
-        return all(word in transcript_lower for word in crop_words)
-    
-    # For single words, check if it's a substring
-    return crop_lower in transcript_lower
+    # Matchers are compiled once per crop name and cached
+    return compile_matcher((crop_name,)).matches(transcript, crop_name)
 
-def create_csv_content(results_data, user_email, language, session_id):
-    """Create CSV content from results data"""
-    import csv
-    import io
+CSV_EXPORT_HEADER = [
+    'QA Name', 'Language', 'Session ID', 'Crop Name', 'Attempt Number',
+    'Transcription', 'Keyword Detected', 'Timestamp'
+]
+
+def iter_csv_lines(rows):
+    """
+    Yield CSV text one row at a time.
     
-    output = io.StringIO()
-    writer = csv.writer(output)
+    Args:
+        rows: Iterable of result dicts carrying user_email, language and session_id
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
     
     # Write header
-    writer.writerow([
-        'QA Name', 'Language', 'Session ID', 'Crop Name', 'Attempt Number',
-        'Transcription', 'Keyword Detected', 'Timestamp'
-    ])
+    writer.writerow(CSV_EXPORT_HEADER)
     
     # Write data rows
-    for result in results_data:
+    for result in rows:
         writer.writerow([
-            user_email,
-            language,
-            session_id,
+            result['user_email'],
+            result['language'],
+            result['session_id'],
             result['crop_name'],
             result['attempt_number'],
             result['transcript'],
             'Yes' if result['keyword_detected'] else 'No',
             result['timestamp']
         ])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
     
-    return output.getvalue()
+    # Header only, if there were no rows
+    if buffer.tell():
+        yield buffer.getvalue()
+
+def iter_session_csv_lines(results_data, user_email, language, session_id):
+    """Yield CSV text for one session's results"""
+    return iter_csv_lines(
+        dict(result, user_email=user_email, language=language, session_id=session_id)
+        for result in results_data
+    )
+
+def csv_download_response(lines, filename):
+    """Stream CSV lines to the browser as a file download"""
+    return Response(
+        stream_with_context(line.encode('utf-8') for line in lines),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+def archive_results_to_azure(results_data, user_email, language, session_id):
+    """Upload a session's results to Azure; runs on the archive executor"""
+    try:
+        azure_url = upload_asr_test_results(
+            test_results=results_data,
+            user_email=user_email,
+            language=language,
+            session_id=str(session_id)
+        )
+        app.logger.info("SUCCESS: Session %s archived to Azure: %s", session_id, azure_url)
+    except Exception as e:
+        app.logger.error("FAILED: Azure archive of session %s failed: %s", session_id, e)
 
 @app.route('/')
 def index():
@@ -200,16 +308,12 @@ def login_authorized():
     try:
         # Get authorization code
         code = request.args.get('code')
-        app.logger.info(f"DEBUG: Received code: {code[:20]}..." if code else "DEBUG: No code received")
         if not code:
-            app.logger.error("DEBUG: No authorization code received")
+            app.logger.error("No authorization code received")
             flash('Authorization failed', 'error')
             return redirect(url_for('index'))
         
         # Exchange code for access token
-        app.logger.info(f"DEBUG: Client ID: {GOOGLE_CLIENT_ID}")
-        app.logger.info(f"DEBUG: Client Secret: {GOOGLE_CLIENT_SECRET[:10]}..." if GOOGLE_CLIENT_SECRET else "DEBUG: No client secret")
-        app.logger.info(f"DEBUG: Redirect URI: {GOOGLE_REDIRECT_URI}")
         
         token_url = 'https://oauth2.googleapis.com/token'
         token_data = {
@@ -220,15 +324,16 @@ def login_authorized():
             'redirect_uri': GOOGLE_REDIRECT_URI
         }
         
-        app.logger.info(f"DEBUG: Making token request to: {token_url}")
         token_response = requests.post(token_url, data=token_data)
-        app.logger.info(f"DEBUG: Token response status: {token_response.status_code}")
-        app.logger.info(f"DEBUG: Token response: {token_response.text}")
+        # Token responses carry credentials: log the status and field names only
+        log_event(app.logger, logging.INFO, "Token response", status=token_response.status_code,
+                  redirect_uri=GOOGLE_REDIRECT_URI)
         
         token_json = token_response.json()
         
         if 'access_token' not in token_json:
-            app.logger.error(f"DEBUG: No access token in response: {token_json}")
+            log_event(app.logger, logging.ERROR, "No access token in response",
+                      error=token_json.get('error'), keys=sorted(token_json))
             flash('Failed to get access token', 'error')
             return redirect(url_for('index'))
         
@@ -254,12 +359,32 @@ def login_authorized():
         session['user_id'] = int(datetime.now().strftime('%Y%m%d%H%M%S'))
         session.permanent = True  # Make session persistent
         
+        try:
+            get_results_store().upsert_user(user_info['email'], user_info.get('name'))
+        except Exception as e:
+            app.logger.error("Failed to record login in results DB: %s", e)
+        
         return redirect(url_for('language_selection', user_id=session['user_id']))
             
     except Exception as e:
         flash(f'Login failed: {str(e)}', 'error')
         return redirect(url_for('index'))
 
+if os.environ.get('LOGIN_BYPASS', 'false').lower() == 'true':
+    # Load tests and local runs only: sign in without Google OAuth
+    @app.route('/login/bypass')
+    def login_bypass():
+        """Sign in as ?email=...&name=... without OAuth (LOGIN_BYPASS=true only)"""
+        email = request.args.get('email', 'loadtest@sarvam.ai')
+        session['user'] = {'email': email, 'name': request.args.get('name', email)}
+        session['user_id'] = int(datetime.now().strftime('%Y%m%d%H%M%S'))
+        session.permanent = True
+        try:
+            get_results_store().upsert_user(email, session['user']['name'])
+        except Exception as e:
+            app.logger.error("Failed to record login in results DB: %s", e)
+        return redirect(url_for('language_selection', user_id=session['user_id']))
+
 @app.route('/logout')
 def logout():
     """Logout user"""
@@ -296,21 +421,19 @@ def process_csv():
     language = request.form.get('language')
     
     # Check if user is logged in
-    app.logger.info(f"DEBUG: process_csv - user_id from form: {user_id}")
-    app.logger.info(f"DEBUG: process_csv - session user_id: {session.get('user_id')}")
-    app.logger.info(f"DEBUG: process_csv - session user: {session.get('user')}")
-    app.logger.info(f"DEBUG: process_csv - session keys: {list(session.keys())}")
+    log_event(app.logger, logging.DEBUG, "process_csv", form_user_id=user_id,
+              session_user_id=session.get('user_id'), session_keys=len(session))
     
     # More lenient session check - just check if user exists
     if 'user' not in session:
-        app.logger.warning(f"DEBUG: process_csv - No user in session")
+        app.logger.warning("process_csv: no user in session")
         flash('Please log in first', 'error')
-    return redirect(url_for('index'))
+        return redirect(url_for('index'))
 
     # Use session user_id instead of form user_id
     session_user_id = session.get('user_id')
     if not session_user_id:
-        app.logger.warning(f"DEBUG: process_csv - No user_id in session")
+        app.logger.warning("process_csv: no user_id in session")
         flash('Please log in first', 'error')
         return redirect(url_for('index'))
     
@@ -347,13 +470,19 @@ def process_csv():
             flash('No crop names found in CSV file', 'error')
             return redirect(url_for('upload_csv', user_id=session_user_id, language=language))
         
-        # Create test session (generate unique session ID)
-        session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        # Create test session (generate unique session ID); testers starting in the same
+        # second must not share one, so the timestamp gets a random suffix
+        session_id = f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:6]}"
         
         # Store language and crop names in session for this session
         session['current_language'] = language
         session[f'crops_{session_id}'] = crop_names
         
+        try:
+            get_results_store().create_session(session_id, language, session['user'].get('email'))
+        except Exception as e:
+            app.logger.error("Failed to create session in results DB: %s", e)
+        
         # Clean up uploaded file
         os.unlink(filepath)
         
@@ -400,12 +529,183 @@ def testing(session_id, crop_index):
                          total_crops=len(crops),
                          language=language)
 
+def prepare_audio(audio_data):
+    """
+    Normalize a recording for upload.
+    
+    Returns:
+        NormalizedAudio: Normalized audio, or None if preprocessing is off or the
+            format cannot be decoded here (the original bytes are sent instead)
+    """
+    if not AUDIO_PREPROCESSING:
+        return None
+    try:
+        with span('normalize'):
+            return normalize_audio(audio_data)
+    except AudioConversionError as e:
+        if decoder_available():
+            raise
+        # Without ffmpeg or PyAV, WebM/Opus cannot be decoded here; let the API try the original bytes
+        app.logger.warning("Audio preprocessing skipped: %s", e)
+        return None
+
+def transcribe_recording(audio_data, language, model_name=PRIMARY_MODEL, use_cache=True, compare_models=()):
+    """
+    Normalize and transcribe one recording, splitting long ones at pauses.
+    Cache lookups are keyed on the normalized bytes (per chunk for long recordings).
+    
+    Args:
+        compare_models (tuple): Other models to transcribe the same audio with, concurrently
+    
+    Returns:
+        dict: transcribe_audio response from model_name; chunked recordings also carry
+            'segments', and with compare_models 'model_results' holds every model's
+            transcript and latency
+    """
+    normalized = prepare_audio(audio_data)
+    
+    def transcribe(model):
+        if normalized is None:
+            return transcribe_audio(audio_data, language, model, use_cache=use_cache)
+        if ASR_CHUNKING and normalized.duration > CHUNKING_MIN_SECONDS:
+            return transcribe_chunked(
+                normalized.samples,
+                normalized.sample_rate,
+                lambda data, filename, content_type: transcribe_audio(data, language, model, filename, content_type, use_cache),
+                output_format=os.path.splitext(normalized.filename)[1].lstrip('.')
+            )
+        return transcribe_audio(normalized.data, language, model, normalized.filename, normalized.content_type, use_cache)
+    
+    if not compare_models:
+        return transcribe(model_name)
+    
+    # Decoding and normalization happen once; only the API calls fan out
+    response, model_results = transcribe_models(transcribe, model_name, compare_models)
+    return dict(response, model_results=model_results)
+
+def score_recording(audio_data, crop_name, attempt_number, language, use_cache=True, reference=None):
+    """
+    Transcribe one recording and check it for the crop name.
+    Pass use_cache=False to force a fresh ASR call, and reference when the tester
+    read out a prompted text, so the attempt counts towards WER/CER.
+    
+    Returns:
+        dict: Result row as stored in the session
+    """
+    # Transcribe audio
+    transcription_result = transcribe_recording(audio_data, language, use_cache=use_cache,
+                                                compare_models=ASR_COMPARE_MODELS)
+    
+    if 'transcript' not in transcription_result:
+        raise ValueError('No transcript in API response')
+    
+    transcript = transcription_result['transcript']
+    
+    # Check keyword match
+    with span('keyword_match', language=language):
+        keyword_detected = check_keyword_match(transcript, crop_name)
+    
+    # Graded score: how far off a miss was and which crop was heard instead
+    with span('fuzzy_score', language=language):
+        match_score = score_transcript(transcript, crop_name, language)
+    
+    result = {
+        'crop_name': crop_name,
+        'attempt_number': attempt_number,
+        'transcript': transcript,
+        'keyword_detected': keyword_detected,
+        'crop_cer': match_score['crop_cer'],
+        'confusion_candidate': match_score['confusion_candidate'],
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    }
+    if reference:
+        result['reference'] = reference
+    if 'segments' in transcription_result:
+        result['segments'] = transcription_result['segments']
+    if 'model_results' in transcription_result:
+        result['model_results'] = {
+            model: dict(entry, keyword_detected=check_keyword_match(entry['transcript'], crop_name)) if 'transcript' in entry else entry
+            for model, entry in transcription_result['model_results'].items()
+        }
+    
+    return result
+
+def process_recording(audio_data, crop_name, attempt_number, language, user_email, session_id, use_cache=True,
+                      reference=None):
+    """
+    Transcribe one recording, score it and save it to Azure.
+    Runs on the request thread in synchronous mode and on a job worker in queue mode,
+    so it must not touch the Flask session.
+    
+    Returns:
+        dict: Result row as stored in the session
+    """
+    result = score_recording(audio_data, crop_name, attempt_number, language, use_cache, reference)
+    
+    # Persist locally first; this is the primary copy /results reads
+    try:
+        with span('results_db', language=language):
+            get_results_store().record_attempt(session_id, result, language, user_email)
+    except Exception as e:
+        app.logger.error("FAILED: Results DB write failed: %s", e)
+    
+    # IMMEDIATELY save to Azure to prevent data loss
+    try:
+        if AZURE_WRITE_BEHIND:
+            # Journal locally; the background flusher uploads in batches
+            with span('azure_journal', language=language):
+                get_result_writer().enqueue(result, user_email, language, session_id)
+            app.logger.info("Result journaled for Azure upload: %s", session_id)
+        else:
+            with span('azure_upload', language=language):
+                azure_url = upload_single_test_result(
+                    test_result=result,
+                    user_email=user_email,
+                    language=language,
+                    session_id=session_id
+                )
+            app.logger.info("Result saved to Azure: %s", azure_url)
+    except Exception as e:
+        log_event(app.logger, logging.ERROR, "Azure upload failed", session_id=session_id,
+                  error_type=type(e).__name__, error=str(e))
+        # Don't fail the request if Azure save fails, but log the error
+    
+    return result
+
+def store_session_result(session_id, result):
+    """Append a processed result to the session results list"""
+    if f'results_{session_id}' not in session:
+        session[f'results_{session_id}'] = []
+    
+    session[f'results_{session_id}'].append(result)
+    session.permanent = True  # Ensure session persists
+    
+    # Summary only; the full results list is sampled at DEBUG
+    log_payload(app.logger, "Stored session result", session[f'results_{session_id}'],
+                session_id=session_id, crop_name=result['crop_name'], attempt=result['attempt_number'])
+
+@app.before_request
+def trace_recording_request():
+    """Time /submit_recording stage by stage, starting with the multipart upload"""
+    if request.endpoint == 'submit_recording':
+        start_trace('submit_recording', language=session.get('current_language', 'hindi'))
+        with span('read_upload'):
+            request.files
+
+@app.teardown_request
+def finish_recording_trace(exc):
+    # Runs after the session is saved, so session_save is part of the trace
+    if request.endpoint == 'submit_recording':
+        end_trace()
+
 @app.route('/submit_recording', methods=['POST'])
 def submit_recording():
     """Handle audio recording submission"""
     session_id = request.form.get('session_id')
     crop_name = request.form.get('crop_name')
     attempt_number = int(request.form.get('attempt_number', 1))
+    # Text the tester was asked to read, if any; only such attempts are scored for WER/CER
+    reference = (request.form.get('reference') or '').strip() or None
     
     # Get audio file
     if 'audio_file' not in request.files:
@@ -418,66 +718,47 @@ def submit_recording():
     try:
         # Get language from session
         language = session.get('current_language', 'hindi')
+        user_email = session.get('user', {}).get('email', 'unknown@example.com')
         
         # Read audio data
         audio_data = audio_file.read()
         
-        # Transcribe audio
-        transcription_result = transcribe_audio(audio_data, language)
-        
-        if 'transcript' not in transcription_result:
-            return jsonify({'error': 'No transcript in API response'}), 400
-        
-        transcript = transcription_result['transcript']
-        
-        # Check keyword match
-        keyword_detected = check_keyword_match(transcript, crop_name)
-        
-        # Store result in session
-        if f'results_{session_id}' not in session:
-            session[f'results_{session_id}'] = []
+        # Live QA re-records must reach the model; cache=use opts back in
+        use_cache = request.form.get('cache', 'use' if TRANSCRIPTION_CACHE_LIVE else 'bypass') == 'use'
         
-        result = {
-            'crop_name': crop_name,
-            'attempt_number': attempt_number,
-            'transcript': transcript,
-            'keyword_detected': keyword_detected,
-            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        }
-        
-        session[f'results_{session_id}'].append(result)
-        session.permanent = True  # Ensure session persists
+        # Queue mode: hand transcription to the worker pool and answer immediately
+        if request.form.get('mode', ASR_JOB_MODE) == 'async':
+            try:
+                job = get_job_queue().submit(
+                    process_recording,
+                    audio_data, crop_name, attempt_number, language, user_email, session_id, use_cache, reference,
+                    metadata={'session_id': session_id, 'crop_name': crop_name, 'attempt_number': attempt_number}
+                )
+            except QueueFullError as e:
+                return jsonify({'error': str(e)}), 503
+            
+            return jsonify({
+                'success': True,
+                'job_id': job.job_id,
+                'status': job.status,
+                'status_url': url_for('job_status', job_id=job.job_id)
+            }), 202
         
-        # DEBUG: Log session storage
-        app.logger.info(f"DEBUG: Stored result for {crop_name}, attempt {attempt_number}")
-        app.logger.info(f"DEBUG: Total results in session: {len(session[f'results_{session_id}'])}")
-        app.logger.info(f"DEBUG: Session results: {session[f'results_{session_id}']}")
-        app.logger.info(f"DEBUG: Session ID: {session_id}")
-        app.logger.info(f"DEBUG: User email: {session.get('user', {}).get('email', 'unknown')}")
-        app.logger.info(f"DEBUG: Language: {language}")
-        
-        # IMMEDIATELY save to Azure to prevent data loss
-        try:
-            user_email = session.get('user', {}).get('email', 'unknown@example.com')
-            app.logger.info(f"DEBUG: Attempting Azure upload for {user_email}, {language}, {session_id}")
-            azure_url = upload_single_test_result(
-                test_result=result,
-                user_email=user_email,
-                language=language,
-                session_id=session_id
-            )
-            app.logger.info(f"SUCCESS: Result saved to Azure: {azure_url}")
-        except Exception as e:
-            app.logger.error(f"FAILED: Azure upload failed: {str(e)}")
-            app.logger.error(f"DEBUG: Azure upload error details: {type(e).__name__}: {str(e)}")
-            # Don't fail the request if Azure save fails, but log the error
+        result = process_recording(audio_data, crop_name, attempt_number, language, user_email, session_id, use_cache,
+                                   reference)
+        with span('session_update'):
+            store_session_result(session_id, result)
         
         return jsonify({
             'success': True,
-            'transcript': transcript,
-            'keyword_detected': keyword_detected
+            'transcript': result['transcript'],
+            'keyword_detected': result['keyword_detected']
         })
         
+    except DecoderBusyError as e:
+        return jsonify({'error': str(e)}), 503
+    except ASRUnavailableError as e:
+        return jsonify({'error': str(e)}), 503, {'Retry-After': str(max(1, round(e.retry_after)))}
     except Exception as e:
         error_msg = str(e)
         if "FFmpeg conversion failed" in error_msg:
@@ -485,33 +766,125 @@ def submit_recording():
         else:
             return jsonify({'error': f'Recording submission failed: {error_msg}'}), 500
 
-@app.route('/results/<session_id>')
-def results(session_id):
-    """Display test results"""
-    # Get results from session
-    results_data = session.get(f'results_{session_id}', [])
+@app.route('/job_status/<job_id>')
+def job_status(job_id):
+    """
+    Poll a queued transcription job.
+    Pass ?wait=<seconds> to long-poll until the job finishes.
+    """
+    try:
+        wait = min(max(float(request.args.get('wait', 0)), 0.0), ASR_JOB_MAX_WAIT)
+    except ValueError:
+        wait = 0.0
+    
+    job = get_job_queue().wait(job_id, wait)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    response = job.to_dict()
+    if job.status == 'done':
+        # Store in the caller's session exactly once
+        stored_jobs = session.get('stored_jobs', [])
+        if job_id not in stored_jobs:
+            store_session_result(job.metadata['session_id'], job.result)
+            session['stored_jobs'] = (stored_jobs + [job_id])[-50:]
+        response.update({
+            'success': True,
+            'transcript': job.result['transcript'],
+            'keyword_detected': job.result['keyword_detected']
+        })
+    elif job.status == 'failed':
+        if "FFmpeg conversion failed" in (job.error or ''):
+            response.update({'success': False, 'error': 'Audio processing error: Unable to convert audio format'})
+        else:
+            response.update({'success': False, 'error': f'Recording submission failed: {job.error}'})
+    else:
+        # Still queued or running after the wait; the client polls again
+        response['success'] = True
     
-    # DEBUG: Log what's in session
-    app.logger.info(f"DEBUG: Results page - session_id: {session_id}")
-    app.logger.info(f"DEBUG: Results page - results_data length: {len(results_data)}")
-    app.logger.info(f"DEBUG: Results page - results_data: {results_data}")
+    return jsonify(response)
+
+@app.route('/batch_transcribe', methods=['POST'])
+def batch_transcribe():
+    """
+    Transcribe a batch of recordings for offline regression runs.
+    Accepts either a zip 'archive' (with manifest.csv, or one directory per crop)
+    or a 'manifest' CSV plus 'audio_files'. Results stream back as NDJSON,
+    one line per recording in completion order.
+    """
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    language = request.form.get('language', session.get('current_language', 'hindi'))
+    if language not in BCP47_CODES:
+        return jsonify({'error': f'Unsupported language: {language}'}), 400
+    
+    # Validated here: once the NDJSON stream has started, errors can no longer become a 400
+    try:
+        max_workers = int(request.form.get('workers', ASR_BATCH_WORKERS))
+    except ValueError:
+        return jsonify({'error': 'workers must be an integer'}), 400
+    if max_workers < 1:
+        return jsonify({'error': 'workers must be at least 1'}), 400
+    max_workers = min(max_workers, ASR_BATCH_WORKERS)
+    
+    try:
+        if 'archive' in request.files:
+            archive = io.BytesIO(request.files['archive'].read())
+            items = iter_archive_items(archive)
+        elif 'manifest' in request.files:
+            items = iter_upload_items(request.files['manifest'], request.files.getlist('audio_files'))
+        else:
+            return jsonify({'error': 'Provide a zip archive or a manifest with audio files'}), 400
+    except zipfile.BadZipFile:
+        return jsonify({'error': 'Archive is not a valid zip file'}), 400
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    matcher = get_language_matcher(language)
+    
+    def generate():
+        for result in run_batch(items, score_recording, language, max_workers=max_workers):
+            if matcher is not None and 'transcript' in result:
+                # Every vocabulary crop heard in the transcript, with spans
+                result['mentions'] = [match._asdict() for match in matcher.find_all(result['transcript'])]
+            yield json.dumps(result, ensure_ascii=False) + '\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+def load_session_results(session_id):
+    """Load a session's results from the local results DB, falling back to the Flask session"""
+    try:
+        results_data = get_results_store().get_session_results(session_id)
+        if results_data:
+            return results_data
+    except Exception as e:
+        app.logger.error("Results DB read failed: %s", e)
+    return session.get(f'results_{session_id}', [])
+
+def recover_session_results(session_id):
+    """Load a session's raw results from the local DB or session, falling back to Azure recovery"""
+    # Get results from the local DB (or session)
+    results_data = load_session_results(session_id)
+    
+    log_payload(app.logger, "Loaded session results", results_data, session_id=session_id)
     
     # EMERGENCY RECOVERY: If session data is lost, try to recover from Azure
     if not results_data:
-        app.logger.warning(f"EMERGENCY: No session data found for session {session_id}")
+        app.logger.warning("EMERGENCY: No session data found for session %s", session_id)
         app.logger.info("Attempting to recover data from Azure...")
         
         try:
             user_email = session.get('user', {}).get('email', 'unknown@example.com')
             language = session.get('current_language', 'hindi')
             
-            app.logger.info(f"Recovering for user: {user_email}, language: {language}, session: {session_id}")
+            app.logger.info("Recovering for user: %s, language: %s, session: %s", user_email, language, session_id)
             
             # Try to recover from Azure
             recovered_data = recover_session_from_azure(user_email, language, session_id)
             
             if recovered_data:
-                app.logger.info(f"SUCCESS: Recovered {len(recovered_data)} results from Azure!")
+                app.logger.info("SUCCESS: Recovered %s results from Azure!", len(recovered_data))
                 results_data = recovered_data
                 # Restore to session for future access
                 session[f'results_{session_id}'] = results_data
@@ -520,20 +893,12 @@ def results(session_id):
                 app.logger.error("FAILED: No data recovered from Azure")
                 
         except Exception as e:
-            app.logger.error(f"Recovery failed: {str(e)}")
+            app.logger.error("Recovery failed: %s", e)
     
-    if not results_data:
-        return render_template('results.html', 
-                             session_id=session_id,
-                             qa_name=session.get('user', {}).get('name', 'Unknown'),
-                             language=session.get('current_language', 'hindi'),
-                             created_at=datetime.now(),
-                             results=[],
-                             well_pronounced_count=0,
-                             moderate_count=0,
-                             poor_count=0)
-    
-    # Process results - group by crop name
+    return results_data
+
+def summarize_results(results_data):
+    """Group raw attempt results into per-crop summaries for results.html"""
     crop_results = {}
     for result in results_data:
         crop_name = result['crop_name']
@@ -541,12 +906,7 @@ def results(session_id):
             crop_results[crop_name] = []
         crop_results[crop_name].append(result)
     
-    # Process each crop's results
     processed_results = []
-    well_pronounced_count = 0
-    moderate_count = 0
-    poor_count = 0
-    
     for crop_name, attempts in crop_results.items():
         correct_count = sum(1 for attempt in attempts if attempt['keyword_detected'])
         total_attempts = len(attempts)
@@ -556,34 +916,108 @@ def results(session_id):
         for attempt in attempts:
             logs.append({
                 'sentence': attempt['transcript'],
-                'detected': attempt['keyword_detected']
+                'detected': attempt['keyword_detected'],
+                'crop_cer': attempt.get('crop_cer'),
+                'confusion_candidate': attempt.get('confusion_candidate')
             })
         
-        # Count by performance level
-        if correct_count >= 3:
-            well_pronounced_count += 1
-        elif correct_count == 2:
-            moderate_count += 1
-        else:
-            poor_count += 1
-        
         processed_results.append({
             'crop_name': crop_name,
             'correct_count': correct_count,
             'total_attempts': total_attempts,
             'result_ratio': f"{correct_count}/{total_attempts}",
-            'logs': logs
+            'bucket': performance_bucket(correct_count),
+            'logs': logs,
+            'error_counts': combine_error_rates(score_attempt(attempt) for attempt in attempts)
         })
     
+    return processed_results
+
+def add_match_scores(processed_results, language):
+    """Fill in graded scores for logs recorded before fuzzy scoring existed"""
+    for result in processed_results:
+        for log in result['logs']:
+            if log.get('sentence') and log.get('crop_cer') is None:
+                match_score = score_transcript(log['sentence'], result['crop_name'], language)
+                log['crop_cer'] = match_score['crop_cer']
+                log['confusion_candidate'] = match_score['confusion_candidate']
+
+def report_owner():
+    """Email to limit cross-session reports to: the logged-in user's, or None for admins"""
+    email = session.get('user', {}).get('email') or ''
+    return None if email.lower() in ADMIN_EMAILS else email
+
+def session_owner_info(session_id):
+    """
+    Owner and language of a session the logged-in user may see.
+
+    Sessions in the results DB are visible to their owner and to ADMIN_EMAILS;
+    anyone else gets a 404. Sessions not in the DB can only come from the
+    caller's own Flask session or Azure folder, so the caller's details are used.
+
+    Returns:
+        dict: user_email, qa_name and language
+    """
+    try:
+        info = get_results_store().get_session_info(session_id)
+    except Exception as e:
+        app.logger.error("Results DB read failed: %s", e)
+        info = None
+    if info is None:
+        user = session.get('user', {})
+        return {
+            'user_email': user.get('email', 'unknown@example.com'),
+            'qa_name': user.get('name', 'Unknown'),
+            'language': session.get('current_language', 'hindi')
+        }
+    owner = report_owner()
+    if owner is not None and info['user_email'].lower() != owner.lower():
+        abort(404)
+    return info
+
+@app.route('/results/<session_id>')
+def results(session_id):
+    """Display test results"""
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('index'))
+    
+    info = session_owner_info(session_id)
+    
+    # Fast path: per-crop and per-model aggregates kept current by the results DB
+    try:
+        store = get_results_store()
+        processed_results = store.get_crop_summaries(session_id)
+        # Side-by-side keyword accuracy and latency when recordings went to several models
+        model_summary = summarize_model_totals(store.get_model_totals(session_id))
+    except Exception as e:
+        app.logger.error("Results DB read failed: %s", e)
+        processed_results = []
+    
+    if not processed_results:
+        results_data = recover_session_results(session_id)
+        processed_results = summarize_results(results_data)
+        model_summary = summarize_models(results_data)
+    
+    add_match_scores(processed_results, info['language'])
+    
+    # Count by performance level
+    buckets = [result['bucket'] for result in processed_results]
+    
+    # Session WER/CER from per-crop edit counts; only attempts with a prompted reference text are scored
+    session_error_rates = combine_error_rates(result['error_counts'] for result in processed_results)
+    
     return render_template('results.html', 
                          session_id=session_id,
-                         qa_name=session.get('user', {}).get('name', 'Unknown'),
-                         language=session.get('current_language', 'hindi'),
+                         qa_name=info['qa_name'],
+                         language=info['language'],
                          created_at=datetime.now(),
                          results=processed_results,
-                         well_pronounced_count=well_pronounced_count,
-                         moderate_count=moderate_count,
-                         poor_count=poor_count)
+                         well_pronounced_count=buckets.count('well'),
+                         moderate_count=buckets.count('moderate'),
+                         poor_count=buckets.count('poor'),
+                         error_rates=session_error_rates,
+                         model_summary=model_summary)
 
 @app.route('/end_session/<session_id>')
 def end_session(session_id):
@@ -593,48 +1027,118 @@ def end_session(session_id):
 @app.route('/download_csv/<session_id>')
 def download_csv(session_id):
     """Download results as CSV and upload to Azure"""
-    # Get results from session
-    results_data = session.get(f'results_{session_id}', [])
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('index'))
+    
+    # Archive and name the file under the session's own user and language, not the caller's
+    info = session_owner_info(session_id)
+    user_email = info['user_email'] or 'unknown@example.com'
+    language = info['language']
+    
+    # Get results from the local DB (or session)
+    results_data = load_session_results(session_id)
     
     if not results_data:
         flash('No results found for this session', 'error')
         return redirect(url_for('index'))
     
-    try:
-        # Upload results to Azure first
-        user_email = session.get('user', {}).get('email', 'unknown@example.com')
-        language = session.get('current_language', 'hindi')
-        
-        azure_url = upload_asr_test_results(
-            test_results=results_data,
-            user_email=user_email,
-            language=language,
-            session_id=str(session_id)
-        )
-        
-        # Create CSV content for download
-        csv_content = create_csv_content(results_data, user_email, language, session_id)
-        
-        # Create response with CSV file
-        output = io.StringIO()
-        output.write(csv_content)
-        output.seek(0)
-        
-        # Create filename
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'asr_test_results_{user_email}_{language}_{timestamp}.csv'
-        
-        # Return CSV file for download
-        return send_file(
-            io.BytesIO(output.getvalue().encode('utf-8')),
-            mimetype='text/csv',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-    except Exception as e:
-        flash(f'Failed to generate CSV: {str(e)}', 'error')
-        return redirect(url_for('results', session_id=session_id))
+    # Archive to Azure in the background; the download does not wait for it
+    archive_executor.submit(archive_results_to_azure, results_data, user_email, language, session_id)
+    
+    # Create filename
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f'asr_test_results_{user_email}_{language}_{timestamp}.csv'
+    
+    return csv_download_response(
+        iter_session_csv_lines(results_data, user_email, language, session_id),
+        filename
+    )
+
+@app.route('/export_csv')
+def export_csv():
+    """
+    Stream results for many sessions as one CSV, straight from the results DB.
+    Filter with repeated ?session_id=... and/or ?language=...; only the user's own
+    sessions unless they are in ADMIN_EMAILS.
+    """
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('index'))
+    
+    session_ids = request.args.getlist('session_id')
+    language = request.args.get('language')
+    
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    filename = f"asr_test_results_export_{language or 'all'}_{timestamp}.csv"
+    
+    attempts = get_results_store().iter_attempts(session_keys=session_ids, language=language,
+                                                 user_email=report_owner())
+    return csv_download_response(iter_csv_lines(attempts), filename)
+
+@app.route('/error_rates')
+def error_rates_report():
+    """
+    Corpus WER/CER from the results DB, overall and per group.
+    Only attempts submitted with a prompted reference text are scored.
+    Filter with repeated ?session_id=... and/or ?language=...; ?group_by=language|session_id|crop_name.
+    Covers only the user's own sessions unless they are in ADMIN_EMAILS.
+    """
+    if 'user' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    
+    group_by = request.args.get('group_by', 'language')
+    if group_by not in ('language', 'session_id', 'crop_name'):
+        return jsonify({'error': f'Unsupported group_by: {group_by}'}), 400
+    
+    attempts = get_results_store().iter_attempts(
+        session_keys=request.args.getlist('session_id'),
+        language=request.args.get('language'),
+        user_email=report_owner()
+    )
+    return jsonify(aggregate_error_rates(attempts, group_by=group_by))
+
+# Rendered analytics pages, keyed by (language, analytics version)
+_analytics_pages = {}
+_analytics_pages_lock = threading.Lock()
+
+@app.route('/analytics')
+def analytics():
+    """
+    Per-language confusion matrix and per-crop accuracy across all sessions.
+    ?language=... selects the language, ?format=json returns the raw report,
+    ?refresh=1 starts ingesting new results in the background. Answers always
+    come from the current snapshot, so they never wait for an ingest.
+    """
+    if 'user' not in session:
+        flash('Please log in first', 'error')
+        return redirect(url_for('index'))
+    
+    job = get_analytics()
+    if request.args.get('refresh') == '1':
+        job.request_refresh()
+    
+    languages = job.languages()
+    language = (request.args.get('language') or session.get('current_language') or 'hindi').lower()
+    report = job.report(language)
+    
+    if request.args.get('format') == 'json':
+        if report is None:
+            return jsonify({'error': f'No analytics for {language}', 'languages': languages,
+                            'refreshing': job.stats()['refreshing']}), 404
+        return jsonify(report)
+    
+    key = (language, job.version)
+    with _analytics_pages_lock:
+        page = _analytics_pages.get(key)
+    if page is None:
+        page = render_template('analytics.html', language=language, languages=languages, report=report)
+        with _analytics_pages_lock:
+            # Pages rendered for an older version are stale
+            for stale in [cached for cached in _analytics_pages if cached[1] != job.version]:
+                del _analytics_pages[stale]
+            _analytics_pages[key] = page
+    return page
 
 @app.route('/qa_guide')
 def qa_guide():
@@ -646,6 +1150,11 @@ def csv_format_guide():
     """CSV Format Guide"""
     return render_template('csv_format_guide.html')
 
+@app.route('/metrics')
+def prometheus_metrics():
+    """Per-stage latency histograms in Prometheus text format (all workers when PROMETHEUS_MULTIPROC_DIR is set)"""
+    return Response(stage_histograms.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/debug_azure')
 def debug_azure():
     """Debug Azure connection"""
@@ -683,8 +1192,76 @@ def debug_azure():
             'message': 'Azure connection failed'
         })
 
+@app.route('/health')
+def health():
+    """
+    Liveness plus ASR circuit breaker and concurrency limit state.
+    Always 200 while the app is up, so a tripped breaker does not get the instance
+    restarted; 'status' is 'degraded' while the circuit is not closed.
+    The breaker and limiter are per gunicorn worker, so the state is that of
+    the worker identified by 'pid'; other workers may be in a different state.
+    """
+    asr = get_asr_guard().stats()
+    return jsonify({
+        'status': 'ok' if asr['circuit']['state'] == 'closed' else 'degraded',
+        'scope': 'worker',
+        'pid': os.getpid(),
+        'asr': asr
+    })
+
+@app.route('/debug_asr_pool')
+def debug_asr_pool():
+    """Report the answering worker's ASR connection pool hit/miss counters"""
+    return jsonify(dict(get_asr_client(SAARAS_API_URL).stats(), scope='worker', pid=os.getpid()))
+
+@app.route('/debug_job_queue')
+def debug_job_queue():
+    """Report transcription job queue depth"""
+    return jsonify(get_job_queue().stats())
+
+@app.route('/debug_write_behind')
+def debug_write_behind():
+    """Report write-behind queue depth and flush latency"""
+    if not AZURE_WRITE_BEHIND:
+        return jsonify({'enabled': False})
+    return jsonify(dict(get_result_writer().stats(), enabled=True))
+
+@app.route('/debug_audio')
+def debug_audio():
+    """Report audio preprocessing latency and size reduction per input format"""
+    decoder = get_decoder()
+    return jsonify({
+        'enabled': AUDIO_PREPROCESSING,
+        'decoder': decoder.stats() if decoder else None,
+        'formats': audio_stats.snapshot()
+    })
+
+@app.route('/debug_transcription_cache')
+def debug_transcription_cache():
+    """Report transcription cache hit rate, size and evictions"""
+    if not TRANSCRIPTION_CACHE:
+        return jsonify({'enabled': False})
+    return jsonify(dict(get_transcription_cache().stats(), enabled=True))
+
+@app.route('/debug_logging')
+def debug_logging():
+    """Report log queue depth and records dropped under back-pressure"""
+    return jsonify(logging_stats())
+
+@app.route('/debug_analytics')
+def debug_analytics():
+    """Report analytics ingest progress"""
+    return jsonify(get_analytics().stats())
+
+# Create uploads directory if it doesn't exist; gunicorn imports the module without running __main__
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+if AZURE_WRITE_BEHIND:
+    # Start the flusher now so results journaled before a crash are uploaded on startup
+    get_result_writer()
+
 if __name__ == '__main__':
-    # Create uploads directory if it doesn't exist
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-    app.run(debug=True, host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
+    # Development server only; production runs `gunicorn -c gunicorn.conf.py app:app`
+    app.run(debug=os.environ.get('FLASK_DEBUG', 'false').lower() == 'true',
+            host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
 
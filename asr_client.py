@@ -0,0 +1,141 @@
+"""
+Shared HTTP client for the Saaras ASR endpoint.
+Keeps a pooled, keep-alive requests.Session so recordings reuse TCP connections
+instead of opening a new one per /submit_recording call.
+"""
+
+import os
+import logging
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+
+class ASRClient:
+    """
+    Pooled HTTP client for the ASR transcription endpoint.
+
+    Args:
+        api_url (str): Transcription endpoint URL
+        pool_maxsize (int): Maximum number of keep-alive connections per host
+        max_retries (int): Number of retries for connection errors and 502/503/504 responses
+        backoff_factor (float): Exponential backoff factor between retries
+        connect_timeout (float): Seconds to wait for the TCP connection
+        read_timeout (float): Seconds to wait for the transcription response
+    """
+
+    def __init__(self, api_url: str, pool_maxsize: int = 20, max_retries: int = 2,
+                 backoff_factor: float = 0.3, connect_timeout: float = 5.0,
+                 read_timeout: float = 30.0):
+        self.api_url = api_url
+        self.pool_maxsize = pool_maxsize
+        self.timeout = (connect_timeout, read_timeout)
+
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,  # a read timeout means the server already spent its budget on us
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(['POST']),
+            raise_on_status=False
+        )
+        self._adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=pool_maxsize,
+            max_retries=retry,
+            pool_block=False
+        )
+        self._session = requests.Session()
+        self._session.headers.update({'Connection': 'keep-alive'})
+        self._session.mount('http://', self._adapter)
+        self._session.mount('https://', self._adapter)
+
+    def post(self, files: dict, data: dict, headers: Optional[dict] = None,
+             timeout=None) -> requests.Response:
+        """
+        POST a multipart request to the ASR endpoint over the shared pool.
+
+        Args:
+            files (dict): Multipart files, as accepted by requests
+            data (dict): Form fields
+            headers (dict, optional): Extra request headers
+            timeout (float or tuple, optional): Overrides the (connect, read) timeout
+
+        Returns:
+            requests.Response: Raw HTTP response
+        """
+        return self._session.post(
+            self.api_url,
+            files=files,
+            data=data,
+            headers=headers,
+            timeout=timeout or self.timeout
+        )
+
+    def stats(self) -> dict:
+        """
+        Report connection pool reuse counters.
+
+        A hit is a request served on an already-open connection; a miss is a
+        request that had to open a new one.
+
+        Returns:
+            dict: Pool size, request count, hits, misses and hit rate
+        """
+        total_requests = 0
+        total_connections = 0
+        pools = self._adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            total_requests += pool.num_requests
+            total_connections += pool.num_connections
+
+        hits = max(total_requests - total_connections, 0)
+        return {
+            'api_url': self.api_url,
+            'pool_maxsize': self.pool_maxsize,
+            'requests': total_requests,
+            'pool_hits': hits,
+            'pool_misses': total_connections,
+            'hit_rate': round(hits / total_requests, 4) if total_requests else 0.0
+        }
+
+    def close(self):
+        """Close all pooled connections"""
+        self._session.close()
+
+
+@process_singleton
+def get_asr_client(api_url: str) -> ASRClient:
+    """
+    Shared ASR client for an endpoint, so every request thread reuses one connection pool.
+
+    Pool and retry settings are read from ASR_POOL_SIZE, ASR_MAX_RETRIES,
+    ASR_BACKOFF_FACTOR, ASR_CONNECT_TIMEOUT and ASR_READ_TIMEOUT.
+
+    Args:
+        api_url (str): Transcription endpoint URL
+
+    Returns:
+        ASRClient: Shared client instance
+    """
+    client = ASRClient(
+        api_url,
+        pool_maxsize=int(os.environ.get('ASR_POOL_SIZE', 20)),
+        max_retries=int(os.environ.get('ASR_MAX_RETRIES', 2)),
+        backoff_factor=float(os.environ.get('ASR_BACKOFF_FACTOR', 0.3)),
+        connect_timeout=float(os.environ.get('ASR_CONNECT_TIMEOUT', 5)),
+        read_timeout=float(os.environ.get('ASR_READ_TIMEOUT', 30))
+    )
+    logger.info("Created ASR client for %s (pool size %s)", api_url, client.pool_maxsize)
+    return client
@@ -0,0 +1,279 @@
+"""
+Audio preprocessing before upload to the ASR API.
+Browser recordings arrive as 44.1/48 kHz WAV or as WebM/Opus; every recording
+is decoded, downmixed to mono, resampled to 16 kHz, trimmed of leading and
+trailing silence and re-encoded as 16-bit PCM, so the API always gets the
+format it is named as ('audio.wav') at a fraction of the bytes.
+"""
+
+import io
+import os
+import sys
+import time
+import logging
+import threading
+from typing import NamedTuple, Optional
+
+import numpy as np
+import soundfile as sf
+
+from decode_pool import AudioConversionError, DecoderBusyError, get_decoder
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+# Leading/trailing frames quieter than this (relative to the loudest frame) are trimmed
+SILENCE_THRESHOLD_DB = float(os.environ.get('AUDIO_SILENCE_THRESHOLD_DB', -40))
+SILENCE_PADDING_SECONDS = float(os.environ.get('AUDIO_SILENCE_PADDING', 0.15))
+
+# Encodings soundfile can write, keyed by AUDIO_OUTPUT_FORMAT
+OUTPUT_FORMATS = {
+    'wav': ('WAV', 'PCM_16', 'audio.wav', 'audio/wav'),
+    'flac': ('FLAC', 'PCM_16', 'audio.flac', 'audio/flac'),
+}
+
+_MAGIC = (
+    (b'RIFF', 'wav'),
+    (b'\x1aE\xdf\xa3', 'webm'),
+    (b'OggS', 'ogg'),
+    (b'fLaC', 'flac'),
+    (b'ID3', 'mp3'),
+    (b'\xff\xfb', 'mp3'),
+)
+
+
+class NormalizedAudio(NamedTuple):
+    """
+    A recording after preprocessing.
+
+    Attributes:
+        data (bytes): Encoded audio to upload
+        filename (str): Upload filename matching the encoding
+        content_type (str): MIME type matching the encoding
+        samples (np.ndarray): Mono float32 samples at sample_rate, for later stages
+        sample_rate (int): Sample rate of samples and data
+        source_format (str): Detected input container
+        input_bytes (int): Size of the original upload
+    """
+    data: bytes
+    filename: str
+    content_type: str
+    samples: np.ndarray
+    sample_rate: int
+    source_format: str
+    input_bytes: int
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / float(self.sample_rate)
+
+
+def detect_format(audio_data: bytes) -> str:
+    """Guess the container from the leading bytes"""
+    for magic, name in _MAGIC:
+        if audio_data.startswith(magic):
+            return name
+    if audio_data[4:8] == b'ftyp':
+        return 'mp4'
+    return 'unknown'
+
+
+def decoder_available() -> bool:
+    """Whether WebM/Opus and other non-soundfile formats can be decoded"""
+    return get_decoder() is not None
+
+
+def _lowpass(samples: np.ndarray, cutoff: float, taps: int = 63) -> np.ndarray:
+    """Windowed-sinc FIR low-pass; cutoff is a fraction of the sample rate"""
+    n = np.arange(taps) - (taps - 1) / 2.0
+    kernel = 2 * cutoff * np.sinc(2 * cutoff * n) * np.hamming(taps)
+    kernel /= kernel.sum()
+    return np.convolve(samples, kernel.astype(np.float32), mode='same')
+
+
+def resample(samples: np.ndarray, source_rate: int, target_rate: int = TARGET_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample mono audio; downsampling is low-pass filtered first to avoid aliasing.
+
+    Returns:
+        np.ndarray: float32 samples at target_rate
+    """
+    if source_rate == target_rate or not len(samples):
+        return samples.astype(np.float32, copy=False)
+    if source_rate > target_rate:
+        samples = _lowpass(samples, 0.45 * target_rate / source_rate)
+    duration = len(samples) / float(source_rate)
+    target_times = np.arange(int(round(duration * target_rate))) / float(target_rate)
+    source_times = np.arange(len(samples)) / float(source_rate)
+    return np.interp(target_times, source_times, samples).astype(np.float32)
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, threshold_db: float = SILENCE_THRESHOLD_DB,
+                 padding: float = SILENCE_PADDING_SECONDS, frame_seconds: float = 0.02) -> np.ndarray:
+    """
+    Cut leading and trailing silence, keeping `padding` seconds around speech.
+
+    Recordings with no frame above the threshold are returned unchanged.
+    """
+    frame = max(int(sample_rate * frame_seconds), 1)
+    frames = len(samples) // frame
+    if frames < 2:
+        return samples
+    energy = np.sqrt(np.mean(samples[:frames * frame].reshape(frames, frame) ** 2, axis=1) + 1e-12)
+    level = 20 * np.log10(energy / energy.max())
+    active = np.flatnonzero(level > threshold_db)
+    if not len(active) or energy.max() < 1e-4:
+        return samples
+    pad = int(padding * sample_rate)
+    start = max(active[0] * frame - pad, 0)
+    end = min((active[-1] + 1) * frame + pad, len(samples))
+    return samples[start:end]
+
+
+def decode_audio(audio_data: bytes) -> tuple:
+    """
+    Decode a recording to mono float32 samples.
+
+    soundfile handles WAV/FLAC/OGG in-process; anything else (WebM/Opus, MP4)
+    goes to the shared decoder (PyAV or the warm ffmpeg pool), which also
+    resamples to 16 kHz on the way.
+
+    Returns:
+        tuple: (samples, sample_rate)
+
+    Raises:
+        AudioConversionError: If the audio cannot be decoded
+        DecoderBusyError: If the decoder has no capacity left
+    """
+    try:
+        samples, sample_rate = sf.read(io.BytesIO(audio_data), dtype='float32', always_2d=True)
+        return samples.mean(axis=1), sample_rate
+    except Exception as e:
+        decoder = get_decoder()
+        if decoder is None:
+            raise AudioConversionError(f"FFmpeg conversion failed: no decoder installed and soundfile could not read the audio ({e})")
+    return decoder.decode(audio_data), TARGET_SAMPLE_RATE
+
+
+def encode_audio(samples: np.ndarray, sample_rate: int, output_format: str = 'wav') -> bytes:
+    """Encode mono float samples as 16-bit WAV or FLAC"""
+    container, subtype, _, _ = OUTPUT_FORMATS[output_format]
+    buffer = io.BytesIO()
+    sf.write(buffer, np.clip(samples, -1.0, 1.0), sample_rate, format=container, subtype=subtype)
+    return buffer.getvalue()
+
+
+class AudioProcessingStats:
+    """Per-source-format counters for the preprocessing stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._formats = {}
+
+    def record(self, source_format: str, seconds: float, input_bytes: int, output_bytes: int,
+               audio_seconds: float, failed: bool = False):
+        with self._lock:
+            entry = self._formats.setdefault(source_format, {
+                'count': 0, 'failures': 0, 'total_seconds': 0.0,
+                'input_bytes': 0, 'output_bytes': 0, 'audio_seconds': 0.0
+            })
+            entry['count'] += 1
+            entry['failures'] += int(failed)
+            entry['total_seconds'] += seconds
+            entry['input_bytes'] += input_bytes
+            entry['output_bytes'] += output_bytes
+            entry['audio_seconds'] += audio_seconds
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            formats = {name: dict(entry) for name, entry in self._formats.items()}
+        for entry in formats.values():
+            processed = entry['count'] - entry['failures']
+            entry['avg_ms'] = round(entry['total_seconds'] * 1000 / entry['count'], 2) if entry['count'] else 0.0
+            entry['bytes_ratio'] = round(entry['output_bytes'] / entry['input_bytes'], 4) if entry['input_bytes'] else None
+            entry['realtime_factor'] = round(entry['total_seconds'] / entry['audio_seconds'], 5) if entry['audio_seconds'] and processed else None
+        return formats
+
+
+stats = AudioProcessingStats()
+
+
+def normalize_audio(audio_data: bytes, output_format: Optional[str] = None, trim: bool = True) -> NormalizedAudio:
+    """
+    Decode, downmix, resample to 16 kHz, trim silence and re-encode a recording.
+
+    Args:
+        audio_data (bytes): Uploaded recording in any supported container
+        output_format (str, optional): 'wav' or 'flac'; AUDIO_OUTPUT_FORMAT by default
+        trim (bool): Trim leading and trailing silence
+
+    Returns:
+        NormalizedAudio: Encoded audio plus the decoded samples
+
+    Raises:
+        AudioConversionError: If the audio cannot be decoded
+    """
+    output_format = output_format or os.environ.get('AUDIO_OUTPUT_FORMAT', 'wav')
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}. Supported: {list(OUTPUT_FORMATS)}")
+    source_format = detect_format(audio_data)
+    started = time.perf_counter()
+    try:
+        samples, sample_rate = decode_audio(audio_data)
+        samples = resample(samples, sample_rate)
+        if trim:
+            samples = trim_silence(samples, TARGET_SAMPLE_RATE)
+        data = encode_audio(samples, TARGET_SAMPLE_RATE, output_format)
+    except DecoderBusyError:
+        raise
+    except Exception:
+        stats.record(source_format, time.perf_counter() - started, len(audio_data), 0, 0.0, failed=True)
+        raise
+
+    elapsed = time.perf_counter() - started
+    stats.record(source_format, elapsed, len(audio_data), len(data), len(samples) / float(TARGET_SAMPLE_RATE))
+    logger.info("Normalized %s audio %s -> %s bytes in %.1fms", source_format, len(audio_data), len(data), elapsed * 1000)
+    _, _, filename, content_type = OUTPUT_FORMATS[output_format]
+    return NormalizedAudio(data, filename, content_type, samples, TARGET_SAMPLE_RATE, source_format, len(audio_data))
+
+
+def benchmark(paths: list, repeat: int = 5, output_format: str = 'wav') -> dict:
+    """
+    Time normalize_audio on sample recordings, grouped by input format.
+
+    Returns:
+        dict: format -> avg_ms, input/output bytes and realtime factor
+    """
+    results = {}
+    for path in paths:
+        with open(path, 'rb') as f:
+            audio_data = f.read()
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            normalized = normalize_audio(audio_data, output_format)
+            timings.append(time.perf_counter() - started)
+        entry = results.setdefault(detect_format(audio_data), {'files': 0, 'ms': [], 'input_bytes': 0, 'output_bytes': 0, 'audio_seconds': 0.0})
+        entry['files'] += 1
+        entry['ms'].append(min(timings) * 1000)
+        entry['input_bytes'] += len(audio_data)
+        entry['output_bytes'] += len(normalized.data)
+        entry['audio_seconds'] += normalized.duration
+    for entry in results.values():
+        timings = entry.pop('ms')
+        entry['avg_ms'] = round(sum(timings) / len(timings), 2)
+        entry['bytes_ratio'] = round(entry['output_bytes'] / entry['input_bytes'], 4)
+    return results
+
+
+if __name__ == '__main__':
+    # python audio_processing.py recording.wav recording.webm ...
+    if len(sys.argv) < 2:
+        print("Usage: python audio_processing.py <audio file> [<audio file> ...]")
+        sys.exit(1)
+    print(f"Decoder: {get_decoder().backend if decoder_available() else 'none (soundfile formats only)'}")
+    for name, entry in benchmark(sys.argv[1:]).items():
+        print(f"{name:>8}: {entry['files']} files, {entry['avg_ms']:.1f} ms avg, "
+              f"{entry['input_bytes']} -> {entry['output_bytes']} bytes ({entry['bytes_ratio']:.1%}), "
+              f"{entry['audio_seconds']:.1f}s of audio kept")
@@ -1,15 +1,71 @@
 import os
 import csv
 import io
-from azure.storage.blob import BlobServiceClient, ContentSettings
+from azure.core import MatchConditions
+from azure.core.exceptions import HttpResponseError, ResourceExistsError, ResourceModifiedError, ResourceNotFoundError
+from azure.storage.blob import BlobServiceClient, BlobType, ContentSettings
 from typing import Optional
+import re
+import time
 import logging
+import threading
 from datetime import datetime
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Shared Azure clients, rebuilt only when the storage configuration changes
+_client_cache = {'config': None, 'container_client': None}
+_client_lock = threading.Lock()
+
+
+def _get_storage_config() -> tuple:
+    """
+    Read the Azure Storage configuration from the environment.
+    
+    Returns:
+        tuple: (account_name, container_name, account_key)
+    """
+    account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME', 'sarvamweb')
+    container_name = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'whatsappmedia')
+    account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
+    
+    if not account_key:
+        raise ValueError("AZURE_STORAGE_ACCOUNT_KEY environment variable not set")
+    
+    return account_name, container_name, account_key
+
+
+def get_container_client():
+    """
+    Return a ContainerClient shared across calls and threads.
+    
+    The BlobServiceClient (and its HTTP connection pool) is created on first use
+    and reused until the account name, container name or key changes.
+    AZURE_STORAGE_CONNECTION_STRING, if set, replaces the public-cloud endpoint
+    (e.g. an Azurite or load-test blob emulator).
+    
+    Returns:
+        ContainerClient: Client for the configured container
+    """
+    config = _get_storage_config() + (os.environ.get('AZURE_STORAGE_CONNECTION_STRING'),)
+    
+    container_client = _client_cache['container_client']
+    if _client_cache['config'] == config and container_client is not None:
+        return container_client
+    
+    with _client_lock:
+        if _client_cache['config'] != config or _client_cache['container_client'] is None:
+            account_name, container_name, account_key, connection_string = config
+            if not connection_string:
+                connection_string = f"DefaultEndpointsProtocol=https;AccountName={account_name};AccountKey={account_key};EndpointSuffix=core.windows.net"
+            blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+            _client_cache['container_client'] = blob_service_client.get_container_client(container_name)
+            _client_cache['config'] = config
+            logger.info("Created Azure container client for %s/%s", account_name, container_name)
+        return _client_cache['container_client']
+
 def upload_csv_to_blob(csv_file_path: str, folder_name: str = "ASR Testing Dump", 
                       blob_filename: Optional[str] = None, 
                       add_timestamp: bool = False) -> str:
@@ -26,14 +82,7 @@ def upload_csv_to_blob(csv_file_path: str, folder_name: str = "ASR Testing Dump"
         str: The URL of the uploaded blob
     """
     # Azure Storage Configuration
-    account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME', 'sarvamweb')
-    container_name = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'whatsappmedia')
-    account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
-    
-    if not account_key:
-        raise ValueError("AZURE_STORAGE_ACCOUNT_KEY environment variable not set")
-    
-    connection_string = f"DefaultEndpointsProtocol=https;AccountName={account_name};AccountKey={account_key};EndpointSuffix=core.windows.net"
+    account_name, container_name, _ = _get_storage_config()
     try:
         # Check if file exists
         if not os.path.exists(csv_file_path):
@@ -56,13 +105,11 @@ def upload_csv_to_blob(csv_file_path: str, folder_name: str = "ASR Testing Dump"
         # Construct blob path with folder
         blob_path = f"{folder_name}/{blob_filename}"
         
-        # Initialize Azure clients
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client(container_name)
-        blob_client = container_client.get_blob_client(blob_path)
+        # Reuse the shared Azure clients
+        blob_client = get_container_client().get_blob_client(blob_path)
         
         # Read and upload CSV file
-        logger.info(f"Uploading {csv_file_path} to {blob_path}")
+        logger.info("Uploading %s to %s", csv_file_path, blob_path)
         
         with open(csv_file_path, "rb") as data:
             blob_client.upload_blob(
@@ -74,13 +121,13 @@ def upload_csv_to_blob(csv_file_path: str, folder_name: str = "ASR Testing Dump"
         # Generate URL
         url = f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}"
         
-        logger.info(f"Upload successful! File uploaded to: {blob_path}")
-        logger.info(f"URL: {url}")
+        logger.info("Upload successful! File uploaded to: %s", blob_path)
+        logger.info("URL: %s", url)
         
         return url
         
     except Exception as e:
-        logger.error(f"Error uploading CSV file: {e}")
+        logger.error("Error uploading CSV file: %s", e)
         raise
 
 
@@ -100,14 +147,7 @@ def upload_csv_data_to_blob(csv_data: str, filename: str,
         str: The URL of the uploaded blob
     """
     # Azure Storage Configuration
-    account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME', 'sarvamweb')
-    container_name = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'whatsappmedia')
-    account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
-    
-    if not account_key:
-        raise ValueError("AZURE_STORAGE_ACCOUNT_KEY environment variable not set")
-    
-    connection_string = f"DefaultEndpointsProtocol=https;AccountName={account_name};AccountKey={account_key};EndpointSuffix=core.windows.net"
+    account_name, container_name, _ = _get_storage_config()
     
     try:
         # Ensure filename has .csv extension
@@ -123,13 +163,11 @@ def upload_csv_data_to_blob(csv_data: str, filename: str,
         # Construct blob path with folder
         blob_path = f"{folder_name}/{filename}"
         
-        # Initialize Azure clients
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client(container_name)
-        blob_client = container_client.get_blob_client(blob_path)
+        # Reuse the shared Azure clients
+        blob_client = get_container_client().get_blob_client(blob_path)
         
         # Upload CSV data
-        logger.info(f"Uploading CSV data to {blob_path}")
+        logger.info("Uploading CSV data to %s", blob_path)
         
         blob_client.upload_blob(
             csv_data,
@@ -140,24 +178,139 @@ def upload_csv_data_to_blob(csv_data: str, filename: str,
         # Generate URL
         url = f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}"
         
-        logger.info(f"Upload successful! CSV data uploaded to: {blob_path}")
-        logger.info(f"URL: {url}")
+        logger.info("Upload successful! CSV data uploaded to: %s", blob_path)
+        logger.info("URL: %s", url)
+        
+        return url
+        
+    except Exception as e:
+        logger.error("Error uploading CSV data: %s", e)
+        raise
+
+
+# Lease held while a legacy block blob is rewritten as an append blob
+CONVERSION_LEASE_SECONDS = 30
+# Errors other writers see while that lease is held; they back off and retry
+LEASE_CONFLICT_CODES = ('LeaseAlreadyPresent', 'LeaseIdMissing')
+APPEND_LEASE_RETRIES = 5
+
+
+def _convert_to_append_blob(blob_client, csv_rows: str, blob_path: str):
+    """
+    Recreate a block blob written by the old overwrite mode as an append blob,
+    keeping its rows and adding csv_rows after them.
+    
+    The read and the recreate happen under a lease, so no other worker can write
+    in between; their writes fail with a lease error and are retried.
+    """
+    logger.info("Converting %s to an append blob", blob_path)
+    lease = blob_client.acquire_lease(lease_duration=CONVERSION_LEASE_SECONDS)
+    try:
+        existing = blob_client.download_blob(lease=lease).readall()
+        blob_client.create_append_blob(content_settings=ContentSettings(content_type="text/csv"), lease=lease)
+        blob_client.append_block(existing + csv_rows.encode('utf-8'), lease=lease, appendpos_condition=0)
+    finally:
+        try:
+            lease.release()
+        except HttpResponseError as e:
+            # Expires on its own after CONVERSION_LEASE_SECONDS
+            logger.warning("Releasing conversion lease on %s failed: %s", blob_path, e)
+
+
+def _append_header(blob_client, header: str):
+    try:
+        blob_client.append_block(header, appendpos_condition=0)
+    except HttpResponseError as e:
+        # Another writer appended its rows between our create and this call; readers
+        # skip header lines anyway, so carry on without one rather than fail the upload
+        if e.error_code != 'AppendPositionConditionNotMet':
+            raise
+        logger.warning("Results blob %s got rows before its header", blob_client.blob_name)
+
+
+def _append_rows(blob_client, csv_rows: str, header: str, blob_path: str):
+    try:
+        blob_client.append_block(csv_rows)
+    except ResourceNotFoundError:
+        # First row for this blob: create it with the header, tolerating a concurrent creator
+        try:
+            blob_client.create_append_blob(
+                content_settings=ContentSettings(content_type="text/csv"),
+                match_condition=MatchConditions.IfMissing
+            )
+        except (ResourceExistsError, ResourceModifiedError):
+            pass
+        else:
+            if header:
+                _append_header(blob_client, header)
+        blob_client.append_block(csv_rows)
+    except HttpResponseError as e:
+        if e.error_code != 'InvalidBlobType':
+            raise
+        _convert_to_append_blob(blob_client, csv_rows, blob_path)
+
+
+def append_csv_data_to_blob(csv_rows: str, filename: str, header: str = '',
+                            folder_name: str = "ASR Testing Dump") -> str:
+    """
+    Appends CSV rows to an Azure Append Blob, creating it on first write.
+    
+    Each call is a single Append Block request, so adding a row costs the same
+    no matter how many rows the blob already holds.
+    
+    Args:
+        csv_rows (str): One or more CSV lines to append
+        filename (str): Filename for the CSV (should include .csv extension)
+        header (str): Header line written when the blob is created
+        folder_name (str): Folder name in the blob container (default: "ASR Testing Dump")
+    
+    Returns:
+        str: The URL of the append blob
+    """
+    account_name, container_name, _ = _get_storage_config()
+    
+    try:
+        if not filename.lower().endswith('.csv'):
+            filename += '.csv'
+        
+        blob_path = f"{folder_name}/{filename}"
+        blob_client = get_container_client().get_blob_client(blob_path)
         
+        for attempt in range(APPEND_LEASE_RETRIES):
+            try:
+                _append_rows(blob_client, csv_rows, header, blob_path)
+                break
+            except HttpResponseError as e:
+                # Another worker is converting this blob
+                if e.error_code not in LEASE_CONFLICT_CODES or attempt == APPEND_LEASE_RETRIES - 1:
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+        
+        url = f"https://{account_name}.blob.core.windows.net/{container_name}/{blob_path}"
+        logger.info("Appended CSV data to: %s", blob_path)
         return url
         
     except Exception as e:
-        logger.error(f"Error uploading CSV data: {e}")
+        logger.error("Error appending CSV data: %s", e)
         raise
 
 
 # ASR Testing specific functions
-def upload_single_test_result(test_result: dict, user_email: str, language: str, session_id: str) -> str:
+RESULT_CSV_HEADER = ['user_email', 'language', 'session_id', 'crop_name', 'attempt_number', 'transcript', 'keyword_detected', 'timestamp', 'upload_timestamp']
+
+# 'append' adds each attempt to a per-session append blob; 'overwrite' keeps the old one-row blob
+RESULTS_STORAGE_MODE = os.environ.get('AZURE_RESULTS_STORAGE_MODE', 'append')
+
+
+def upload_test_results_batch(test_results: list, user_email: str, language: str, session_id: str) -> str:
     """
-    Upload a single ASR test result to Azure Blob Storage immediately.
-    This ensures results are saved even if session is lost.
+    Save several attempts from one session to its Azure results blob in one request.
+    
+    In append mode (the default) the rows are appended to the session's blob, so
+    every attempt is kept. In overwrite mode the blob is replaced by these rows.
     
     Args:
-        test_result (dict): Single test result dictionary
+        test_results (list): Test result dictionaries, in attempt order
         user_email (str): User's email address
         language (str): Test language
         session_id (str): Session identifier
@@ -165,16 +318,17 @@ def upload_single_test_result(test_result: dict, user_email: str, language: str,
     Returns:
         str: URL of uploaded CSV file
     """
-    try:
-        # Create CSV data for single result
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write header
-        writer.writerow(['user_email', 'language', 'session_id', 'crop_name', 'attempt_number', 'transcript', 'keyword_detected', 'timestamp', 'upload_timestamp'])
-        
-        # Write single result
-        upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    # Create CSV data for the results
+    output = io.StringIO()
+    writer = csv.writer(output)
+    
+    # Write header
+    writer.writerow(RESULT_CSV_HEADER)
+    header = output.getvalue()
+    
+    # Write results
+    upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    for test_result in test_results:
         writer.writerow([
             user_email,
             language,
@@ -186,26 +340,51 @@ def upload_single_test_result(test_result: dict, user_email: str, language: str,
             test_result.get('timestamp', ''),
             upload_timestamp
         ])
-        
-        csv_data = output.getvalue()
-        output.close()
-        
-        # Generate filename for this session
-        filename = f"asr_test_results_{user_email}_{language}_{session_id}.csv"
-        
-        # Upload to Azure
-        url = upload_csv_data_to_blob(
-            csv_data=csv_data,
+    
+    csv_data = output.getvalue()
+    output.close()
+    
+    # Generate filename for this session
+    filename = f"asr_test_results_{user_email}_{language}_{session_id}.csv"
+    
+    # Upload to Azure
+    if RESULTS_STORAGE_MODE == 'append':
+        return append_csv_data_to_blob(
+            csv_rows=csv_data[len(header):],
             filename=filename,
-            folder_name="ASR Testing Dump",
-            add_timestamp=False
+            header=header,
+            folder_name="ASR Testing Dump"
         )
-        
-        logger.info(f"Single ASR test result uploaded successfully: {url}")
+    
+    return upload_csv_data_to_blob(
+        csv_data=csv_data,
+        filename=filename,
+        folder_name="ASR Testing Dump",
+        add_timestamp=False
+    )
+
+
+def upload_single_test_result(test_result: dict, user_email: str, language: str, session_id: str) -> str:
+    """
+    Upload a single ASR test result to Azure Blob Storage immediately.
+    This ensures results are saved even if session is lost.
+    
+    Args:
+        test_result (dict): Single test result dictionary
+        user_email (str): User's email address
+        language (str): Test language
+        session_id (str): Session identifier
+    
+    Returns:
+        str: URL of uploaded CSV file
+    """
+    try:
+        url = upload_test_results_batch([test_result], user_email, language, session_id)
+        logger.info("Single ASR test result uploaded successfully: %s", url)
         return url
         
     except Exception as e:
-        logger.error(f"Error uploading single ASR test result: {e}")
+        logger.error("Error uploading single ASR test result: %s", e)
         raise
 
 def recover_session_from_azure(user_email: str, language: str, session_id: str) -> list:
@@ -222,20 +401,12 @@ def recover_session_from_azure(user_email: str, language: str, session_id: str)
         list: List of recovered test results
     """
     try:
-        # Azure Storage Configuration
-        account_name = os.environ.get('AZURE_STORAGE_ACCOUNT_NAME', 'sarvamweb')
-        container_name = os.environ.get('AZURE_STORAGE_CONTAINER_NAME', 'whatsappmedia')
-        account_key = os.environ.get('AZURE_STORAGE_ACCOUNT_KEY')
-        
-        if not account_key:
+        if not os.environ.get('AZURE_STORAGE_ACCOUNT_KEY'):
             logger.error("AZURE_STORAGE_ACCOUNT_KEY not set - cannot recover from Azure")
             return []
         
-        connection_string = f"DefaultEndpointsProtocol=https;AccountName={account_name};AccountKey={account_key};EndpointSuffix=core.windows.net"
-        
-        # Initialize Azure clients
-        blob_service_client = BlobServiceClient.from_connection_string(connection_string)
-        container_client = blob_service_client.get_container_client(container_name)
+        # Reuse the shared Azure clients
+        container_client = get_container_client()
         
         # List blobs for this session
         blob_prefix = f"ASR Testing Dump/asr_test_results_{user_email}_{language}_{session_id}"
@@ -248,9 +419,11 @@ def recover_session_from_azure(user_email: str, language: str, session_id: str)
                 blob_client = container_client.get_blob_client(blob.name)
                 csv_data = blob_client.download_blob().readall().decode('utf-8')
                 
-                # Parse CSV data
-                csv_reader = csv.DictReader(io.StringIO(csv_data))
+                # Parse CSV data; append blobs may interleave the header with early rows
+                csv_reader = csv.DictReader(io.StringIO(csv_data), fieldnames=RESULT_CSV_HEADER)
                 for row in csv_reader:
+                    if row.get('user_email') == 'user_email':
+                        continue
                     if row.get('session_id') == session_id:
                         recovered_results.append({
                             'crop_name': row.get('crop_name', ''),
@@ -260,19 +433,91 @@ def recover_session_from_azure(user_email: str, language: str, session_id: str)
                             'timestamp': row.get('timestamp', '')
                         })
                 
-                logger.info(f"Recovered {len(recovered_results)} results from Azure blob: {blob.name}")
+                logger.info("Recovered %s results from Azure blob: %s", len(recovered_results), blob.name)
                 
             except Exception as e:
-                logger.error(f"Error recovering from blob {blob.name}: {e}")
+                logger.error("Error recovering from blob %s: %s", blob.name, e)
                 continue
         
-        logger.info(f"Total recovered results: {len(recovered_results)}")
+        logger.info("Total recovered results: %s", len(recovered_results))
         return recovered_results
         
     except Exception as e:
-        logger.error(f"Error recovering session from Azure: {e}")
+        logger.error("Error recovering session from Azure: %s", e)
         return []
 
+# Download archives (asr_test_results_<email>_<language>_<YYYYmmdd_HHMMSS>.csv) repeat rows
+# already in the per-session blobs, so incremental readers skip them. Per-session blobs
+# end in the session ID (session_<YYYYmmdd_HHMMSS>...) and must not match.
+ARCHIVE_BLOB_RE = re.compile(r'(?<!_session)_\d{8}_\d{6}\.csv$')
+
+
+def _complete_csv_prefix(text: str) -> str:
+    """Longest prefix of text ending at a newline that is not inside a quoted field"""
+    end = text.rfind('\n')
+    while end >= 0 and text.count('"', 0, end) % 2:
+        end = text.rfind('\n', 0, end)
+    return text[:end + 1]
+
+
+def iter_new_result_batches(cursors: dict, folder_name: str = "ASR Testing Dump"):
+    """
+    Yield the result rows added to each per-session results blob since the last call.
+    
+    Append blobs are read from the byte offset reached last time; a block blob
+    (overwrite mode) is re-read whenever its ETag changes, since every write
+    replaces its rows with new ones. A blob's cursor only advances once the
+    caller has taken its batch and asks for the next one, so a caller that
+    fails part way re-reads the batch it did not finish rather than skipping it.
+    
+    Args:
+        cursors (dict): blob name -> {'etag', 'offset'}; updated in place as batches are consumed
+        folder_name (str): Folder holding the results blobs
+    
+    Yields:
+        list: One blob's new rows, keyed by RESULT_CSV_HEADER, keyword_detected as a bool
+    """
+    container_client = get_container_client()
+    for blob in container_client.list_blobs(name_starts_with=f"{folder_name}/asr_test_results_"):
+        if ARCHIVE_BLOB_RE.search(blob.name):
+            continue
+        cursor = cursors.get(blob.name, {'etag': None, 'offset': 0})
+        if cursor['etag'] == blob.etag:
+            continue
+        
+        append_blob = blob.blob_type == BlobType.APPENDBLOB
+        offset = cursor['offset'] if append_blob and cursor['offset'] <= blob.size else 0
+        if offset >= blob.size:
+            cursors[blob.name] = {'etag': blob.etag, 'offset': offset}
+            continue
+        
+        try:
+            data = container_client.get_blob_client(blob.name).download_blob(
+                offset=offset, length=blob.size - offset
+            ).readall().decode('utf-8', errors='replace')
+        except Exception as e:
+            logger.error("Error reading results blob %s: %s", blob.name, e)
+            continue
+        
+        # A row still being appended is left for the next call
+        complete = _complete_csv_prefix(data) if append_blob else data
+        rows = []
+        for row in csv.DictReader(io.StringIO(complete), fieldnames=RESULT_CSV_HEADER):
+            if row.get('user_email') == 'user_email' or not row.get('crop_name'):
+                continue
+            row['keyword_detected'] = (row.get('keyword_detected') or '').lower() == 'true'
+            rows.append(row)
+        if rows:
+            yield rows
+        
+        # Reached once the caller has ingested the batch
+        consumed = len(complete.encode('utf-8')) if append_blob else blob.size
+        cursors[blob.name] = {
+            'etag': blob.etag if consumed == blob.size - offset else None,
+            'offset': offset + consumed
+        }
+
+
 def upload_asr_test_results(test_results: list, user_email: str, language: str, session_id: str) -> str:
     """
     Upload ASR test results to Azure Blob Storage.
@@ -292,7 +537,7 @@ def upload_asr_test_results(test_results: list, user_email: str, language: str,
         writer = csv.writer(output)
         
         # Write header
-        writer.writerow(['user_email', 'language', 'session_id', 'crop_name', 'attempt_number', 'transcript', 'keyword_detected', 'timestamp', 'upload_timestamp'])
+        writer.writerow(RESULT_CSV_HEADER)
         
         # Write data
         upload_timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -324,10 +569,10 @@ def upload_asr_test_results(test_results: list, user_email: str, language: str,
             add_timestamp=False  # We already added timestamp to filename
         )
         
-        logger.info(f"ASR test results uploaded successfully: {url}")
+        logger.info("ASR test results uploaded successfully: %s", url)
         return url
         
     except Exception as e:
-        logger.error(f"Error uploading ASR test results: {e}")
+        logger.error("Error uploading ASR test results: %s", e)
         raise
 
@@ -0,0 +1,207 @@
+"""
+Batch transcription helpers for offline regression runs.
+Reads a zip archive or manifest of recordings and fans them out to the ASR
+backend over a bounded thread pool, yielding results as they complete.
+"""
+
+import os
+import csv
+import io
+import logging
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Callable, Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = {'wav', 'webm', 'ogg', 'mp3', 'flac', 'm4a'}
+MANIFEST_NAME = 'manifest.csv'
+
+
+def _is_audio(name: str) -> bool:
+    return '.' in name and name.rsplit('.', 1)[1].lower() in AUDIO_EXTENSIONS
+
+
+def _read_manifest(manifest_data: bytes) -> list:
+    """
+    Parse a manifest CSV with columns audio_file, crop_name and optional attempt_number.
+
+    Rows without an audio file or crop name, or with a non-numeric
+    attempt_number, are skipped with a warning.
+
+    Args:
+        manifest_data (bytes): Raw manifest file contents
+
+    Returns:
+        list: (audio_file, crop_name, attempt_number) tuples in manifest order
+
+    Raises:
+        ValueError: If the manifest is not UTF-8 text or lacks the required columns
+    """
+    try:
+        manifest_text = manifest_data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise ValueError(f"{MANIFEST_NAME} must be UTF-8 encoded")
+    reader = csv.DictReader(io.StringIO(manifest_text))
+    missing = {'audio_file', 'crop_name'} - set(reader.fieldnames or ())
+    if missing:
+        raise ValueError(f"{MANIFEST_NAME} is missing columns: {', '.join(sorted(missing))}")
+
+    entries = []
+    attempts_seen = {}
+    for row in reader:
+        audio_name = (row.get('audio_file') or '').strip()
+        crop_name = (row.get('crop_name') or '').strip()
+        if not audio_name or not crop_name:
+            continue
+        attempt = (row.get('attempt_number') or '').strip()
+        if attempt:
+            try:
+                attempt = int(attempt)
+            except ValueError:
+                logger.warning("Skipping manifest line %s: attempt_number %r is not an integer",
+                               reader.line_num, attempt)
+                continue
+        attempts_seen[crop_name] = attempts_seen.get(crop_name, 0) + 1
+        entries.append((audio_name, crop_name, attempt or attempts_seen[crop_name]))
+    return entries
+
+
+def iter_archive_items(archive_file) -> Iterator[dict]:
+    """
+    Iterate batch items from a zip archive.
+
+    If the archive contains manifest.csv it maps audio files to crop names.
+    Otherwise each audio file's parent directory is taken as the crop name,
+    e.g. चावल/1.wav, and attempts are numbered in archive order.
+
+    Args:
+        archive_file: File-like object holding the zip archive
+
+    Returns:
+        iterator: Items with file, crop_name, attempt_number and a load() callable
+
+    Raises:
+        zipfile.BadZipFile: If archive_file is not a zip archive
+        ValueError: If the archive's manifest cannot be read
+    """
+    # Open the archive and parse its manifest eagerly, so a bad upload fails
+    # before the response starts streaming
+    archive = zipfile.ZipFile(archive_file)
+    names = {info.filename: info for info in archive.infolist() if not info.is_dir()}
+
+    manifest_name = next((name for name in names if os.path.basename(name) == MANIFEST_NAME), None)
+    if manifest_name:
+        return _iter_manifest_members(archive, names, manifest_name, _read_manifest(archive.read(manifest_name)))
+    return _iter_crop_directories(archive, names)
+
+
+def _iter_manifest_members(archive: zipfile.ZipFile, names: dict, manifest_name: str,
+                           entries: list) -> Iterator[dict]:
+    prefix = os.path.dirname(manifest_name)
+    for audio_name, crop_name, attempt in entries:
+        member = f"{prefix}/{audio_name}" if prefix else audio_name
+        if member not in names:
+            logger.warning("Manifest entry %s not found in archive", audio_name)
+            continue
+        yield {
+            'file': audio_name,
+            'crop_name': crop_name,
+            'attempt_number': attempt,
+            'load': lambda member=member: archive.read(member)
+        }
+
+
+def _iter_crop_directories(archive: zipfile.ZipFile, names: dict) -> Iterator[dict]:
+    attempts_seen = {}
+    for member in sorted(names):
+        if not _is_audio(member):
+            continue
+        crop_name = os.path.basename(os.path.dirname(member))
+        if not crop_name:
+            logger.warning("Skipping %s: no crop directory and no manifest", member)
+            continue
+        attempts_seen[crop_name] = attempts_seen.get(crop_name, 0) + 1
+        yield {
+            'file': member,
+            'crop_name': crop_name,
+            'attempt_number': attempts_seen[crop_name],
+            'load': lambda member=member: archive.read(member)
+        }
+
+
+def iter_upload_items(manifest_file, audio_files: Iterable) -> Iterator[dict]:
+    """
+    Iterate batch items from a manifest CSV plus individually uploaded audio files.
+
+    Args:
+        manifest_file: File-like manifest with audio_file, crop_name[, attempt_number]
+        audio_files: Uploaded files (werkzeug FileStorage), matched by filename
+
+    Returns:
+        iterator: Items with file, crop_name, attempt_number and a load() callable
+
+    Raises:
+        ValueError: If the manifest cannot be read
+    """
+    entries = _read_manifest(manifest_file.read())
+    uploads = {f.filename: f for f in audio_files}
+    return _iter_uploads(entries, uploads)
+
+
+def _iter_uploads(entries: list, uploads: dict) -> Iterator[dict]:
+    for audio_name, crop_name, attempt in entries:
+        upload = uploads.get(audio_name)
+        if upload is None:
+            logger.warning("Manifest entry %s was not uploaded", audio_name)
+            continue
+        yield {
+            'file': audio_name,
+            'crop_name': crop_name,
+            'attempt_number': attempt,
+            'load': upload.read
+        }
+
+
+def run_batch(items: Iterable[dict], score_fn: Callable, language: str,
+              max_workers: int = 8) -> Iterator[dict]:
+    """
+    Score batch items concurrently, yielding each result as soon as it completes.
+
+    At most 2 * max_workers recordings are held in memory at once.
+
+    Args:
+        items: Batch items from iter_archive_items or iter_upload_items
+        score_fn (callable): score_fn(audio_data, crop_name, attempt_number, language) -> result dict
+        language (str): Test language
+        max_workers (int): Maximum number of concurrent ASR calls
+
+    Yields:
+        dict: The result dict plus index and file, or index, file and error on failure
+    """
+    def score(index, item):
+        try:
+            result = score_fn(item['load'](), item['crop_name'], item['attempt_number'], language)
+            return dict(result, index=index, file=item['file'])
+        except Exception as e:
+            return {
+                'index': index,
+                'file': item['file'],
+                'crop_name': item['crop_name'],
+                'attempt_number': item['attempt_number'],
+                'error': str(e)
+            }
+
+    max_in_flight = max_workers * 2
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asr-batch') as executor:
+        pending = set()
+        for index, item in enumerate(items):
+            pending.add(executor.submit(score, index, item))
+            if len(pending) >= max_in_flight:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
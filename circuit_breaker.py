@@ -0,0 +1,342 @@
+"""
+Fail-fast protection for the Saaras ASR endpoint.
+A circuit breaker watches the failure rate over a rolling window and, once it
+trips, turns calls away immediately instead of letting every request wait out
+the read timeout; after a cool-down a few probe calls decide whether to close
+it again. An AIMD limiter caps concurrent ASR calls per process, growing the
+cap while latency stays near its baseline and halving it on failures or slow
+responses, so a degrading server gets less traffic before it fails outright.
+
+Both are per process: each gunicorn worker trips and recovers on its own
+traffic, and stats() describe the worker that answers.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from typing import Callable
+
+import requests
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class ASRUnavailableError(Exception):
+    """
+    Raised when an ASR call is refused without being sent: the circuit is open
+    or the concurrency limit stayed full.
+
+    Attributes:
+        retry_after (float): Seconds before a retry is worth attempting
+    """
+
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Failure-rate circuit breaker with half-open probing.
+
+    Closed: calls pass; once at least min_calls outcomes in the last
+    window_seconds include a failure_threshold fraction of failures, it opens.
+    Open: calls are refused for open_seconds. Half-open: up to probe_calls
+    calls go through; if all succeed the circuit closes, any failure reopens it.
+
+    Args:
+        failure_threshold (float): Failure fraction that trips the breaker
+        min_calls (int): Outcomes needed in the window before it can trip
+        window_seconds (float): Length of the rolling window
+        open_seconds (float): Cool-down before probing
+        probe_calls (int): Successful probes needed to close
+    """
+
+    def __init__(self, failure_threshold: float = 0.5, min_calls: int = 10, window_seconds: float = 30.0,
+                 open_seconds: float = 15.0, probe_calls: int = 3):
+        self.failure_threshold = failure_threshold
+        self.min_calls = min_calls
+        self.window_seconds = window_seconds
+        self.open_seconds = open_seconds
+        self.probe_calls = probe_calls
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._outcomes = deque()  # (monotonic time, failed)
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._metrics = {'rejected': 0, 'trips': 0}
+
+    def _trim(self, now: float):
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, failed = self._outcomes.popleft()
+            self._failures -= failed
+
+    def _open(self, now: float, reason: str):
+        self._state = OPEN
+        self._opened_at = now
+        self._outcomes.clear()
+        self._failures = 0
+        self._metrics['trips'] += 1
+        logger.warning("ASR circuit opened: %s", reason)
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or refuse it.
+
+        Returns:
+            bool: True if the call is a half-open probe
+
+        Raises:
+            ASRUnavailableError: If the circuit is open, or half-open with all probes in flight
+        """
+        with self._lock:
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - time.monotonic()
+                if remaining > 0:
+                    self._metrics['rejected'] += 1
+                    raise ASRUnavailableError("ASR service unavailable: circuit open", retry_after=remaining)
+                self._state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+                logger.info("ASR circuit half-open: probing")
+            if self._state == HALF_OPEN:
+                if self._probes_in_flight + self._probe_successes >= self.probe_calls:
+                    self._metrics['rejected'] += 1
+                    raise ASRUnavailableError("ASR service unavailable: circuit half-open, probes in flight")
+                self._probes_in_flight += 1
+                return True
+            return False
+
+    def record(self, failed: bool, probe: bool = False):
+        """Record the outcome of an admitted call"""
+        with self._lock:
+            now = time.monotonic()
+            if probe:
+                if self._state != HALF_OPEN:
+                    return
+                self._probes_in_flight -= 1
+                if failed:
+                    self._open(now, "probe failed")
+                else:
+                    self._probe_successes += 1
+                    if self._probe_successes >= self.probe_calls:
+                        self._state = CLOSED
+                        logger.info("ASR circuit closed: probes succeeded")
+                return
+            if self._state != CLOSED:
+                # A call admitted before the circuit opened; the probes decide now
+                return
+            self._outcomes.append((now, failed))
+            self._failures += failed
+            self._trim(now)
+            calls = len(self._outcomes)
+            if calls >= self.min_calls and self._failures / calls >= self.failure_threshold:
+                self._open(now, f"{self._failures}/{calls} calls failed in the last {self.window_seconds:.0f}s")
+
+    def cancel_probe(self):
+        """Give back a probe slot for a call that was never sent"""
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._probes_in_flight -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            self._trim(now)
+            calls = len(self._outcomes)
+            stats = dict(self._metrics)
+            stats.update({
+                'state': self._state,
+                'window_calls': calls,
+                'window_failures': self._failures,
+                'failure_rate': round(self._failures / calls, 4) if calls else 0.0,
+                'failure_threshold': self.failure_threshold,
+            })
+            if self._state == OPEN:
+                remaining = self._opened_at + self.open_seconds - now
+                if remaining > 0:
+                    stats['retry_after'] = round(remaining, 1)
+                else:
+                    stats['state'] = HALF_OPEN
+        return stats
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    AIMD limit on concurrent calls.
+
+    Each success faster than latency_tolerance x the baseline (a moving average
+    of successful call latency) raises the limit by 1/limit, about +1 per
+    limit's worth of calls. A failure or slow call multiplies it by backoff,
+    at most once per batch of in-flight calls: calls that started before the
+    last decrease do not decrease it again. Callers wait up to max_wait seconds
+    for a slot and are then refused.
+
+    Args:
+        initial_limit (int): Starting limit
+        min_limit (int): Floor for the limit
+        max_limit (int): Ceiling for the limit
+        backoff (float): Multiplicative decrease factor
+        latency_tolerance (float): Latency over baseline that counts as slow
+        max_wait (float): Seconds a caller waits for a slot
+    """
+
+    def __init__(self, initial_limit: int = 16, min_limit: int = 2, max_limit: int = 64,
+                 backoff: float = 0.5, latency_tolerance: float = 2.0, max_wait: float = 2.0):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.backoff = backoff
+        self.latency_tolerance = latency_tolerance
+        self.max_wait = max_wait
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._baseline = None
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+        self._metrics = {'rejected': 0, 'increases': 0, 'decreases': 0}
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def acquire(self) -> float:
+        """
+        Take a slot, waiting up to max_wait.
+
+        Returns:
+            float: Start time to pass back to release()
+
+        Raises:
+            ASRUnavailableError: If no slot frees up in time
+        """
+        deadline = time.monotonic() + self.max_wait
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['rejected'] += 1
+                    raise ASRUnavailableError(
+                        f"ASR service overloaded: {self._in_flight} calls in flight (limit {int(self._limit)})")
+                self._condition.wait(remaining)
+            self._in_flight += 1
+        return time.monotonic()
+
+    def release(self, started: float, failed: bool):
+        """Free a slot and adjust the limit from the call's outcome and latency"""
+        now = time.monotonic()
+        latency = now - started
+        with self._condition:
+            self._in_flight -= 1
+            slow = False
+            if not failed:
+                if self._baseline is None:
+                    self._baseline = latency
+                slow = latency > self._baseline * self.latency_tolerance
+                self._baseline += 0.05 * (latency - self._baseline)
+            if failed or slow:
+                if started >= self._last_decrease:
+                    self._limit = max(self.min_limit, self._limit * self.backoff)
+                    self._last_decrease = now
+                    self._metrics['decreases'] += 1
+            elif self._limit < self.max_limit:
+                previous = int(self._limit)
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                if int(self._limit) > previous:
+                    self._metrics['increases'] += 1
+            self._condition.notify()
+
+    def stats(self) -> dict:
+        with self._condition:
+            stats = dict(self._metrics)
+            stats.update({
+                'limit': int(self._limit),
+                'in_flight': self._in_flight,
+                'min_limit': self.min_limit,
+                'max_limit': self.max_limit,
+                'baseline_latency_ms': round(self._baseline * 1000, 1) if self._baseline is not None else None,
+            })
+        return stats
+
+
+class ASRGuard:
+    """Circuit breaker and concurrency limiter applied together to ASR calls"""
+
+    def __init__(self, breaker: CircuitBreaker, limiter: AdaptiveConcurrencyLimiter):
+        self.breaker = breaker
+        self.limiter = limiter
+
+    def call(self, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send one ASR request unless the circuit is open or the limit is full.
+
+        Timeouts, connection errors, 429 and 5xx responses count as failures;
+        other 4xx responses are the request's fault and count as successes.
+
+        Args:
+            send (callable): Performs the HTTP request
+
+        Returns:
+            requests.Response: The response from send
+
+        Raises:
+            ASRUnavailableError: If the call was refused without being sent
+        """
+        probe = self.breaker.before_call()
+        try:
+            started = self.limiter.acquire()
+        except ASRUnavailableError:
+            if probe:
+                self.breaker.cancel_probe()
+            raise
+        failed = True
+        try:
+            response = send()
+            failed = response.status_code == 429 or response.status_code >= 500
+            return response
+        finally:
+            self.limiter.release(started, failed)
+            self.breaker.record(failed, probe)
+
+    def stats(self) -> dict:
+        return {'circuit': self.breaker.stats(), 'concurrency': self.limiter.stats()}
+
+
+@process_singleton
+def get_asr_guard() -> ASRGuard:
+    """
+    Shared ASR guard; every request thread in the process counts against the same breaker and limit.
+
+    The breaker is configured by ASR_BREAKER_FAILURE_RATE, ASR_BREAKER_MIN_CALLS,
+    ASR_BREAKER_WINDOW, ASR_BREAKER_OPEN_SECONDS and ASR_BREAKER_PROBES; the
+    limiter by ASR_LIMIT_INITIAL, ASR_LIMIT_MIN, ASR_LIMIT_MAX, ASR_LIMIT_BACKOFF,
+    ASR_LIMIT_LATENCY_TOLERANCE and ASR_LIMIT_MAX_WAIT.
+
+    Returns:
+        ASRGuard: Shared guard instance
+    """
+    breaker = CircuitBreaker(
+        failure_threshold=float(os.environ.get('ASR_BREAKER_FAILURE_RATE', 0.5)),
+        min_calls=int(os.environ.get('ASR_BREAKER_MIN_CALLS', 10)),
+        window_seconds=float(os.environ.get('ASR_BREAKER_WINDOW', 30)),
+        open_seconds=float(os.environ.get('ASR_BREAKER_OPEN_SECONDS', 15)),
+        probe_calls=int(os.environ.get('ASR_BREAKER_PROBES', 3))
+    )
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=int(os.environ.get('ASR_LIMIT_INITIAL', 16)),
+        min_limit=int(os.environ.get('ASR_LIMIT_MIN', 2)),
+        max_limit=int(os.environ.get('ASR_LIMIT_MAX', 64)),
+        backoff=float(os.environ.get('ASR_LIMIT_BACKOFF', 0.5)),
+        latency_tolerance=float(os.environ.get('ASR_LIMIT_LATENCY_TOLERANCE', 2.0)),
+        max_wait=float(os.environ.get('ASR_LIMIT_MAX_WAIT', 2))
+    )
+    return ASRGuard(breaker, limiter)
@@ -0,0 +1,287 @@
+"""
+Audio decoders for formats soundfile cannot read (WebM/Opus, MP4).
+FFmpegDecodePool keeps ffmpeg processes spawned ahead of time, blocked on their
+stdin pipe, so a request only streams bytes in and PCM out; a replacement is
+spawned off the request path. When PyAV is installed the same formats can be
+decoded in-process instead.
+"""
+
+import io
+import os
+import abc
+import time
+import queue
+import shutil
+import logging
+import threading
+import subprocess
+
+import numpy as np
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+TARGET_SAMPLE_RATE = 16000
+
+
+class AudioConversionError(Exception):
+    """Raised when a recording cannot be decoded"""
+
+
+class DecoderBusyError(Exception):
+    """Raised when too many recordings are already waiting for a decoder"""
+
+
+class _BoundedDecoder(abc.ABC):
+    """
+    Admission control shared by the decoders: at most `size` decodes run at
+    once, at most `max_waiting` callers queue behind them, and everyone else
+    is turned away with DecoderBusyError.
+    """
+
+    backend = None
+
+    def __init__(self, size: int, max_waiting: int, acquire_timeout: float):
+        self.size = size
+        self.max_waiting = max_waiting
+        self.acquire_timeout = acquire_timeout
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._metrics = {'decodes': 0, 'failures': 0, 'busy_rejections': 0, 'total_decode_seconds': 0.0}
+
+    @abc.abstractmethod
+    def _decode(self, audio_data: bytes) -> np.ndarray:
+        """Decode one recording to mono float32 samples at the target rate"""
+
+    def decode(self, audio_data: bytes) -> np.ndarray:
+        """
+        Decode a recording to mono float32 samples.
+
+        Raises:
+            DecoderBusyError: If the wait queue is full or no slot frees up in time
+            AudioConversionError: If the input cannot be decoded
+        """
+        with self._lock:
+            if self._waiting >= self.max_waiting:
+                self._metrics['busy_rejections'] += 1
+                raise DecoderBusyError(f"Audio decoder busy: {self._waiting} recordings already waiting")
+            self._waiting += 1
+        try:
+            acquired = self._slots.acquire(timeout=self.acquire_timeout)
+        finally:
+            with self._lock:
+                self._waiting -= 1
+        if not acquired:
+            with self._lock:
+                self._metrics['busy_rejections'] += 1
+            raise DecoderBusyError(f"Audio decoder busy: no slot free after {self.acquire_timeout}s")
+
+        started = time.perf_counter()
+        try:
+            samples = self._decode(audio_data)
+        except Exception as e:
+            with self._lock:
+                self._metrics['failures'] += 1
+            if isinstance(e, AudioConversionError):
+                raise
+            raise AudioConversionError(f"FFmpeg conversion failed: {e}")
+        finally:
+            self._slots.release()
+
+        with self._lock:
+            self._metrics['decodes'] += 1
+            self._metrics['total_decode_seconds'] += time.perf_counter() - started
+        return samples
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['waiting'] = self._waiting
+        total_decode_seconds = metrics.pop('total_decode_seconds')
+        metrics['backend'] = self.backend
+        metrics['avg_decode_ms'] = total_decode_seconds * 1000 / metrics['decodes'] if metrics['decodes'] else 0.0
+        metrics['size'] = self.size
+        metrics['max_waiting'] = self.max_waiting
+        return metrics
+
+
+class FFmpegDecodePool(_BoundedDecoder):
+    """
+    Pre-spawned ffmpeg processes decoding to mono float32 PCM over pipes.
+
+    Each ffmpeg process decodes exactly one input (stdin to EOF), so "warm"
+    means spawned and waiting: the fork/exec and ffmpeg start-up happen before
+    the recording arrives, and a background thread keeps `size` idle processes ready.
+
+    Args:
+        size (int): Concurrent decodes, and warm processes kept ready
+        max_waiting (int): Callers allowed to queue for a slot
+        acquire_timeout (float): Seconds a caller waits for a slot
+        timeout (float): Seconds a single decode may take
+        sample_rate (int): Output sample rate
+    """
+
+    backend = 'ffmpeg'
+
+    def __init__(self, size: int = 4, max_waiting: int = 16, acquire_timeout: float = 10.0,
+                 timeout: float = 20.0, sample_rate: int = TARGET_SAMPLE_RATE):
+        super().__init__(size, max_waiting, acquire_timeout)
+        self.timeout = timeout
+        self.command = [
+            'ffmpeg', '-hide_banner', '-loglevel', 'error', '-nostdin',
+            '-i', 'pipe:0', '-f', 'f32le', '-ac', '1', '-ar', str(sample_rate), 'pipe:1'
+        ]
+        self._metrics.update({'warm_hits': 0, 'cold_spawns': 0})
+        self._idle = queue.Queue()
+        self._refill = threading.Event()
+        self._closed = threading.Event()
+        self._refill_thread = threading.Thread(target=self._run_refill, name='ffmpeg-pool-refill', daemon=True)
+        self._refill_thread.start()
+        self._refill.set()
+
+    def _spawn(self) -> subprocess.Popen:
+        return subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+
+    @staticmethod
+    def _discard(process: subprocess.Popen):
+        """Kill a process that will not be used, reap it and close its pipes"""
+        if process.poll() is None:
+            process.kill()
+        process.wait()
+        for pipe in (process.stdin, process.stdout, process.stderr):
+            if pipe is not None:
+                pipe.close()
+
+    def _run_refill(self):
+        while not self._closed.is_set():
+            self._refill.wait()
+            self._refill.clear()
+            while not self._closed.is_set() and self._idle.qsize() < self.size:
+                try:
+                    self._idle.put(self._spawn())
+                except OSError as e:
+                    logger.error("Failed to spawn ffmpeg: %s", e)
+                    break
+
+    def _take_process(self) -> subprocess.Popen:
+        while True:
+            try:
+                process = self._idle.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    self._metrics['cold_spawns'] += 1
+                return self._spawn()
+            if process.poll() is None:
+                with self._lock:
+                    self._metrics['warm_hits'] += 1
+                return process
+            # Died while idle (e.g. killed by the OS)
+            self._discard(process)
+
+    def _decode(self, audio_data: bytes) -> np.ndarray:
+        process = self._take_process()
+        self._refill.set()
+        try:
+            stdout, stderr = process.communicate(input=audio_data, timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.communicate()
+            raise AudioConversionError(f"FFmpeg conversion failed: timed out after {self.timeout}s")
+        if process.returncode != 0:
+            message = stderr.decode('utf-8', errors='replace').strip()
+            raise AudioConversionError(f"FFmpeg conversion failed: {message[-300:]}")
+        return np.frombuffer(stdout, dtype='<f4')
+
+    def close(self):
+        """Stop refilling and terminate idle processes"""
+        self._closed.set()
+        self._refill.set()
+        while True:
+            try:
+                process = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(process)
+
+    def stats(self) -> dict:
+        metrics = super().stats()
+        metrics['idle_processes'] = self._idle.qsize()
+        return metrics
+
+
+class PyAVDecoder(_BoundedDecoder):
+    """
+    In-process decoder built on PyAV (libavformat/libavcodec bindings).
+
+    Decoding releases the GIL, so no subprocess or pipe is involved at all.
+
+    Args:
+        size (int): Concurrent decodes
+        max_waiting (int): Callers allowed to queue for a slot
+        acquire_timeout (float): Seconds a caller waits for a slot
+        sample_rate (int): Output sample rate
+    """
+
+    backend = 'pyav'
+
+    def __init__(self, size: int = 4, max_waiting: int = 16, acquire_timeout: float = 10.0,
+                 sample_rate: int = TARGET_SAMPLE_RATE):
+        import av
+
+        super().__init__(size, max_waiting, acquire_timeout)
+        self._av = av
+        self.sample_rate = sample_rate
+
+    def _decode(self, audio_data: bytes) -> np.ndarray:
+        resampler = self._av.AudioResampler(format='flt', layout='mono', rate=self.sample_rate)
+        chunks = []
+        with self._av.open(io.BytesIO(audio_data), mode='r') as container:
+            for frame in container.decode(audio=0):
+                for resampled in resampler.resample(frame):
+                    chunks.append(resampled.to_ndarray().reshape(-1))
+        for resampled in resampler.resample(None):
+            chunks.append(resampled.to_ndarray().reshape(-1))
+        return np.concatenate(chunks).astype(np.float32) if chunks else np.zeros(0, dtype=np.float32)
+
+
+@process_singleton
+def get_decoder():
+    """
+    Decoder for formats soundfile cannot read, chosen once per process.
+
+    AUDIO_DECODER selects 'pyav', 'ffmpeg' or 'auto' (PyAV if importable,
+    else ffmpeg if on PATH). Sized by AUDIO_DECODER_POOL_SIZE (default: CPU
+    count), AUDIO_DECODER_MAX_WAITING and FFMPEG_TIMEOUT.
+
+    Returns:
+        FFmpegDecodePool or PyAVDecoder, or None if neither is available
+    """
+    backend = os.environ.get('AUDIO_DECODER', 'auto')
+    if backend not in ('auto', 'pyav', 'ffmpeg'):
+        raise ValueError(f"Unsupported audio decoder: {backend}. Supported: auto, pyav, ffmpeg")
+    size = int(os.environ.get('AUDIO_DECODER_POOL_SIZE', os.cpu_count() or 2))
+    max_waiting = int(os.environ.get('AUDIO_DECODER_MAX_WAITING', size * 4))
+    decoder = None
+    if backend in ('auto', 'pyav'):
+        try:
+            decoder = PyAVDecoder(size=size, max_waiting=max_waiting)
+        except ImportError:
+            if backend == 'pyav':
+                raise ImportError("AUDIO_DECODER=pyav requires the 'av' package (pip install av)")
+    if decoder is None and backend in ('auto', 'ffmpeg') and shutil.which('ffmpeg'):
+        decoder = FFmpegDecodePool(
+            size=size,
+            max_waiting=max_waiting,
+            timeout=float(os.environ.get('FFMPEG_TIMEOUT', 20))
+        )
+    if decoder is None:
+        logger.warning("No audio decoder available for WebM/Opus (install ffmpeg or PyAV)")
+    else:
+        logger.info("Audio decoder: %s x%s", decoder.backend, size)
+    return decoder
@@ -0,0 +1,354 @@
+"""
+Graded crop matching: edit distance, phonetic keys and a BK-tree index.
+Complements the exact substring check with a nearest-crop lookup so results
+can show how close a miss was and which crop the ASR heard instead.
+"""
+
+import unicodedata
+from functools import lru_cache
+from typing import Callable, Iterable, Optional
+
+from text_normalization import normalize_text
+
+# Aspirated and look-alike consonant sounds folded together for the phonetic key
+_SOUND_FOLDS = {
+    'KH': 'K', 'GH': 'G', 'NG': 'N', 'CH': 'C', 'JH': 'J', 'NY': 'N',
+    'TT': 'T', 'TTH': 'T', 'TH': 'T', 'DD': 'D', 'DDH': 'D', 'DH': 'D', 'NN': 'N', 'NNN': 'N',
+    'PH': 'P', 'BH': 'B', 'V': 'B', 'W': 'B', 'SH': 'S', 'SS': 'S', 'LL': 'L', 'LLL': 'L',
+    'RR': 'R', 'RH': 'R', 'Y': 'Y', 'F': 'P', 'Z': 'J', 'Q': 'K'
+}
+_VOWEL_FOLDS = {'AA': 'A', 'II': 'I', 'UU': 'U', 'AI': 'E', 'AU': 'O', 'EE': 'E', 'OO': 'O'}
+
+
+def _pattern_masks(pattern: str) -> dict:
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def _myers(pattern: str, text: str, global_alignment: bool) -> int:
+    """
+    Bit-parallel edit distance (Myers 1999, Hyyro's formulation).
+
+    Each column of the dynamic-programming table is kept as two bit vectors of
+    +1/-1 vertical deltas, so a whole column costs a handful of integer
+    operations instead of len(pattern) Python-level min() calls.
+
+    Returns:
+        int: Global edit distance, or with global_alignment=False the smallest
+            distance between pattern and any substring of text
+    """
+    m = len(pattern)
+    masks = _pattern_masks(pattern)
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv, mv, score = full, 0, m
+    best = score
+    for char in text:
+        eq = masks.get(char, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | ~(xh | pv)
+        mh = pv & xh
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+        # The top row of the table grows by one per column only for a global alignment
+        ph = (ph << 1) | global_alignment
+        mh <<= 1
+        pv = (mh | ~(xv | ph)) & full
+        mv = ph & xv & full
+        if score < best:
+            best = score
+    return score if global_alignment else best
+
+
+def levenshtein(a: str, b: str, max_distance: Optional[int] = None) -> int:
+    """
+    Edit distance between two strings (or two token lists).
+
+    Args:
+        a (str): First string
+        b (str): Second string
+        max_distance (int, optional): Return max_distance + 1 for anything
+            further apart, skipping the computation when the lengths alone rule it out
+
+    Returns:
+        int: Number of insertions, deletions and substitutions
+    """
+    if a == b:
+        return 0
+    if len(a) < len(b):
+        a, b = b, a
+    if not b:
+        distance = len(a)
+    elif max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    else:
+        distance = _myers(b, a, True)
+    if max_distance is not None and distance > max_distance:
+        return max_distance + 1
+    return distance
+
+
+def substring_distance(pattern: str, text: str) -> int:
+    """
+    Smallest edit distance between pattern and any substring of text.
+
+    Returns:
+        int: 0 if pattern occurs in text, otherwise the cheapest approximate occurrence
+    """
+    if not pattern:
+        return 0
+    return _myers(pattern, text, False)
+
+
+@lru_cache(maxsize=8192)
+def _char_sound(char: str) -> str:
+    if char.isascii():
+        if char.isdigit():
+            return char
+        if char.isalpha():
+            upper = char.upper()
+            return _SOUND_FOLDS.get(upper, upper) if upper not in 'AEIOU' else ''
+        return ''
+
+    name = unicodedata.name(char, '')
+    if 'ANUSVARA' in name or 'CANDRABINDU' in name or 'TIPPI' in name or 'BINDI' in name:
+        return 'N'
+    if 'LETTER' in name:
+        sound = name.split('LETTER ', 1)[1].split()[-1]
+        if 'VOCALIC' in name:
+            return 'R'
+        if sound in ('A', 'AA', 'I', 'II', 'U', 'UU', 'E', 'EE', 'AI', 'O', 'OO', 'AU'):
+            # Independent vowel letters keep a vowel class so word-initial vowels still count
+            return _VOWEL_FOLDS.get(sound, sound)
+        consonant = sound[:-1] if sound.endswith('A') and len(sound) > 1 else sound
+        return _SOUND_FOLDS.get(consonant, consonant)
+    if char.isdigit():
+        return str(unicodedata.digit(char, ''))
+    # Vowel signs, virama, nukta and punctuation carry no consonant sound
+    return ''
+
+
+def phonetic_key(text: str) -> str:
+    """
+    Script-independent consonant skeleton of a word.
+
+    Consonants from any Brahmic script are reduced to their Unicode sound name
+    with aspiration and retroflexion folded (ख/क -> K, ट/त -> T, श/ष/स -> S,
+    व/ब -> B); vowel signs are dropped and repeats collapsed.
+
+    Returns:
+        str: Phonetic key, e.g. 'CBL' for चावल
+    """
+    key = []
+    for char in normalize_text(text):
+        if char == ' ':
+            continue
+        sound = _char_sound(char)
+        if sound and (not key or key[-1] != sound):
+            key.append(sound)
+    return ''.join(key)
+
+
+class BKTree:
+    """
+    Burkhard-Keller tree for nearest-neighbour search under an integer metric.
+
+    Args:
+        words: Words to index
+        distance (callable): Metric, levenshtein by default
+    """
+
+    def __init__(self, words: Iterable[str] = (), distance: Callable[[str, str], int] = levenshtein):
+        self.distance = distance
+        self._root = None
+        self._size = 0
+        for word in words:
+            self.add(word)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, word: str):
+        """Insert a word; duplicates are ignored"""
+        if self._root is None:
+            self._root = (word, {})
+            self._size = 1
+            return
+        node_word, children = self._root
+        while True:
+            d = self.distance(word, node_word)
+            if d == 0:
+                return
+            child = children.get(d)
+            if child is None:
+                children[d] = (word, {})
+                self._size += 1
+                return
+            node_word, children = child
+
+    def search(self, query: str, max_distance: int) -> list:
+        """
+        All indexed words within max_distance of query.
+
+        Returns:
+            list: (distance, word) tuples sorted by distance
+        """
+        if self._root is None:
+            return []
+        found = []
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            d = self.distance(query, node_word)
+            if d <= max_distance:
+                found.append((d, node_word))
+            for edge, child in children.items():
+                if d - max_distance <= edge <= d + max_distance:
+                    stack.append(child)
+        return sorted(found)
+
+    def nearest(self, query: str, max_distance: Optional[int] = None) -> Optional[tuple]:
+        """
+        The closest indexed word, shrinking the search radius as better matches are found.
+
+        Returns:
+            tuple: (distance, word), or None if nothing is within max_distance
+        """
+        if self._root is None:
+            return None
+        best = None
+        radius = max_distance if max_distance is not None else float('inf')
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            d = self.distance(query, node_word)
+            if d <= radius and (best is None or (d, node_word) < best):
+                best = (d, node_word)
+                radius = d
+            for edge, child in children.items():
+                if d - radius <= edge <= d + radius:
+                    stack.append(child)
+        return best
+
+
+class CropIndex:
+    """
+    BK-tree index over a normalized crop vocabulary.
+
+    Args:
+        crop_names: Crop vocabulary
+    """
+
+    def __init__(self, crop_names: Iterable[str]):
+        self._by_normalized = {}
+        for crop_name in crop_names:
+            normalized = normalize_text(crop_name)
+            if normalized:
+                self._by_normalized.setdefault(normalized, crop_name)
+        self.tree = BKTree(self._by_normalized)
+        self.max_words = max((len(name.split()) for name in self._by_normalized), default=1)
+
+    def _windows(self, normalized_transcript: str) -> list:
+        # Longest windows first, so on a tie a multi-word crop wins over one of its words
+        tokens = normalized_transcript.split()
+        return list(dict.fromkeys(
+            ' '.join(tokens[start:start + size])
+            for size in range(min(self.max_words, len(tokens)), 0, -1)
+            for start in range(len(tokens) - size + 1)
+        ))
+
+    def nearest(self, transcript: str) -> Optional[tuple]:
+        """
+        Closest vocabulary crop to any word window of the transcript.
+
+        Returns:
+            tuple: (crop_name, distance, window), or None for an empty transcript
+        """
+        best = None
+        for window in self._windows(normalize_text(transcript)):
+            radius = best[1] if best else None
+            found = self.tree.nearest(window, radius)
+            if found and (best is None or found[0] < best[1]):
+                best = (self._by_normalized[found[1]], found[0], window)
+                if found[0] == 0:
+                    break
+        return best
+
+
+def score_transcript(transcript: str, crop_name: Optional[str] = None, language: Optional[str] = None,
+                     index: Optional[CropIndex] = None, confusion_cer: float = 0.34) -> dict:
+    """
+    Graded crop scoring for one transcript.
+
+    Args:
+        transcript (str): ASR transcript
+        crop_name (str, optional): The crop the tester was prompted with
+        language (str, optional): Language whose vocabulary index to search
+        index (CropIndex, optional): Explicit index, overriding language
+        confusion_cer (float): Maximum character error rate for the nearest
+            crop to be reported as a confusion candidate
+
+    Returns:
+        dict: best_match, distance, best_match_cer, phonetic_distance, crop_cer
+            (prompted crop vs. its closest substring of the transcript) and
+            confusion_candidate (a different crop the ASR likely heard instead)
+    """
+    if index is None and language:
+        index = get_language_index(language.lower())
+    normalized = normalize_text(transcript)
+    score = {
+        'best_match': None,
+        'distance': None,
+        'best_match_cer': None,
+        'phonetic_distance': None,
+        'crop_cer': None,
+        'confusion_candidate': None
+    }
+
+    expected_distance = None
+    if crop_name:
+        expected = normalize_text(crop_name)
+        if expected:
+            expected_distance = substring_distance(expected, normalized)
+            score['crop_cer'] = round(expected_distance / len(expected), 4)
+
+    nearest = index.nearest(transcript) if index is not None else None
+    if nearest is not None:
+        best_match, distance, _ = nearest
+        if expected_distance is not None and expected_distance <= distance:
+            best_match, distance = crop_name, expected_distance
+        score['best_match'] = best_match
+        score['distance'] = distance
+        score['best_match_cer'] = round(distance / max(len(normalize_text(best_match)), 1), 4)
+        score['phonetic_distance'] = substring_distance(phonetic_key(best_match), phonetic_key(normalized))
+
+        if (crop_name and best_match != crop_name and
+                score['best_match_cer'] <= confusion_cer and
+                (score['crop_cer'] is None or score['crop_cer'] > 0)):
+            score['confusion_candidate'] = best_match
+    elif expected_distance is not None:
+        score['best_match'] = crop_name
+        score['distance'] = expected_distance
+        score['best_match_cer'] = score['crop_cer']
+        score['phonetic_distance'] = substring_distance(phonetic_key(crop_name), phonetic_key(normalized))
+
+    return score
+
+
+@lru_cache(maxsize=None)
+def get_language_index(language: str) -> Optional[CropIndex]:
+    """
+    Return the crop index for a language's vocabulary, built once per process.
+
+    Returns:
+        CropIndex: Index, or None if the language has no vocabulary
+    """
+    from keyword_matcher import load_language_vocabulary
+
+    vocabulary = load_language_vocabulary(language)
+    return CropIndex(vocabulary) if vocabulary else None
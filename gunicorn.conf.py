@@ -0,0 +1,170 @@
+"""
+Gunicorn configuration for production serving.
+Run with `gunicorn -c gunicorn.conf.py app:app` (the Procfile and Dockerfile do).
+Worker and thread counts are derived from the CPU count and can be overridden
+with WEB_CONCURRENCY / WEB_THREADS; WEB_WORKER_CLASS=gevent switches to
+cooperative workers for the I/O-bound /submit_recording path. Send SIGHUP to
+the master for a graceful reload.
+
+Setting WEB_MAX_WORKERS above WEB_CONCURRENCY turns on autoscaling: the master
+watches how many requests are in flight across workers and adds a worker
+(SIGTTIN) while they are nearly all busy, then removes one (SIGTTOU) once load
+drops, never going below WEB_MIN_WORKERS (default WEB_CONCURRENCY). With PROMETHEUS_MULTIPROC_DIR set, /metrics
+aggregates the stage histograms of all workers (see tracing.py).
+"""
+
+import os
+import time
+import signal
+import logging
+import threading
+import multiprocessing
+
+logger = logging.getLogger('gunicorn.error')
+
+cpu_count = multiprocessing.cpu_count()
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+
+# 'gthread' (default): threaded sync workers; 'gevent': one greenlet per request
+# (needs `pip install gevent`), suited to requests that mostly wait on the ASR API
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'gthread')
+if worker_class not in ('gthread', 'gevent', 'sync'):
+    raise ValueError(f"Unsupported worker class: {worker_class}. Supported: gthread, gevent, sync")
+if worker_class == 'gevent':
+    try:
+        import gevent  # noqa: F401
+    except ImportError:
+        raise ImportError("WEB_WORKER_CLASS=gevent requires the 'gevent' package (pip install gevent)")
+
+# One process per core plus one, so a worker stuck in numpy/decoding work does not idle a core
+workers = int(os.environ.get('WEB_CONCURRENCY', cpu_count + 1))
+# Requests spend most of their time waiting on the ASR API, so run several per worker
+threads = int(os.environ.get('WEB_THREADS', max(4, cpu_count * 2)))
+if worker_class == 'gevent':
+    worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 200))
+# Concurrent requests one worker can serve
+worker_capacity = worker_connections if worker_class == 'gevent' else threads
+
+# Autoscaling bounds; off unless WEB_MAX_WORKERS is above the minimum
+min_workers = int(os.environ.get('WEB_MIN_WORKERS', workers))
+max_workers = max(int(os.environ.get('WEB_MAX_WORKERS', workers)), min_workers)
+# Add a worker above this share of busy request slots, remove one below the lower share
+scale_up_load = float(os.environ.get('WEB_SCALE_UP_LOAD', 0.75))
+scale_down_load = float(os.environ.get('WEB_SCALE_DOWN_LOAD', 0.25))
+# Seconds between load checks; a scale-down needs the load to stay low for 3 checks in a row
+scale_interval = float(os.environ.get('WEB_SCALE_INTERVAL', 10))
+
+# A long recording may be chunked, compared across models and retried; stay above
+# ASR_READ_TIMEOUT x (ASR_MAX_RETRIES + 1)
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 30))
+# Behind Render's proxy, keep idle connections open longer than its idle timeout
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 75))
+
+# Recycling workers drops queued async jobs, so it is opt-in
+# (job state is shared between workers through ASR_JOB_DB_PATH, but the work is not)
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+
+# app.py starts background threads (write-behind flusher, analytics refresh) at import;
+# they must be started in each worker, not in the master before fork
+preload_app = False
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG', '-')
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+# Split the decoder processes across workers instead of giving each worker one per core
+os.environ.setdefault('AUDIO_DECODER_POOL_SIZE', str(max(2, cpu_count // workers + 1)))
+
+
+def on_starting(server):
+    # Multiprocess metric files from a previous run would be summed into this one
+    multiproc_dir = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if multiproc_dir:
+        os.makedirs(multiproc_dir, exist_ok=True)
+        for name in os.listdir(multiproc_dir):
+            if name.endswith('.db'):
+                os.remove(os.path.join(multiproc_dir, name))
+    server.log.info("Serving with %s %s workers x %s %s, keep-alive %ss", workers, worker_class,
+                    worker_capacity, 'connections' if worker_class == 'gevent' else 'threads', keepalive)
+
+    # In-flight request counts, one slot per worker, in shared memory the forked workers
+    # inherit. Kept on the arbiter so hooks reloaded by SIGHUP keep using the same array
+    server.request_slots = multiprocessing.Array('i', max(max_workers, workers))
+    server.free_slots = list(range(len(server.request_slots)))
+    if max_workers > min_workers:
+        server.log.info("Autoscaling between %s and %s workers", min_workers, max_workers)
+
+
+def when_ready(server):
+    if max_workers > min_workers:
+        threading.Thread(target=_autoscale, args=(server,), name='autoscale', daemon=True).start()
+
+
+def _autoscale(server):
+    # Runs in the master next to the arbiter loop and only sends it signals:
+    # the arbiter itself forks and retires workers when it handles them
+    quiet_checks = 0
+    while True:
+        time.sleep(scale_interval)
+        running = server.num_workers
+        load = sum(server.request_slots[:]) / float(running * worker_capacity or 1)
+        if load >= scale_up_load and running < max_workers:
+            quiet_checks = 0
+            os.kill(server.pid, signal.SIGTTIN)
+        elif load <= scale_down_load and running > min_workers:
+            quiet_checks += 1
+            if quiet_checks >= 3:
+                quiet_checks = 0
+                os.kill(server.pid, signal.SIGTTOU)
+        else:
+            quiet_checks = 0
+
+
+def pre_fork(server, worker):
+    # Workers started beyond the slot count (e.g. by a manual TTIN) are not counted
+    worker.request_slots = server.request_slots
+    worker.request_slot = server.free_slots.pop(0) if server.free_slots else None
+
+
+def pre_request(worker, req):
+    if worker.request_slot is not None:
+        with worker.request_slots.get_lock():
+            worker.request_slots[worker.request_slot] += 1
+
+
+def post_request(worker, req, environ, resp):
+    if worker.request_slot is not None:
+        with worker.request_slots.get_lock():
+            worker.request_slots[worker.request_slot] -= 1
+
+
+def worker_exit(server, worker):
+    # Flush journaled Azure uploads and kill idle ffmpeg processes before the worker goes away
+    import decode_pool
+    from result_writer import get_result_writer
+
+    if os.environ.get('AZURE_WRITE_BEHIND', 'true').lower() == 'true':
+        try:
+            get_result_writer().stop(flush=True)
+        except Exception as e:
+            server.log.error("Write-behind flush on exit failed: %s", e)
+    # Only close a decoder the worker actually created
+    decoder = decode_pool.get_decoder.peek()
+    if decoder is not None:
+        decoder.close()
+
+
+def child_exit(server, worker):
+    # A worker killed mid-request leaves its count behind; clear it before reusing the slot
+    if worker.request_slot is not None:
+        server.request_slots[worker.request_slot] = 0
+        server.free_slots.append(worker.request_slot)
+
+    # Runs in the master; drops the dead worker's live-gauge files (its counters and
+    # histograms stay in the totals, as Prometheus expects)
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
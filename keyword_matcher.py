@@ -0,0 +1,257 @@
+"""
+Compiled multi-pattern crop name matcher.
+Builds an Aho-Corasick automaton over a crop vocabulary once, then finds every
+crop mentioned in a transcript in a single pass over the text.
+"""
+
+import os
+import json
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Callable, Iterable, NamedTuple, Optional
+
+from text_normalization import normalize_batch, normalize_text, normalize_vocabulary
+
+logger = logging.getLogger(__name__)
+
+CROPS_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'crops.json')
+
+
+def default_normalize(text: str) -> str:
+    """Normalization applied to crop names and transcripts before matching"""
+    return normalize_text(text)
+
+
+class KeywordMatch(NamedTuple):
+    """
+    One crop mention found in a transcript.
+
+    Attributes:
+        crop_name (str): Crop name as given in the vocabulary
+        start (int): Start offset in the normalized transcript
+        end (int): End offset (exclusive) in the normalized transcript
+        exact (bool): True if the whole crop name matched, False if it was
+            detected from its individual words appearing separately
+    """
+    crop_name: str
+    start: int
+    end: int
+    exact: bool
+
+
+class KeywordMatcher:
+    """
+    Aho-Corasick automaton over a crop vocabulary.
+
+    A crop is detected when its full normalized name occurs in the transcript
+    or, for multi-word names, when every word occurs somewhere in it. This is
+    the same rule check_keyword_match has always applied.
+
+    Args:
+        crop_names: Crop vocabulary
+        normalize (callable): Text normalization applied to crops and transcripts
+    """
+
+    def __init__(self, crop_names: Iterable[str], normalize: Callable[[str], str] = default_normalize):
+        self.normalize = normalize
+        self._patterns = []
+        self._pattern_ids = {}
+        # crop_name -> (full pattern id, tuple of word pattern ids)
+        self._crops = {}
+
+        crop_names = tuple(crop_names)
+        if normalize is default_normalize:
+            normalized_names = normalize_vocabulary(crop_names)
+        else:
+            normalized_names = [normalize(crop_name) for crop_name in crop_names]
+
+        for crop_name, normalized in zip(crop_names, normalized_names):
+            if crop_name in self._crops:
+                continue
+            if not normalized:
+                continue
+            words = normalized.split()
+            word_ids = tuple(self._add_pattern(word) for word in words) if len(words) > 1 else ()
+            self._crops[crop_name] = (self._add_pattern(normalized), word_ids)
+
+        # pattern id -> crops using it, so a scan only checks crops it touched
+        self._pattern_crops = [[] for _ in self._patterns]
+        for crop_name, (full_id, word_ids) in self._crops.items():
+            for pattern_id in {full_id, *word_ids}:
+                self._pattern_crops[pattern_id].append(crop_name)
+
+        self._build()
+
+    def _add_pattern(self, pattern: str) -> int:
+        if pattern not in self._pattern_ids:
+            self._pattern_ids[pattern] = len(self._patterns)
+            self._patterns.append(pattern)
+        return self._pattern_ids[pattern]
+
+    def _build(self):
+        goto = [{}]
+        output = [[]]
+        for pattern_id, pattern in enumerate(self._patterns):
+            state = 0
+            for char in pattern:
+                next_state = goto[state].get(char)
+                if next_state is None:
+                    next_state = len(goto)
+                    goto[state][char] = next_state
+                    goto.append({})
+                    output.append([])
+                state = next_state
+            output[state].append(pattern_id)
+
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in goto[state].items():
+                queue.append(next_state)
+                fallback = fail[state]
+                while fallback and char not in goto[fallback]:
+                    fallback = fail[fallback]
+                fail[next_state] = goto[fallback].get(char, 0)
+                output[next_state] = output[next_state] + output[fail[next_state]]
+
+        self._goto = goto
+        self._fail = fail
+        self._output = output
+
+    @property
+    def crop_names(self) -> list:
+        """Crop vocabulary in insertion order"""
+        return list(self._crops)
+
+    def _scan(self, text: str) -> dict:
+        """Return the first (start, end) span of every pattern occurring in text"""
+        goto, fail, output = self._goto, self._fail, self._output
+        spans = {}
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern_id in output[state]:
+                if pattern_id not in spans:
+                    end = index + 1
+                    spans[pattern_id] = (end - len(self._patterns[pattern_id]), end)
+        return spans
+
+    def find_all(self, transcript: str) -> list:
+        """
+        Find every vocabulary crop mentioned in a transcript, in one pass.
+
+        Args:
+            transcript (str): ASR transcript
+
+        Returns:
+            list: KeywordMatch entries ordered by position
+        """
+        return self._match_normalized(self.normalize(transcript))
+
+    def find_all_many(self, transcripts: Iterable[str]) -> list:
+        """
+        Find crop mentions for a batch of transcripts.
+
+        With the default normalization the whole batch is normalized in one
+        pass before scanning.
+
+        Returns:
+            list: One list of KeywordMatch entries per transcript
+        """
+        if self.normalize is default_normalize:
+            normalized = normalize_batch(transcripts)
+        else:
+            normalized = [self.normalize(transcript) for transcript in transcripts]
+        return [self._match_normalized(text) for text in normalized]
+
+    def _match_normalized(self, text: str) -> list:
+        spans = self._scan(text)
+        candidates = {crop_name for pattern_id in spans for crop_name in self._pattern_crops[pattern_id]}
+        matches = []
+        for crop_name in candidates:
+            full_id, word_ids = self._crops[crop_name]
+            if full_id in spans:
+                start, end = spans[full_id]
+                matches.append(KeywordMatch(crop_name, start, end, True))
+            elif word_ids and all(word_id in spans for word_id in word_ids):
+                word_spans = [spans[word_id] for word_id in word_ids]
+                matches.append(KeywordMatch(
+                    crop_name,
+                    min(start for start, _ in word_spans),
+                    max(end for _, end in word_spans),
+                    False
+                ))
+        matches.sort(key=lambda match: (match.start, match.end, match.crop_name))
+        return matches
+
+    def detected(self, transcript: str) -> set:
+        """Return the set of vocabulary crops detected in a transcript"""
+        return {match.crop_name for match in self.find_all(transcript)}
+
+    def matches(self, transcript: str, crop_name: str) -> bool:
+        """
+        Check whether one crop is detected in a transcript.
+
+        Crops outside the vocabulary are matched with a one-off matcher.
+        """
+        if crop_name not in self._crops:
+            if not self.normalize(crop_name):
+                # An empty name is trivially contained in any transcript
+                return True
+            return compile_matcher((crop_name,)).matches(transcript, crop_name)
+        full_id, word_ids = self._crops[crop_name]
+        spans = self._scan(self.normalize(transcript))
+        return full_id in spans or (bool(word_ids) and all(word_id in spans for word_id in word_ids))
+
+
+@lru_cache(maxsize=4096)
+def compile_matcher(crop_names: tuple) -> KeywordMatcher:
+    """
+    Build (or reuse) a matcher for a fixed crop list.
+
+    Args:
+        crop_names (tuple): Crop vocabulary; must be hashable
+
+    Returns:
+        KeywordMatcher: Cached matcher
+    """
+    return KeywordMatcher(crop_names)
+
+
+def load_language_vocabulary(language: str) -> list:
+    """
+    Collect the known crop vocabulary for a language.
+
+    Combines sample_crops_data.get_sample_crops with crops.json (Hindi).
+
+    Returns:
+        list: De-duplicated crop names
+    """
+    from sample_crops_data import get_sample_crops
+
+    crops = list(get_sample_crops(language))
+    if language.lower() == 'hindi' and os.path.exists(CROPS_JSON_PATH):
+        try:
+            with open(CROPS_JSON_PATH, 'r', encoding='utf-8') as f:
+                crops.extend(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.error("Failed to load %s: %s", CROPS_JSON_PATH, e)
+    return list(dict.fromkeys(crop.strip() for crop in crops if crop and crop.strip()))
+
+
+@lru_cache(maxsize=None)
+def get_language_matcher(language: str) -> Optional[KeywordMatcher]:
+    """
+    Return the matcher for a language's crop vocabulary, built once per process.
+
+    Returns:
+        KeywordMatcher: Matcher, or None if the language has no vocabulary
+    """
+    vocabulary = load_language_vocabulary(language)
+    if not vocabulary:
+        return None
+    return KeywordMatcher(vocabulary)
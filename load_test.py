@@ -0,0 +1,596 @@
+"""
+Offline load test for the QA flow.
+Boots app.py (under gunicorn by default) against a local mock Saaras server
+with configurable latency/error distributions and a local Azure Blob stand-in,
+then replays concurrent QA sessions: login bypass, /process_csv, /testing,
+repeated /submit_recording, /results and /download_csv. Reports p50/p95/p99
+latency and throughput per endpoint. Needs no network access.
+
+    python load_test.py --users 20 --crops 5 --attempts 3 --asr-latency-ms 400
+"""
+
+import io
+import os
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.sax.saxutils import escape
+
+import numpy as np
+import requests
+import soundfile as sf
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_CROPS = ['गेहूं', 'धान', 'मक्का', 'बाजरा', 'सरसों', 'चना', 'अरहर', 'कपास', 'गन्ना', 'सोयाबीन']
+
+
+class _QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def _send(self, status: int, body: bytes = b'', headers: dict = None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+
+class _StandInServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, handler, owner):
+        super().__init__(('127.0.0.1', 0), handler)
+        self.owner = owner
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class MockSaarasServer:
+    """
+    Stand-in for the Saaras transcription endpoint.
+
+    Latency is log-normal around latency_ms; error_rate of the requests fail
+    with error_status. Each transcript is two words drawn from vocabulary, so
+    with the session's crop list as vocabulary some attempts contain the
+    prompted crop and some do not.
+
+    Args:
+        latency_ms (float): Median response time
+        latency_sigma (float): Log-normal shape; 0 gives a fixed latency
+        error_rate (float): Fraction of requests answered with error_status
+        error_status (int): HTTP status of failed requests (503 is retried by the client)
+        vocabulary (list): Words transcripts are made of
+    """
+
+    def __init__(self, latency_ms: float = 300.0, latency_sigma: float = 0.4, error_rate: float = 0.0,
+                 error_status: int = 500, vocabulary: list = None, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.vocabulary = vocabulary or DEFAULT_CROPS
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+
+        class Handler(_QuietHandler):
+            def do_POST(handler):
+                handler._read_body()
+                status, body = self._respond()
+                handler._send(status, json.dumps(body, ensure_ascii=False).encode('utf-8'),
+                              {'Content-Type': 'application/json'})
+
+        self.server = _StandInServer(Handler, self)
+
+    def _respond(self) -> tuple:
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            delay = self.latency_ms * self._random.lognormvariate(0, self.latency_sigma) / 1000.0
+            failed = self._random.random() < self.error_rate
+            words = self._random.sample(self.vocabulary, min(2, len(self.vocabulary)))
+        try:
+            time.sleep(delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+        if failed:
+            with self._lock:
+                self.errors += 1
+            return self.error_status, {'error': 'mock ASR failure'}
+        return 200, {'transcript': ' '.join(words), 'confidence': 0.9}
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='mock-saaras', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {'requests': self.requests, 'errors': self.errors, 'peak_in_flight': self.peak_in_flight}
+
+
+class BlobStandIn:
+    """
+    In-memory subset of the Azure Blob REST API, enough for azure_service:
+    block blob upload, append blob create/append (with append-position and
+    If-None-Match conditions), ranged download, properties and prefix listing.
+    Authentication headers are accepted without checking, like Azurite's
+    loose mode. Point the app at it with connection_string().
+    """
+
+    account = 'devstoreaccount1'
+    # Azurite's well-known development key; the SDK only needs valid base64
+    account_key = 'Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw=='
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.blobs = {}
+        self.requests = 0
+        self._etag = 0
+
+        class Handler(_QuietHandler):
+            def do_PUT(handler):
+                self._handle(handler)
+
+            def do_GET(handler):
+                self._handle(handler)
+
+            def do_HEAD(handler):
+                self._handle(handler)
+
+        self.server = _StandInServer(Handler, self)
+
+    def connection_string(self) -> str:
+        return (f"DefaultEndpointsProtocol=http;AccountName={self.account};AccountKey={self.account_key};"
+                f"BlobEndpoint={self.server.url}/{self.account};")
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, name='blob-stand-in', daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'blobs': len(self.blobs),
+                'bytes': sum(len(blob['data']) for blob in self.blobs.values())
+            }
+
+    def _error(self, handler, status: int, code: str):
+        body = f'<?xml version="1.0" encoding="utf-8"?><Error><Code>{code}</Code><Message>{code}</Message></Error>'
+        handler._send(status, body.encode('utf-8'), {'Content-Type': 'application/xml', 'x-ms-error-code': code})
+
+    def _blob_headers(self, blob: dict) -> dict:
+        return {
+            'ETag': blob['etag'],
+            'Last-Modified': blob['modified'],
+            'x-ms-creation-time': blob['created'],
+            'x-ms-blob-type': blob['type'],
+            'Content-Type': blob['content_type'],
+            'x-ms-blob-committed-block-count': str(blob['blocks']),
+        }
+
+    def _touch(self, blob: dict):
+        self._etag += 1
+        blob['etag'] = f'"0x{self._etag:016X}"'
+        blob['modified'] = formatdate(usegmt=True)
+
+    def _handle(self, handler):
+        url = urlsplit(handler.path)
+        query = {key: values[0] for key, values in parse_qs(url.query, keep_blank_values=True).items()}
+        parts = unquote(url.path).lstrip('/').split('/', 2)
+        body = handler._read_body() if handler.command == 'PUT' else b''
+        with self._lock:
+            self.requests += 1
+            if len(parts) < 3 or not parts[2]:
+                if query.get('comp') == 'list':
+                    return self._list(handler, parts[1] if len(parts) > 1 else '', query)
+                # Container create/properties: every container exists
+                return handler._send(201 if handler.command == 'PUT' else 200, b'',
+                                     {'ETag': '"0x1"', 'Last-Modified': formatdate(usegmt=True)})
+            key = (parts[1], parts[2])
+            blob = self.blobs.get(key)
+            if handler.command == 'PUT':
+                return self._put(handler, key, blob, query, body)
+            if blob is None:
+                return self._error(handler, 404, 'BlobNotFound')
+            return self._get(handler, blob)
+
+    def _put(self, handler, key, blob, query, body):
+        headers = handler.headers
+        if query.get('comp') == 'appendblock':
+            if blob is None:
+                return self._error(handler, 404, 'BlobNotFound')
+            if blob['type'] != 'AppendBlob':
+                return self._error(handler, 409, 'InvalidBlobType')
+            position = headers.get('x-ms-blob-condition-appendpos')
+            if position is not None and int(position) != len(blob['data']):
+                return self._error(handler, 412, 'AppendPositionConditionNotMet')
+            offset = len(blob['data'])
+            blob['data'] += body
+            blob['blocks'] += 1
+            self._touch(blob)
+            return handler._send(201, b'', {
+                'ETag': blob['etag'], 'Last-Modified': blob['modified'],
+                'x-ms-blob-append-offset': str(offset),
+                'x-ms-blob-committed-block-count': str(blob['blocks']),
+            })
+        if blob is not None and headers.get('If-None-Match') == '*':
+            return self._error(handler, 409, 'BlobAlreadyExists')
+        blob_type = headers.get('x-ms-blob-type', 'BlockBlob')
+        now = formatdate(usegmt=True)
+        blob = {
+            'type': blob_type,
+            'data': body if blob_type == 'BlockBlob' else b'',
+            'content_type': headers.get('x-ms-blob-content-type', 'application/octet-stream'),
+            'created': now,
+            'blocks': 0,
+        }
+        self._touch(blob)
+        self.blobs[key] = blob
+        handler._send(201, b'', {'ETag': blob['etag'], 'Last-Modified': blob['modified']})
+
+    def _get(self, handler, blob):
+        data = blob['data']
+        headers = self._blob_headers(blob)
+        requested = handler.headers.get('x-ms-range') or handler.headers.get('Range')
+        if handler.command == 'HEAD' or not requested:
+            headers['Content-Length'] = str(len(data))
+            self._send_body(handler, 200, data, headers)
+            return
+        match = re.match(r'bytes=(\d+)-(\d*)', requested)
+        start = int(match.group(1))
+        if start >= len(data):
+            return self._error(handler, 416, 'InvalidRange')
+        end = min(int(match.group(2)) if match.group(2) else len(data) - 1, len(data) - 1)
+        headers['Content-Range'] = f"bytes {start}-{end}/{len(data)}"
+        self._send_body(handler, 206, data[start:end + 1], headers)
+
+    def _send_body(self, handler, status, data, headers):
+        headers.pop('Content-Length', None)
+        if handler.command == 'HEAD':
+            # HEAD reports the blob size without a body
+            handler.send_response(status)
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.send_header('Content-Length', str(len(data)))
+            handler.end_headers()
+            return
+        handler._send(status, data, headers)
+
+    def _list(self, handler, container, query):
+        prefix = query.get('prefix', '')
+        entries = []
+        for (blob_container, name), blob in sorted(self.blobs.items()):
+            if blob_container != container or not name.startswith(prefix):
+                continue
+            entries.append(
+                f"<Blob><Name>{escape(name)}</Name><Properties>"
+                f"<Creation-Time>{blob['created']}</Creation-Time>"
+                f"<Last-Modified>{blob['modified']}</Last-Modified>"
+                f"<Etag>{escape(blob['etag'])}</Etag>"
+                f"<Content-Length>{len(blob['data'])}</Content-Length>"
+                f"<Content-Type>{escape(blob['content_type'])}</Content-Type>"
+                f"<BlobType>{blob['type']}</BlobType>"
+                f"</Properties></Blob>"
+            )
+        body = (f'<?xml version="1.0" encoding="utf-8"?>'
+                f'<EnumerationResults ServiceEndpoint="{self.server.url}/{self.account}" ContainerName="{escape(container)}">'
+                f'<Prefix>{escape(prefix)}</Prefix><Blobs>{"".join(entries)}</Blobs><NextMarker/></EnumerationResults>')
+        handler._send(200, body.encode('utf-8'), {'Content-Type': 'application/xml'})
+
+
+def synthetic_recording(seconds: float = 2.5, sample_rate: int = 48000, seed: int = 0) -> bytes:
+    """A browser-like 48 kHz WAV: silence, a voiced burst, silence"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(seconds * sample_rate)) / float(sample_rate)
+    envelope = ((t > 0.4) & (t < seconds - 0.5)).astype(np.float32)
+    voice = 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + 0.5 * np.sin(2 * np.pi * 4 * t))
+    samples = envelope * voice + 0.003 * rng.standard_normal(len(t))
+    buffer = io.BytesIO()
+    sf.write(buffer, samples.astype(np.float32), sample_rate, format='WAV', subtype='PCM_16')
+    return buffer.getvalue()
+
+
+class Recorder:
+    """Thread-safe per-endpoint latency samples"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append((seconds, ok))
+
+    def report(self, wall_seconds: float) -> dict:
+        report = {}
+        with self._lock:
+            samples = {endpoint: list(values) for endpoint, values in self.samples.items()}
+        for endpoint, values in samples.items():
+            latencies = np.array([seconds for seconds, _ in values]) * 1000
+            report[endpoint] = {
+                'count': len(values),
+                'errors': sum(1 for _, ok in values if not ok),
+                'p50_ms': round(float(np.percentile(latencies, 50)), 1),
+                'p95_ms': round(float(np.percentile(latencies, 95)), 1),
+                'p99_ms': round(float(np.percentile(latencies, 99)), 1),
+                'max_ms': round(float(latencies.max()), 1),
+                'throughput_rps': round(len(values) / wall_seconds, 2) if wall_seconds else 0.0,
+            }
+        return report
+
+
+class QASession:
+    """
+    One simulated tester going through the whole flow.
+
+    Endpoints are timed individually (redirects are not followed automatically),
+    so each request counts against its own route.
+    """
+
+    def __init__(self, base_url: str, index: int, recorder: Recorder, crops: list, attempts: int,
+                 think_seconds: float, audio: bytes, language: str = 'hindi'):
+        self.base_url = base_url
+        self.index = index
+        self.recorder = recorder
+        self.crops = crops
+        self.attempts = attempts
+        self.think_seconds = think_seconds
+        self.audio = audio
+        self.language = language
+        self.http = requests.Session()
+        self.errors = []
+
+    def _request(self, endpoint: str, method: str, path: str, ok_statuses=(200, 302), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.http.request(method, self.base_url + path, allow_redirects=False, timeout=120, **kwargs)
+            if endpoint != 'download_csv':
+                response.content
+            else:
+                for _ in response.iter_content(65536):
+                    pass
+            ok = response.status_code in ok_statuses
+        except requests.RequestException as e:
+            self.recorder.record(endpoint, time.perf_counter() - started, False)
+            self.errors.append(f"{endpoint}: {e}")
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - started, ok)
+        if not ok:
+            self.errors.append(f"{endpoint}: HTTP {response.status_code}")
+        return response
+
+    def _think(self):
+        if self.think_seconds:
+            time.sleep(random.uniform(0.5, 1.5) * self.think_seconds)
+
+    def run(self):
+        email = f"loadtest{self.index}@sarvam.ai"
+        response = self._request('login', 'GET', f"/login/bypass?email={email}&name=Load+Tester+{self.index}")
+        if response is None or response.status_code != 302:
+            return
+        user_id = response.headers['Location'].rstrip('/').rsplit('/', 1)[-1]
+        self._request('language_selection', 'GET', f"/language_selection/{user_id}")
+
+        csv_data = '\n'.join(self.crops).encode('utf-8')
+        response = self._request('process_csv', 'POST', '/process_csv',
+                                 data={'user_id': user_id, 'language': self.language},
+                                 files={'csv_file': (f'crops_{self.index}.csv', csv_data, 'text/csv')})
+        location = response.headers.get('Location', '') if response is not None else ''
+        match = re.search(r'/testing/([^/]+)/', location)
+        if not match:
+            self.errors.append('process_csv: no session created')
+            return
+        session_id = match.group(1)
+
+        for crop_index, crop in enumerate(self.crops):
+            self._request('testing', 'GET', f"/testing/{session_id}/{crop_index}")
+            for attempt in range(1, self.attempts + 1):
+                self._think()
+                self._request('submit_recording', 'POST', '/submit_recording', ok_statuses=(200,),
+                              data={'session_id': session_id, 'crop_name': crop, 'attempt_number': attempt},
+                              files={'audio_file': ('recording.wav', self.audio, 'audio/wav')})
+
+        self._request('results', 'GET', f"/results/{session_id}")
+        self._request('download_csv', 'GET', f"/download_csv/{session_id}")
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def boot_app(server: str, port: int, workdir: str, env: dict) -> subprocess.Popen:
+    """
+    Start app.py with its state files in workdir.
+
+    Args:
+        server (str): 'gunicorn' (gunicorn.conf.py) or 'dev' (python app.py)
+
+    Returns:
+        subprocess.Popen: The server process, once it answers HTTP
+    """
+    env = dict(os.environ, **env, PORT=str(port), PYTHONPATH=REPO_DIR)
+    if server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', os.path.join(REPO_DIR, 'gunicorn.conf.py'), 'app:app']
+    else:
+        command = [sys.executable, os.path.join(REPO_DIR, 'app.py')]
+    log = open(os.path.join(workdir, 'server.log'), 'wb')
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log, stderr=subprocess.STDOUT)
+
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with {process.returncode}; see {log.name}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/qa_guide", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.25)
+    process.kill()
+    raise RuntimeError(f"Server did not start within 60s; see {log.name}")
+
+
+def run_load_test(base_url: str, users: int, crops: list, attempts: int, ramp_seconds: float,
+                  think_seconds: float, audio: bytes) -> tuple:
+    """
+    Run `users` QA sessions concurrently, starting them evenly over ramp_seconds.
+
+    Returns:
+        tuple: (per-endpoint report, wall seconds, error messages)
+    """
+    recorder = Recorder()
+    sessions = [QASession(base_url, index, recorder, crops, attempts, think_seconds, audio) for index in range(users)]
+    threads = []
+    started = time.perf_counter()
+    for index, qa_session in enumerate(sessions):
+        thread = threading.Thread(target=qa_session.run, name=f"qa-session-{index}", daemon=True)
+        thread.start()
+        threads.append(thread)
+        if ramp_seconds and users > 1:
+            time.sleep(ramp_seconds / (users - 1))
+    for thread in threads:
+        thread.join()
+    wall_seconds = time.perf_counter() - started
+    errors = [error for qa_session in sessions for error in qa_session.errors]
+    return recorder.report(wall_seconds), wall_seconds, errors
+
+
+def print_report(report: dict, wall_seconds: float):
+    order = ['login', 'language_selection', 'process_csv', 'testing', 'submit_recording', 'results', 'download_csv']
+    print(f"\n{'endpoint':<20}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'req/s':>9}")
+    for endpoint in sorted(report, key=lambda name: order.index(name) if name in order else len(order)):
+        entry = report[endpoint]
+        print(f"{endpoint:<20}{entry['count']:>7}{entry['errors']:>8}{entry['p50_ms']:>10}{entry['p95_ms']:>10}"
+              f"{entry['p99_ms']:>10}{entry['max_ms']:>10}{entry['throughput_rps']:>9}")
+    print(f"\nWall time {wall_seconds:.1f}s")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--users', type=int, default=10, help='Concurrent QA sessions')
+    parser.add_argument('--crops', type=int, default=5, help='Crops per session CSV')
+    parser.add_argument('--attempts', type=int, default=3, help='Recordings per crop')
+    parser.add_argument('--ramp', type=float, default=2.0, help='Seconds over which sessions start')
+    parser.add_argument('--think', type=float, default=0.2, help='Mean pause before each recording, seconds')
+    parser.add_argument('--audio-seconds', type=float, default=2.5, help='Length of the synthetic recording')
+    parser.add_argument('--asr-latency-ms', type=float, default=300.0, help='Median mock ASR latency')
+    parser.add_argument('--asr-latency-sigma', type=float, default=0.4, help='Log-normal spread of mock ASR latency')
+    parser.add_argument('--asr-error-rate', type=float, default=0.0, help='Fraction of mock ASR calls that fail')
+    parser.add_argument('--asr-error-status', type=int, default=500, help='HTTP status of failed mock ASR calls')
+    parser.add_argument('--server', choices=['gunicorn', 'dev'], default='gunicorn', help='How to boot app.py')
+    parser.add_argument('--target', help='Load an already running instance instead of booting one '
+                                         '(it must run with LOGIN_BYPASS=true)')
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='Extra environment for the booted app, e.g. --env WEB_CONCURRENCY=2')
+    parser.add_argument('--max-error-rate', type=float, default=0.0,
+                        help='Exit non-zero when more than this fraction of requests fail')
+    parser.add_argument('--json', help='Also write the report to this file')
+    parser.add_argument('--keep', action='store_true', help='Keep the working directory (server.log, databases)')
+    args = parser.parse_args(argv)
+
+    crops = (DEFAULT_CROPS * (args.crops // len(DEFAULT_CROPS) + 1))[:args.crops]
+    audio = synthetic_recording(args.audio_seconds)
+    asr = blobs = process = None
+    workdir = tempfile.mkdtemp(prefix='asr-loadtest-')
+    try:
+        if args.target:
+            base_url = args.target.rstrip('/')
+        else:
+            asr = MockSaarasServer(args.asr_latency_ms, args.asr_latency_sigma, args.asr_error_rate,
+                                   args.asr_error_status, vocabulary=crops).start()
+            blobs = BlobStandIn().start()
+            os.makedirs(os.path.join(workdir, 'uploads'))
+            env = {
+                'LOGIN_BYPASS': 'true',
+                'SARVAM_API_KEY': 'loadtest',
+                'SAARAS_API_URL': f"{asr.server.url}/audio/transcriptions",
+                'AZURE_STORAGE_CONNECTION_STRING': blobs.connection_string(),
+                'AZURE_STORAGE_ACCOUNT_NAME': BlobStandIn.account,
+                'AZURE_STORAGE_ACCOUNT_KEY': BlobStandIn.account_key,
+                'AZURE_STORAGE_CONTAINER_NAME': 'loadtest',
+                'RESULTS_DB_PATH': os.path.join(workdir, 'asr_testing.db'),
+                'SESSION_DB_PATH': os.path.join(workdir, 'sessions.db'),
+                'AZURE_JOURNAL_PATH': os.path.join(workdir, 'result_journal.db'),
+                'TRANSCRIPTION_CACHE_PATH': os.path.join(workdir, 'transcription_cache.db'),
+                'ANALYTICS_STATE_PATH': os.path.join(workdir, 'analytics_state.npz'),
+            }
+            for item in args.env:
+                name, _, value = item.partition('=')
+                env[name] = value
+            port = _free_port()
+            process = boot_app(args.server, port, workdir, env)
+            base_url = f"http://127.0.0.1:{port}"
+
+        print(f"Load testing {base_url}: {args.users} users x {args.crops} crops x {args.attempts} attempts")
+        report, wall_seconds, errors = run_load_test(base_url, args.users, crops, args.attempts,
+                                                     args.ramp, args.think, audio)
+        print_report(report, wall_seconds)
+        summary = {'endpoints': report, 'wall_seconds': round(wall_seconds, 2), 'errors': errors[:50]}
+        if asr is not None:
+            summary['mock_asr'] = asr.stats()
+            summary['blob_stand_in'] = blobs.stats()
+            print(f"Mock ASR: {summary['mock_asr']}")
+            print(f"Blob stand-in: {summary['blob_stand_in']}")
+        if errors:
+            print(f"{len(errors)} errors, first: {errors[:5]}")
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(summary, f, indent=2, ensure_ascii=False)
+        requests_made = sum(entry['count'] for entry in report.values())
+        return 1 if not requests_made or len(errors) > args.max_error_rate * requests_made else 0
+    finally:
+        if process is not None:
+            process.terminate()
+            try:
+                process.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for server in (asr, blobs):
+            if server is not None:
+                server.stop()
+        if args.keep:
+            print(f"Working directory kept: {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
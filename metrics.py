@@ -0,0 +1,291 @@
+"""
+Word and character error rates between prompted reference texts and ASR transcripts.
+Only results that carry the text the tester was asked to read are scored: in the
+keyword flow testers speak free sentences around a crop name, and scoring those
+against the bare crop name would report a correct transcript as a 500% WER.
+Edit distances for a whole batch are computed together: with NumPy the DP runs
+one reference position at a time across every pair at once; without it each
+pair uses the bit-parallel distance from fuzzy_match.
+"""
+
+import logging
+from collections import defaultdict
+from typing import Callable, Iterable, Optional, Union
+
+from fuzzy_match import levenshtein
+from text_normalization import normalize_batch
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+# Pairs processed per vectorized chunk; bounds the (chunk, hypothesis length) work arrays
+CHUNK_SIZE = 4096
+
+
+def _encode(texts: list, unit: str, vocabulary: dict):
+    """Flatten texts into one int array of token ids plus per-text lengths"""
+    if unit == 'char':
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+        codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype='<u4').astype(np.int64)
+    else:
+        # Split like the Python backend so unnormalized whitespace cannot misalign the offsets
+        token_lists = [text.split() for text in texts]
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64, count=len(texts))
+        tokens = [token for text_tokens in token_lists for token in text_tokens]
+        for token in dict.fromkeys(tokens):
+            vocabulary.setdefault(token, len(vocabulary))
+        codes = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+    return codes, lengths
+
+
+def _pad(codes, lengths, offsets, rows, fill: int):
+    """Gather the selected sequences into a (len(rows), max length) matrix"""
+    selected = lengths[rows]
+    width = int(selected.max()) if len(rows) else 0
+    matrix = np.full((len(rows), max(width, 1)), fill, dtype=np.int64)
+    total = int(selected.sum())
+    if total:
+        row_index = np.repeat(np.arange(len(rows)), selected)
+        starts = np.repeat(offsets[rows], selected)
+        positions = np.arange(total) - np.repeat(np.cumsum(selected) - selected, selected)
+        matrix[row_index, positions] = codes[starts + positions]
+    return matrix, width
+
+
+def _distances_numpy(references: list, hypotheses: list, unit: str):
+    vocabulary = {}
+    ref_codes, ref_lengths = _encode(references, unit, vocabulary)
+    hyp_codes, hyp_lengths = _encode(hypotheses, unit, vocabulary)
+    ref_offsets = np.cumsum(ref_lengths) - ref_lengths
+    hyp_offsets = np.cumsum(hyp_lengths) - hyp_lengths
+
+    distances = np.empty(len(references), dtype=np.int64)
+    # Similar lengths share a chunk, so little of each matrix is padding
+    order = np.lexsort((ref_lengths, hyp_lengths))
+    for start in range(0, len(order), CHUNK_SIZE):
+        rows = order[start:start + CHUNK_SIZE]
+        ref, ref_width = _pad(ref_codes, ref_lengths, ref_offsets, rows, -1)
+        hyp, hyp_width = _pad(hyp_codes, hyp_lengths, hyp_offsets, rows, -2)
+        row_ref_lengths = ref_lengths[rows]
+        row_hyp_lengths = hyp_lengths[rows]
+
+        columns = np.arange(hyp_width + 1)
+        previous = np.broadcast_to(columns, (len(rows), hyp_width + 1)).copy()
+        # An empty reference costs one insertion per hypothesis token
+        chunk = row_hyp_lengths.copy()
+        for i in range(1, ref_width + 1):
+            mismatch = ref[:, i - 1:i] != hyp[:, :hyp_width]
+            current = np.empty_like(previous)
+            current[:, 0] = i
+            np.minimum(previous[:, 1:] + 1, previous[:, :-1] + mismatch, out=current[:, 1:])
+            # Insertions chain left to right: cur[j] = min_k (t[k] + j - k), a running minimum
+            current = np.minimum.accumulate(current - columns, axis=1) + columns
+            finished = row_ref_lengths == i
+            if finished.any():
+                chunk[finished] = current[finished, row_hyp_lengths[finished]]
+            previous = current
+        distances[rows] = chunk
+    return distances.tolist()
+
+
+def _distances_python(references: list, hypotheses: list, unit: str) -> list:
+    if unit == 'char':
+        return [levenshtein(ref, hyp) for ref, hyp in zip(references, hypotheses)]
+    return [levenshtein(ref.split(), hyp.split()) for ref, hyp in zip(references, hypotheses)]
+
+
+def edit_distances(references: list, hypotheses: list, unit: str = 'char',
+                   backend: Optional[str] = None) -> list:
+    """
+    Levenshtein distance for every (reference, hypothesis) pair.
+
+    Args:
+        references (list): Reference texts
+        hypotheses (list): Hypothesis texts, aligned with references
+        unit (str): 'char' or 'word'
+        backend (str, optional): 'numpy' or 'python'; NumPy when installed by default
+
+    Returns:
+        list: One distance per pair
+    """
+    if len(references) != len(hypotheses):
+        raise ValueError(f"Got {len(references)} references but {len(hypotheses)} hypotheses")
+    if unit not in ('char', 'word'):
+        raise ValueError(f"Unsupported unit: {unit}. Supported: char, word")
+    if not references:
+        return []
+
+    backend = backend or ('numpy' if np is not None else 'python')
+    if backend == 'numpy':
+        if np is None:
+            raise ImportError("The numpy backend requires the 'numpy' package (pip install numpy)")
+        return _distances_numpy(references, hypotheses, unit)
+    if backend == 'python':
+        return _distances_python(references, hypotheses, unit)
+    raise ValueError(f"Unsupported backend: {backend}. Supported: numpy, python")
+
+
+def _rate(errors: int, length: int) -> Optional[float]:
+    return round(errors / length, 4) if length else None
+
+
+def error_rates(references: Iterable[str], hypotheses: Iterable[str],
+                backend: Optional[str] = None) -> dict:
+    """
+    Corpus-level WER and CER: total edits over total reference length.
+
+    Both sides are normalized (Unicode, digits, punctuation) before alignment.
+
+    Returns:
+        dict: count, wer, cer, word_errors, reference_words, char_errors, reference_chars
+    """
+    scores = score_pairs(references, hypotheses, backend)
+    return _summarize(scores)
+
+
+def _normalize(texts: Iterable[str]) -> list:
+    texts = list(texts)
+    # References repeat heavily (one prompt per crop), so normalize each distinct text once
+    unique = list(dict.fromkeys(texts))
+    normalized = dict(zip(unique, normalize_batch(unique, fold_numerals=True, fold_punctuation=True)))
+    return [normalized[text] for text in texts]
+
+
+def score_pairs(references: Iterable[str], hypotheses: Iterable[str],
+                backend: Optional[str] = None) -> list:
+    """
+    Per-pair word and character error counts.
+
+    Returns:
+        list: Dicts with wer, cer, word_errors, reference_words, char_errors, reference_chars
+    """
+    references = _normalize(references)
+    hypotheses = _normalize(hypotheses)
+    word_errors = edit_distances(references, hypotheses, 'word', backend)
+    char_errors = edit_distances(references, hypotheses, 'char', backend)
+
+    scores = []
+    for reference, words, chars in zip(references, word_errors, char_errors):
+        reference_words = len(reference.split())
+        scores.append({
+            'wer': _rate(words, reference_words),
+            'cer': _rate(chars, len(reference)),
+            'word_errors': words,
+            'reference_words': reference_words,
+            'char_errors': chars,
+            'reference_chars': len(reference)
+        })
+    return scores
+
+
+def _summarize(scores: Iterable[dict]) -> dict:
+    totals = {'count': 0, 'word_errors': 0, 'reference_words': 0, 'char_errors': 0, 'reference_chars': 0}
+    for score in scores:
+        # Per-pair scores count once; stored totals carry their own count
+        totals['count'] += score.get('count', 1)
+        for key in ('word_errors', 'reference_words', 'char_errors', 'reference_chars'):
+            totals[key] += score[key]
+    totals['wer'] = _rate(totals['word_errors'], totals['reference_words'])
+    totals['cer'] = _rate(totals['char_errors'], totals['reference_chars'])
+    return totals
+
+
+def _reference(result: dict) -> str:
+    # The prompted text; a bare crop name is a keyword, not a transcript reference
+    return result.get('reference') or ''
+
+
+def combine_error_rates(totals: Iterable[dict]) -> dict:
+    """
+    Corpus WER/CER from stored edit-count totals, e.g. the per-crop aggregates
+    of the results DB, without realigning any transcript.
+
+    Args:
+        totals: Dicts with count, word_errors, reference_words, char_errors, reference_chars
+
+    Returns:
+        dict: Same shape as error_rates
+    """
+    return _summarize(totals)
+
+
+def score_attempt(result: dict, reference: Callable[[dict], str] = _reference) -> dict:
+    """
+    Edit counts for one stored attempt, as kept in the results DB aggregates.
+    Uses the pure-Python backend, which is faster than NumPy for a single pair.
+
+    Returns:
+        dict: count (0 if there is no reference or no transcript to score, else 1),
+            word_errors, reference_words, char_errors, reference_chars
+    """
+    transcript = result.get('transcript') or ''
+    reference_text = reference(result)
+    if not transcript or not reference_text:
+        return {'count': 0, 'word_errors': 0, 'reference_words': 0, 'char_errors': 0, 'reference_chars': 0}
+    score = score_pairs([reference_text], [transcript], backend='python')[0]
+    return {'count': 1, **{key: score[key] for key in ('word_errors', 'reference_words', 'char_errors', 'reference_chars')}}
+
+
+def score_results(results: Iterable[dict], reference: Callable[[dict], str] = _reference,
+                  backend: Optional[str] = None) -> list:
+    """
+    Attach WER/CER to result dicts from submit_recording, the results DB or Azure recovery.
+
+    Args:
+        results: Result dicts with reference and transcript
+        reference (callable): Extracts the reference text; the 'reference' key by default
+        backend (str, optional): Edit-distance backend, see edit_distances
+
+    Returns:
+        list: Copies of the result dicts with wer and cer added (None without a reference)
+    """
+    results = list(results)
+    scores = score_pairs([reference(result) for result in results],
+                         [result.get('transcript') or '' for result in results], backend)
+    return [{**result, 'wer': score['wer'], 'cer': score['cer']} for result, score in zip(results, scores)]
+
+
+def aggregate_error_rates(results: Iterable[dict], group_by: Union[str, Callable[[dict], str], None] = 'language',
+                          reference: Callable[[dict], str] = _reference,
+                          backend: Optional[str] = None) -> dict:
+    """
+    Corpus WER/CER overall and per group (language, session_id, crop_name, ...).
+
+    Args:
+        results: Result dicts; consumed once
+        group_by (str or callable, optional): Result key or function to group by
+        reference (callable): Extracts the reference text
+        backend (str, optional): Edit-distance backend, see edit_distances
+
+    Returns:
+        dict: {'overall': totals, 'groups': {group: totals}}; results without a
+            reference text are left out
+    """
+    if isinstance(group_by, str):
+        key = group_by
+        group_by = lambda result: result.get(key) or 'unknown'
+
+    references, hypotheses, groups = [], [], []
+    for result in results:
+        reference_text = reference(result)
+        if not reference_text:
+            continue
+        references.append(reference_text)
+        hypotheses.append(result.get('transcript') or '')
+        groups.append(group_by(result) if group_by else None)
+
+    scores = score_pairs(references, hypotheses, backend)
+    logger.info("Scored %s transcripts for WER/CER", len(scores))
+
+    grouped = defaultdict(list)
+    if group_by:
+        for group, score in zip(groups, scores):
+            grouped[group].append(score)
+    return {
+        'overall': _summarize(scores),
+        'groups': {group: _summarize(group_scores) for group, group_scores in grouped.items()}
+    }
@@ -0,0 +1,202 @@
+"""
+A/B comparison of ASR model versions on the same recordings.
+Each recording is sent to every model in ASR_COMPARE_MODELS at once: the
+primary model runs on the calling thread and the others on a shared pool, so
+an attempt takes as long as the slowest model rather than the sum of them.
+"""
+
+import os
+import time
+import bisect
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_MODELS = ('saarika:v2.5', 'saarika:v2', 'saarika:v1', 'saarika:flash')
+PRIMARY_MODEL = 'saarika:v2.5'
+
+# Upper bounds in ms of the per-model latency histogram; totals keep counts per
+# bucket (plus an overflow bucket) instead of every latency, and p95 is read off them
+LATENCY_BUCKETS_MS = (100, 250, 500, 750, 1000, 1500, 2000, 3000, 5000, 7500, 10000, 20000, 30000)
+
+
+def compare_models_from_env() -> tuple:
+    """
+    Models to run next to the primary one, from ASR_COMPARE_MODELS
+    (comma-separated, e.g. 'saarika:v2,saarika:flash'); empty disables comparison.
+
+    Raises:
+        ValueError: If a model is not supported
+    """
+    models = []
+    for model in os.environ.get('ASR_COMPARE_MODELS', '').split(','):
+        model = model.strip()
+        if not model or model == PRIMARY_MODEL or model in models:
+            continue
+        if model not in SUPPORTED_MODELS:
+            raise ValueError(f"Unsupported model: {model}. Supported: {list(SUPPORTED_MODELS)}")
+        models.append(model)
+    return tuple(models)
+
+
+@process_singleton
+def get_comparison_executor() -> ThreadPoolExecutor:
+    """
+    Pool for secondary model calls (ASR_COMPARE_WORKERS, default 16).
+
+    Kept apart from the chunk pool, since a chunked recording submits its
+    chunks from inside a model call.
+
+    Returns:
+        ThreadPoolExecutor: Shared executor
+    """
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get('ASR_COMPARE_WORKERS', 16)),
+        thread_name_prefix='asr-compare'
+    )
+
+
+def _timed(transcribe_fn: Callable, model: str) -> tuple:
+    started = time.perf_counter()
+    response = transcribe_fn(model)
+    return response, round((time.perf_counter() - started) * 1000, 1)
+
+
+def transcribe_models(transcribe_fn: Callable, primary: str, models: tuple) -> tuple:
+    """
+    Transcribe one recording with several models concurrently.
+
+    Args:
+        transcribe_fn (callable): transcribe_fn(model_name) -> transcribe_audio response
+        primary (str): Model whose response is returned; its failure is raised
+        models (tuple): Other models; their failures are recorded, not raised
+
+    Returns:
+        tuple: (primary response, {model: {'transcript', 'latency_ms'} or {'error', 'latency_ms'}})
+            with an entry for every model, the primary included
+    """
+    executor = get_comparison_executor()
+    submitted = time.perf_counter()
+    futures = {model: executor.submit(_timed, transcribe_fn, model) for model in models}
+
+    response, latency_ms = _timed(transcribe_fn, primary)
+    model_results = {primary: {'transcript': response.get('transcript', ''), 'latency_ms': latency_ms}}
+
+    for model, future in futures.items():
+        try:
+            other, other_latency_ms = future.result()
+            model_results[model] = {'transcript': other.get('transcript', ''), 'latency_ms': other_latency_ms}
+        except Exception as e:
+            logger.warning("Comparison model %s failed: %s", model, e)
+            model_results[model] = {'error': str(e), 'latency_ms': None}
+
+    wall_ms = (time.perf_counter() - submitted) * 1000
+    logger.info("Transcribed with %s models in %.0fms (primary %.0fms)", len(model_results), wall_ms, latency_ms)
+    return response, model_results
+
+
+def latency_bucket(latency_ms: float) -> int:
+    """Index of the LATENCY_BUCKETS_MS bucket holding latency_ms (len(LATENCY_BUCKETS_MS) for overflow)"""
+    return bisect.bisect_left(LATENCY_BUCKETS_MS, latency_ms)
+
+
+def new_model_total() -> dict:
+    """Empty per-model totals: counts, latency count/sum/max and per-bucket latency counts"""
+    return {
+        'attempts': 0,
+        'detected': 0,
+        'errors': 0,
+        'latency_count': 0,
+        'latency_sum_ms': 0.0,
+        'latency_max_ms': 0.0,
+        'latency_buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1)
+    }
+
+
+def _histogram_percentile(buckets: list, count: int, max_ms: float, fraction: float) -> float:
+    # Upper bound of the bucket holding the rank, capped at the largest latency seen
+    rank = min(int(fraction * count), count - 1) + 1
+    seen = 0
+    for index, bucket_count in enumerate(buckets):
+        seen += bucket_count
+        if seen >= rank:
+            bound = LATENCY_BUCKETS_MS[index] if index < len(LATENCY_BUCKETS_MS) else max_ms
+            return min(bound, max_ms)
+    return max_ms
+
+
+def add_model_results(totals: dict, model_results: dict) -> dict:
+    """
+    Fold one attempt's per-model entries into running per-model totals.
+
+    Args:
+        totals (dict): {model: new_model_total()}, updated in place
+        model_results (dict): The attempt's 'model_results'
+
+    Returns:
+        dict: totals
+    """
+    for model, entry in (model_results or {}).items():
+        total = totals.setdefault(model, new_model_total())
+        total['attempts'] += 1
+        if entry.get('error'):
+            total['errors'] += 1
+            continue
+        total['detected'] += int(bool(entry.get('keyword_detected')))
+        latency_ms = entry.get('latency_ms')
+        if latency_ms is not None:
+            total['latency_count'] += 1
+            total['latency_sum_ms'] += latency_ms
+            total['latency_max_ms'] = max(total['latency_max_ms'], latency_ms)
+            total['latency_buckets'][latency_bucket(latency_ms)] += 1
+    return totals
+
+
+def summarize_model_totals(totals: dict, primary: str = PRIMARY_MODEL) -> list:
+    """
+    Per-model keyword accuracy and latency from per-model totals, e.g. those the
+    results DB keeps up to date as attempts are recorded.
+
+    p95_latency_ms is approximate: the upper bound of the histogram bucket
+    holding the 95th percentile, capped at the slowest latency seen.
+
+    Returns:
+        list: Dicts with model, attempts, detected, accuracy, errors,
+            avg_latency_ms and p95_latency_ms, primary model first
+    """
+    summary = []
+    for model in sorted(totals, key=lambda name: (name != primary, name)):
+        total = totals[model]
+        count = total['latency_count']
+        answered = total['attempts'] - total['errors']
+        summary.append(dict(
+            model=model,
+            attempts=total['attempts'],
+            detected=total['detected'],
+            errors=total['errors'],
+            accuracy=total['detected'] / answered if answered else None,
+            avg_latency_ms=round(total['latency_sum_ms'] / count, 1) if count else None,
+            p95_latency_ms=_histogram_percentile(total['latency_buckets'], count, total['latency_max_ms'], 0.95)
+            if count else None
+        ))
+    return summary
+
+
+def summarize_models(results_data: list, primary: str = PRIMARY_MODEL) -> list:
+    """
+    Per-model keyword accuracy and latency over a session's attempts.
+
+    Args:
+        results_data (list): Result dicts; only those with 'model_results' count
+
+    Returns:
+        list: As summarize_model_totals
+    """
+    totals = {}
+    for result in results_data:
+        add_model_results(totals, result.get('model_results'))
+    return summarize_model_totals(totals, primary)
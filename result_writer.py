@@ -0,0 +1,289 @@
+"""
+Write-behind buffer for Azure result uploads.
+Results are journaled to a local SQLite (WAL) file on the request thread and
+flushed to Azure in per-session batches by a background thread. Rows that
+were journaled but not flushed before a crash are picked up on restart.
+"""
+
+import os
+import json
+import time
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriteBehind:
+    """
+    Durable journal plus background flusher for per-attempt results.
+
+    Args:
+        journal_path (str): SQLite file holding unflushed results
+        upload_fn (callable): upload_fn(test_results, user_email, language, session_id),
+            called once per session with that session's pending rows
+        batch_size (int): Flush as soon as this many rows are pending
+        flush_interval (float): Flush at least this often, in seconds
+        lease_seconds (float): How long a claimed batch is reserved before another
+            process sharing the journal may retry it; renewed while the batch is
+            being uploaded, so only a flusher that died lets it lapse
+        retry_backoff (float): Delay before retrying a session whose upload failed,
+            doubled on each further failure
+        max_retry_backoff (float): Cap on that delay
+    """
+
+    def __init__(self, journal_path: str, upload_fn: Callable, batch_size: int = 50,
+                 flush_interval: float = 2.0, lease_seconds: float = 60.0,
+                 retry_backoff: float = 5.0, max_retry_backoff: float = 300.0):
+        self.journal_path = journal_path
+        self.upload_fn = upload_fn
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self.max_retry_backoff = max_retry_backoff
+        self.worker_id = f"{os.getpid()}-{id(self)}"
+
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self._metrics = {
+            'enqueued': 0,
+            'flushed': 0,
+            'flushes': 0,
+            'failed_flushes': 0,
+            'last_flush_seconds': 0.0,
+            'total_flush_seconds': 0.0,
+            'last_error': None
+        }
+
+        self._conn = sqlite3.connect(journal_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute('PRAGMA busy_timeout=5000')
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS pending_results (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_email TEXT NOT NULL,
+                language TEXT NOT NULL,
+                session_id TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                claimed_by TEXT,
+                claimed_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL DEFAULT 0
+            )
+        ''')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(pending_results)')}
+        if 'attempts' not in columns:
+            # Journals written before failed uploads were backed off
+            self._conn.execute('ALTER TABLE pending_results ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0')
+            self._conn.execute('ALTER TABLE pending_results ADD COLUMN next_attempt_at REAL NOT NULL DEFAULT 0')
+        # Rows this process journaled and has not flushed; only used to wake the flusher early
+        self._pending = self.depth()
+
+    def start(self):
+        """Start the background flusher; it first drains rows left by a previous run"""
+        if self._thread is not None:
+            return
+        recovered = self.depth()
+        if recovered:
+            logger.info("Recovering %s unflushed results from %s", recovered, self.journal_path)
+        self._thread = threading.Thread(target=self._run, name='azure-write-behind', daemon=True)
+        self._thread.start()
+
+    def stop(self, flush: bool = True):
+        """Stop the flusher, optionally flushing what is pending first"""
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.flush_interval + 30)
+            self._thread = None
+        if flush:
+            self.flush()
+
+    def enqueue(self, test_result: dict, user_email: str, language: str, session_id: str):
+        """
+        Journal one result for upload. Returns once the row is on local disk.
+
+        Args:
+            test_result (dict): Single test result dictionary
+            user_email (str): User's email address
+            language (str): Test language
+            session_id (str): Session identifier
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT INTO pending_results (user_email, language, session_id, payload, created_at) '
+                'VALUES (?, ?, ?, ?, ?)',
+                (user_email, language, session_id, json.dumps(test_result, ensure_ascii=False), time.time())
+            )
+            self._metrics['enqueued'] += 1
+            self._pending += 1
+            full = self._pending >= self.batch_size
+        if full:
+            self._wakeup.set()
+
+    def depth(self) -> int:
+        """Number of journaled rows not yet flushed to Azure"""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM pending_results').fetchone()[0]
+
+    def _claim_batch(self) -> list:
+        now = time.time()
+        with self._lock:
+            self._conn.execute('BEGIN IMMEDIATE')
+            try:
+                self._conn.execute(
+                    'UPDATE pending_results SET claimed_by = ?, claimed_at = ? WHERE id IN ('
+                    'SELECT id FROM pending_results WHERE (claimed_by IS NULL OR claimed_at < ?) '
+                    # Newer rows of a session that is backing off wait too, so its blob stays in order
+                    'AND session_id NOT IN (SELECT session_id FROM pending_results WHERE next_attempt_at > ?) '
+                    'ORDER BY id LIMIT ?)',
+                    (self.worker_id, now, now - self.lease_seconds, now, self.batch_size)
+                )
+                rows = self._conn.execute(
+                    'SELECT id, user_email, language, session_id, payload FROM pending_results '
+                    'WHERE claimed_by = ? AND claimed_at = ? ORDER BY id',
+                    (self.worker_id, now)
+                ).fetchall()
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+        return rows
+
+    @contextmanager
+    def _holding_lease(self, ids: list):
+        """Keep renewing this flusher's claim on ids until the block exits"""
+        done = threading.Event()
+
+        def renew():
+            placeholders = ','.join('?' * len(ids))
+            while not done.wait(self.lease_seconds / 3):
+                try:
+                    with self._lock:
+                        self._conn.execute(
+                            f'UPDATE pending_results SET claimed_at = ? WHERE claimed_by = ? AND id IN ({placeholders})',
+                            [time.time(), self.worker_id] + ids
+                        )
+                except Exception as e:
+                    logger.error("Write-behind lease renewal failed: %s", e)
+
+        thread = threading.Thread(target=renew, name='azure-write-behind-lease', daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def flush(self) -> int:
+        """
+        Upload one batch of pending rows, grouped per session.
+
+        Returns:
+            int: Number of rows flushed
+        """
+        rows = self._claim_batch()
+        if not rows:
+            return 0
+
+        groups = {}
+        for row_id, user_email, language, session_id, payload in rows:
+            groups.setdefault((user_email, language, session_id), []).append((row_id, json.loads(payload)))
+
+        started = time.monotonic()
+        # Uploads can outlast the lease; without renewal another process could claim
+        # and upload the same rows again
+        with self._holding_lease([row[0] for row in rows]):
+            flushed = self._upload_groups(groups)
+
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._metrics['flushes'] += 1
+            self._metrics['flushed'] += flushed
+            self._metrics['last_flush_seconds'] = elapsed
+            self._metrics['total_flush_seconds'] += elapsed
+        logger.info("Write-behind flushed %d/%d results in %.1fms", flushed, len(rows), elapsed * 1000)
+        return flushed
+
+    def _upload_groups(self, groups: dict) -> int:
+        flushed = 0
+        for (user_email, language, session_id), entries in groups.items():
+            ids = [row_id for row_id, _ in entries]
+            placeholders = ','.join('?' * len(ids))
+            try:
+                self.upload_fn([result for _, result in entries], user_email, language, session_id)
+            except Exception as e:
+                logger.error("Write-behind flush failed for %s: %s", session_id, e)
+                # Back this session off so a blob that keeps failing does not hold up the others
+                with self._lock:
+                    self._metrics['failed_flushes'] += 1
+                    self._metrics['last_error'] = str(e)
+                    self._conn.execute(
+                        'UPDATE pending_results SET claimed_by = NULL, claimed_at = NULL, '
+                        'attempts = attempts + 1, next_attempt_at = ? + MIN(?, ? * (1 << MIN(attempts, 16))) '
+                        f'WHERE id IN ({placeholders})',
+                        [time.time(), self.max_retry_backoff, self.retry_backoff] + ids
+                    )
+                continue
+            with self._lock:
+                self._conn.execute(f'DELETE FROM pending_results WHERE id IN ({placeholders})', ids)
+                self._pending = max(self._pending - len(ids), 0)
+            flushed += len(ids)
+        return flushed
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                # Keep draining while full batches are waiting
+                while self.flush() >= self.batch_size:
+                    pass
+            except Exception as e:
+                logger.error("Write-behind flusher error: %s", e)
+
+    def stats(self) -> dict:
+        """Report queue depth, rows backing off after failed uploads and flush latency"""
+        depth = self.depth()
+        with self._lock:
+            retrying = self._conn.execute('SELECT COUNT(*) FROM pending_results WHERE attempts > 0').fetchone()[0]
+            metrics = dict(self._metrics)
+        flushes = metrics['flushes']
+        total_flush_seconds = metrics.pop('total_flush_seconds')
+        metrics['queue_depth'] = depth
+        metrics['retrying'] = retrying
+        metrics['avg_flush_seconds'] = total_flush_seconds / flushes if flushes else 0.0
+        metrics['batch_size'] = self.batch_size
+        metrics['flush_interval'] = self.flush_interval
+        return metrics
+
+
+@process_singleton
+def get_result_writer() -> ResultWriteBehind:
+    """
+    Shared write-behind buffer, with its flusher started.
+
+    Configured by AZURE_JOURNAL_PATH, AZURE_FLUSH_BATCH_SIZE and AZURE_FLUSH_INTERVAL.
+
+    Returns:
+        ResultWriteBehind: Shared instance
+    """
+    from azure_service import upload_test_results_batch
+    writer = ResultWriteBehind(
+        os.environ.get('AZURE_JOURNAL_PATH', 'result_journal.db'),
+        upload_test_results_batch,
+        batch_size=int(os.environ.get('AZURE_FLUSH_BATCH_SIZE', 50)),
+        flush_interval=float(os.environ.get('AZURE_FLUSH_INTERVAL', 2))
+    )
+    writer.start()
+    return writer
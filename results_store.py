@@ -0,0 +1,632 @@
+"""
+Local SQLite persistence for QA sessions and per-attempt results.
+Uses asr_testing.db with a normalized attempts table (one row per attempt)
+in place of the fixed log_1_* ... log_5_* columns of test_results, plus
+per-crop aggregates that are updated as each attempt is stored.
+"""
+
+import os
+import json
+import queue
+import sqlite3
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+from metrics import score_attempt, score_pairs
+from model_comparison import add_model_results, latency_bucket
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_VERSION = 7
+
+# Edit counts summed per crop so /results gets session WER/CER without realigning transcripts
+ERROR_COUNT_COLUMNS = ('scored_attempts', 'word_errors', 'reference_words', 'char_errors', 'reference_chars')
+
+# Performance buckets shown on /results, by number of attempts where the crop was detected
+WELL_PRONOUNCED_MIN_CORRECT = 3
+MODERATE_CORRECT = 2
+
+BUCKET_SQL = f"""CASE WHEN {{correct}} >= {WELL_PRONOUNCED_MIN_CORRECT} THEN 'well'
+                 WHEN {{correct}} = {MODERATE_CORRECT} THEN 'moderate' ELSE 'poor' END"""
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS qa_users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    login_count INTEGER DEFAULT 1
+);
+CREATE TABLE IF NOT EXISTS test_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    qa_user_id INTEGER,
+    language TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (qa_user_id) REFERENCES qa_users (id)
+);
+CREATE TABLE IF NOT EXISTS attempts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER NOT NULL,
+    crop_name TEXT NOT NULL,
+    language TEXT NOT NULL,
+    attempt_number INTEGER NOT NULL,
+    transcript TEXT,
+    keyword_detected BOOLEAN NOT NULL DEFAULT 0,
+    audio_file TEXT,
+    timestamp TEXT,
+    model_results TEXT,
+    reference TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (session_id) REFERENCES test_sessions (id)
+);
+CREATE INDEX IF NOT EXISTS idx_attempts_session_crop ON attempts (session_id, crop_name);
+CREATE INDEX IF NOT EXISTS idx_attempts_language_crop ON attempts (language, crop_name);
+CREATE TABLE IF NOT EXISTS crop_results (
+    session_id INTEGER NOT NULL,
+    crop_name TEXT NOT NULL,
+    correct_count INTEGER NOT NULL DEFAULT 0,
+    total_attempts INTEGER NOT NULL DEFAULT 0,
+    bucket TEXT NOT NULL DEFAULT 'poor',
+    logs TEXT NOT NULL DEFAULT '[]',
+    first_attempt_id INTEGER,
+    scored_attempts INTEGER NOT NULL DEFAULT 0,
+    word_errors INTEGER NOT NULL DEFAULT 0,
+    reference_words INTEGER NOT NULL DEFAULT 0,
+    char_errors INTEGER NOT NULL DEFAULT 0,
+    reference_chars INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (session_id, crop_name),
+    FOREIGN KEY (session_id) REFERENCES test_sessions (id)
+);
+CREATE TABLE IF NOT EXISTS model_totals (
+    session_id INTEGER NOT NULL,
+    model TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    detected INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    latency_count INTEGER NOT NULL DEFAULT 0,
+    latency_sum_ms REAL NOT NULL DEFAULT 0,
+    latency_max_ms REAL NOT NULL DEFAULT 0,
+    latency_buckets TEXT NOT NULL DEFAULT '[]',
+    PRIMARY KEY (session_id, model),
+    FOREIGN KEY (session_id) REFERENCES test_sessions (id)
+);
+'''
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection frees up within the acquire timeout"""
+
+
+class ResultsStore:
+    """
+    Pooled access to the local results database.
+
+    Args:
+        db_path (str): SQLite database file
+        pool_size (int): Number of pooled connections
+        acquire_timeout (float): Seconds to wait for a pooled connection
+    """
+
+    def __init__(self, db_path: str = 'asr_testing.db', pool_size: int = 8, acquire_timeout: float = 10.0):
+        self.db_path = db_path
+        self.acquire_timeout = acquire_timeout
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        for _ in range(pool_size):
+            self._pool.put(self._open_connection())
+        self._migrate()
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for the duration of a with-block.
+
+        Raises:
+            PoolTimeoutError: If every connection stays checked out for acquire_timeout
+        """
+        try:
+            conn = self._pool.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            raise PoolTimeoutError(f"No results DB connection free after {self.acquire_timeout}s")
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a pooled connection inside BEGIN IMMEDIATE ... COMMIT"""
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+
+    def _migrate(self):
+        with self.transaction() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+            if version >= SCHEMA_VERSION:
+                return
+
+            self._create_schema(conn)
+
+            if version < 1:
+                self._migrate_v1(conn)
+            if version < 2:
+                self._migrate_v2(conn)
+            if version < 3:
+                self._migrate_v3(conn)
+            if version < 4:
+                self._migrate_v4(conn)
+            if version < 5:
+                self._migrate_v5(conn)
+            if version < 6:
+                self._migrate_v6(conn)
+            if version < 7:
+                self._migrate_v7(conn)
+
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            logger.info("Migrated %s to schema version %s", self.db_path, SCHEMA_VERSION)
+
+    def _create_schema(self, conn):
+        for statement in SCHEMA.split(';'):
+            if statement.strip():
+                conn.execute(statement)
+
+    def _migrate_v1(self, conn):
+        # Sessions are addressed by the string IDs the app generates
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(test_sessions)')}
+        if 'session_key' not in columns:
+            conn.execute('ALTER TABLE test_sessions ADD COLUMN session_key TEXT')
+        conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_test_sessions_key ON test_sessions (session_key)')
+
+        # Move rows from the old fixed-width test_results table into attempts
+        legacy = conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'test_results'"
+        ).fetchone()
+        if legacy:
+            for n in range(1, 6):
+                conn.execute(f'''
+                    INSERT INTO attempts (session_id, crop_name, language, attempt_number,
+                                          transcript, keyword_detected, audio_file, created_at)
+                    SELECT r.session_id, r.crop_name, s.language, {n},
+                           r.log_{n}_sentence, COALESCE(r.log_{n}_keyword_detected, 0),
+                           r.log_{n}_audio_file, r.created_at
+                    FROM test_results r JOIN test_sessions s ON s.id = r.session_id
+                    WHERE r.log_{n}_sentence IS NOT NULL
+                ''')
+
+    def _migrate_v2(self, conn):
+        # Build per-crop aggregates for attempts stored before they existed
+        conn.execute(f'''
+            INSERT OR REPLACE INTO crop_results (session_id, crop_name, correct_count, total_attempts,
+                                                 bucket, logs, first_attempt_id)
+            SELECT session_id, crop_name, SUM(keyword_detected), COUNT(*),
+                   {BUCKET_SQL.format(correct='SUM(keyword_detected)')},
+                   json_group_array(json_object('sentence', COALESCE(transcript, ''),
+                                                'detected', json(CASE WHEN keyword_detected THEN 'true' ELSE 'false' END))),
+                   MIN(id)
+            FROM (SELECT * FROM attempts ORDER BY id)
+            GROUP BY session_id, crop_name
+        ''')
+
+    def _migrate_v3(self, conn):
+        # Per-model transcripts from A/B comparison runs, as JSON
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(attempts)')}
+        if 'model_results' not in columns:
+            conn.execute('ALTER TABLE attempts ADD COLUMN model_results TEXT')
+
+    def _migrate_v4(self, conn):
+        # Per-crop edit counts; filled in by _migrate_v6 once attempts keep their reference text
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(crop_results)')}
+        for column in ERROR_COUNT_COLUMNS:
+            if column not in columns:
+                conn.execute(f'ALTER TABLE crop_results ADD COLUMN {column} INTEGER NOT NULL DEFAULT 0')
+
+    def _migrate_v5(self, conn):
+        # Per-model totals (created with the schema above) for comparison runs stored before they existed
+        totals = {}
+        for row in conn.execute('SELECT session_id, model_results FROM attempts WHERE model_results IS NOT NULL ORDER BY id'):
+            add_model_results(totals.setdefault(row['session_id'], {}), json.loads(row['model_results']))
+        conn.executemany(
+            'INSERT OR REPLACE INTO model_totals (session_id, model, attempts, detected, errors, latency_count, '
+            'latency_sum_ms, latency_max_ms, latency_buckets) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [(session_id, model, total['attempts'], total['detected'], total['errors'], total['latency_count'],
+              total['latency_sum_ms'], total['latency_max_ms'], json.dumps(total['latency_buckets']))
+             for session_id, models in totals.items() for model, total in models.items()]
+        )
+
+    def _migrate_v6(self, conn):
+        # Edit counts are only kept against a prompted reference text; counts v4/v5 scored
+        # against the bare crop name are dropped and rebuilt from attempts that have one
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(attempts)')}
+        if 'reference' not in columns:
+            conn.execute('ALTER TABLE attempts ADD COLUMN reference TEXT')
+        conn.execute(f"UPDATE crop_results SET {', '.join(f'{column} = 0' for column in ERROR_COUNT_COLUMNS)}")
+
+        rows = conn.execute(
+            "SELECT session_id, crop_name, reference, transcript FROM attempts "
+            "WHERE COALESCE(transcript, '') != '' AND COALESCE(reference, '') != ''"
+        ).fetchall()
+        if not rows:
+            return
+        totals = {}
+        scores = score_pairs([row['reference'] for row in rows], [row['transcript'] for row in rows])
+        for row, score in zip(rows, scores):
+            crop_totals = totals.setdefault((row['session_id'], row['crop_name']), [0, 0, 0, 0, 0])
+            for index, value in enumerate((1, score['word_errors'], score['reference_words'],
+                                           score['char_errors'], score['reference_chars'])):
+                crop_totals[index] += value
+        conn.executemany(
+            'UPDATE crop_results SET scored_attempts = ?, word_errors = ?, reference_words = ?, '
+            'char_errors = ?, reference_chars = ? WHERE session_id = ? AND crop_name = ?',
+            [tuple(crop_totals) + key for key, crop_totals in totals.items()]
+        )
+
+    def _migrate_v7(self, conn):
+        # model_totals kept every latency in a growing JSON array; rebuild it with
+        # running latency aggregates and a fixed-bucket histogram instead
+        columns = {row['name'] for row in conn.execute('PRAGMA table_info(model_totals)')}
+        if 'latencies' in columns:
+            conn.execute('DROP TABLE model_totals')
+            self._create_schema(conn)
+            self._migrate_v5(conn)
+
+    def upsert_user(self, email: str, name: str) -> int:
+        """
+        Record a login for a QA user.
+
+        Returns:
+            int: qa_users.id
+        """
+        with self.transaction() as conn:
+            conn.execute('''
+                INSERT INTO qa_users (name, email) VALUES (?, ?)
+                ON CONFLICT (email) DO UPDATE SET
+                    name = excluded.name,
+                    last_login = CURRENT_TIMESTAMP,
+                    login_count = login_count + 1
+            ''', (name or email, email))
+            return conn.execute('SELECT id FROM qa_users WHERE email = ?', (email,)).fetchone()[0]
+
+    def _ensure_session(self, conn, session_key: str, language: str, user_email: Optional[str]) -> int:
+        row = conn.execute('SELECT id FROM test_sessions WHERE session_key = ?', (session_key,)).fetchone()
+        if row:
+            return row[0]
+
+        user_id = None
+        if user_email:
+            conn.execute('INSERT OR IGNORE INTO qa_users (name, email) VALUES (?, ?)', (user_email, user_email))
+            user_id = conn.execute('SELECT id FROM qa_users WHERE email = ?', (user_email,)).fetchone()[0]
+        cursor = conn.execute(
+            'INSERT INTO test_sessions (qa_user_id, language, session_key) VALUES (?, ?, ?)',
+            (user_id, language, session_key)
+        )
+        return cursor.lastrowid
+
+    def create_session(self, session_key: str, language: str, user_email: Optional[str] = None) -> int:
+        """
+        Register a test session, if it does not exist yet.
+
+        Returns:
+            int: test_sessions.id
+        """
+        with self.transaction() as conn:
+            return self._ensure_session(conn, session_key, language, user_email)
+
+    def record_attempt(self, session_key: str, result: dict, language: str,
+                       user_email: Optional[str] = None) -> int:
+        """
+        Store one attempt, creating its session row on first use.
+
+        Args:
+            session_key (str): Session identifier used by the app
+            result (dict): Result dict as built by submit_recording
+            language (str): Test language
+            user_email (str, optional): QA user's email, linked when the session is created
+
+        Returns:
+            int: attempts.id
+        """
+        with self.transaction() as conn:
+            session_row_id = self._ensure_session(conn, session_key, language, user_email)
+            cursor = conn.execute('''
+                INSERT INTO attempts (session_id, crop_name, language, attempt_number,
+                                      transcript, keyword_detected, timestamp, model_results, reference)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (
+                session_row_id,
+                result['crop_name'],
+                language,
+                result['attempt_number'],
+                result.get('transcript', ''),
+                bool(result.get('keyword_detected')),
+                result.get('timestamp') or datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                json.dumps(result['model_results'], ensure_ascii=False) if result.get('model_results') else None,
+                result.get('reference') or None
+            ))
+            attempt_id = cursor.lastrowid
+
+            # Keep the per-crop aggregate current so /results never regroups or rescores attempts
+            detected = bool(result.get('keyword_detected'))
+            error_counts = score_attempt(result)
+            conn.execute(f'''
+                INSERT INTO crop_results (session_id, crop_name, correct_count, total_attempts,
+                                          bucket, logs, first_attempt_id, scored_attempts, word_errors,
+                                          reference_words, char_errors, reference_chars)
+                VALUES (:session_id, :crop_name, :correct, 1,
+                        {BUCKET_SQL.format(correct=':correct')}, json_array(json(:log)), :attempt_id,
+                        :count, :word_errors, :reference_words, :char_errors, :reference_chars)
+                ON CONFLICT (session_id, crop_name) DO UPDATE SET
+                    correct_count = correct_count + :correct,
+                    total_attempts = total_attempts + 1,
+                    bucket = {BUCKET_SQL.format(correct='correct_count + :correct')},
+                    logs = json_insert(logs, '$[#]', json(:log)),
+                    scored_attempts = scored_attempts + :count,
+                    word_errors = word_errors + :word_errors,
+                    reference_words = reference_words + :reference_words,
+                    char_errors = char_errors + :char_errors,
+                    reference_chars = reference_chars + :reference_chars
+            ''', {
+                **error_counts,
+                'session_id': session_row_id,
+                'crop_name': result['crop_name'],
+                'correct': int(detected),
+                'log': json.dumps({
+                    'sentence': result.get('transcript', ''),
+                    'detected': detected,
+                    'crop_cer': result.get('crop_cer'),
+                    'confusion_candidate': result.get('confusion_candidate')
+                }, ensure_ascii=False),
+                'attempt_id': attempt_id
+            })
+
+            # Same for the per-model comparison totals
+            for model, total in add_model_results({}, result.get('model_results')).items():
+                conn.execute('''
+                    INSERT INTO model_totals (session_id, model, attempts, detected, errors, latency_count,
+                                              latency_sum_ms, latency_max_ms, latency_buckets)
+                    VALUES (:session_id, :model, :attempts, :detected, :errors, :latency_count,
+                            :latency_sum_ms, :latency_max_ms, :latency_buckets)
+                    ON CONFLICT (session_id, model) DO UPDATE SET
+                        attempts = attempts + :attempts,
+                        detected = detected + :detected,
+                        errors = errors + :errors,
+                        latency_count = latency_count + :latency_count,
+                        latency_sum_ms = latency_sum_ms + :latency_sum_ms,
+                        latency_max_ms = MAX(latency_max_ms, :latency_max_ms),
+                        latency_buckets = CASE WHEN :bucket IS NULL THEN latency_buckets
+                                               ELSE json_set(latency_buckets, '$[' || :bucket || ']',
+                                                             json_extract(latency_buckets, '$[' || :bucket || ']') + 1) END
+                ''', {
+                    'session_id': session_row_id,
+                    'model': model,
+                    'attempts': total['attempts'],
+                    'detected': total['detected'],
+                    'errors': total['errors'],
+                    'latency_count': total['latency_count'],
+                    'latency_sum_ms': total['latency_sum_ms'],
+                    'latency_max_ms': total['latency_max_ms'],
+                    'latency_buckets': json.dumps(total['latency_buckets']),
+                    # One attempt adds at most one latency per model
+                    'bucket': latency_bucket(total['latency_max_ms']) if total['latency_count'] else None
+                })
+            return attempt_id
+
+    def get_session_info(self, session_key: str) -> Optional[dict]:
+        """
+        Look up who ran a session and in which language.
+
+        Returns:
+            dict: user_email ('' if no user is linked), qa_name and language,
+                or None if the session is not in the DB
+        """
+        with self.connection() as conn:
+            row = conn.execute('''
+                SELECT COALESCE(u.email, '') AS user_email, COALESCE(u.name, u.email, '') AS qa_name, s.language
+                FROM test_sessions s LEFT JOIN qa_users u ON u.id = s.qa_user_id
+                WHERE s.session_key = ?
+            ''', (session_key,)).fetchone()
+        return dict(row) if row else None
+
+    def get_crop_summaries(self, session_key: str) -> list:
+        """
+        Load a session's per-crop aggregates, one row per crop, in first-tested order.
+
+        Returns:
+            list: Dicts with crop_name, correct_count, total_attempts, result_ratio,
+                bucket and logs, as rendered by results.html, plus error_counts
+                (the crop's summed edit counts, see metrics.combine_error_rates)
+        """
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT c.crop_name, c.correct_count, c.total_attempts, c.bucket, c.logs,
+                       c.scored_attempts, c.word_errors, c.reference_words, c.char_errors, c.reference_chars
+                FROM crop_results c JOIN test_sessions s ON s.id = c.session_id
+                WHERE s.session_key = ?
+                ORDER BY c.first_attempt_id
+            ''', (session_key,)).fetchall()
+        return [{
+            'crop_name': row['crop_name'],
+            'correct_count': row['correct_count'],
+            'total_attempts': row['total_attempts'],
+            'result_ratio': f"{row['correct_count']}/{row['total_attempts']}",
+            'bucket': row['bucket'],
+            'logs': json.loads(row['logs']),
+            'error_counts': {
+                'count': row['scored_attempts'],
+                'word_errors': row['word_errors'],
+                'reference_words': row['reference_words'],
+                'char_errors': row['char_errors'],
+                'reference_chars': row['reference_chars']
+            }
+        } for row in rows]
+
+    def get_model_totals(self, session_key: str) -> dict:
+        """
+        Load a session's per-model comparison totals.
+
+        Returns:
+            dict: {model: {'attempts', 'detected', 'errors', 'latency_count', 'latency_sum_ms',
+                'latency_max_ms', 'latency_buckets'}}, see model_comparison.summarize_model_totals
+        """
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT m.model, m.attempts, m.detected, m.errors, m.latency_count,
+                       m.latency_sum_ms, m.latency_max_ms, m.latency_buckets
+                FROM model_totals m JOIN test_sessions s ON s.id = m.session_id
+                WHERE s.session_key = ?
+            ''', (session_key,)).fetchall()
+        return {row['model']: {
+            'attempts': row['attempts'],
+            'detected': row['detected'],
+            'errors': row['errors'],
+            'latency_count': row['latency_count'],
+            'latency_sum_ms': row['latency_sum_ms'],
+            'latency_max_ms': row['latency_max_ms'],
+            'latency_buckets': json.loads(row['latency_buckets'])
+        } for row in rows}
+
+    def get_session_results(self, session_key: str) -> list:
+        """
+        Load a session's attempts in submission order.
+
+        Returns:
+            list: Result dicts in the same shape as the session results list
+        """
+        with self.connection() as conn:
+            rows = conn.execute('''
+                SELECT a.crop_name, a.attempt_number, a.transcript, a.keyword_detected, a.timestamp,
+                       a.model_results, a.reference
+                FROM attempts a JOIN test_sessions s ON s.id = a.session_id
+                WHERE s.session_key = ?
+                ORDER BY a.id
+            ''', (session_key,)).fetchall()
+        results = []
+        for row in rows:
+            result = {
+                'crop_name': row['crop_name'],
+                'attempt_number': row['attempt_number'],
+                'transcript': row['transcript'] or '',
+                'keyword_detected': bool(row['keyword_detected']),
+                'timestamp': row['timestamp'] or ''
+            }
+            if row['model_results']:
+                result['model_results'] = json.loads(row['model_results'])
+            if row['reference']:
+                result['reference'] = row['reference']
+            results.append(result)
+        return results
+
+    def iter_attempts(self, session_keys: Optional[list] = None, language: Optional[str] = None,
+                      batch_size: int = 500, after_id: int = 0, user_email: Optional[str] = None,
+                      by_session: bool = True):
+        """
+        Stream attempts across sessions without loading them all into memory.
+
+        Rows are read a page at a time, each page on a briefly borrowed pooled
+        connection, so a slow consumer (e.g. a streamed CSV download) never holds
+        a connection between pages.
+
+        Args:
+            session_keys (list, optional): Only these sessions
+            language (str, optional): Only this language
+            batch_size (int): Rows per page
+            after_id (int): Only attempts with a larger attempt_id, for incremental readers
+            user_email (str, optional): Only sessions of this QA user
+            by_session (bool): Group rows by session; otherwise yield in attempt_id
+                order, so a reader that stops part way can resume from the last id
+
+        Yields:
+            dict: Result dicts plus attempt_id, user_email, language and session_id
+        """
+        query = '''
+            SELECT a.id, a.session_id AS session_row_id, COALESCE(u.email, '') AS user_email,
+                   a.language, s.session_key,
+                   a.crop_name, a.attempt_number, a.transcript, a.keyword_detected, a.timestamp, a.reference
+            FROM attempts a
+            JOIN test_sessions s ON s.id = a.session_id
+            LEFT JOIN qa_users u ON u.id = s.qa_user_id
+        '''
+        conditions, params = [], []
+        if after_id:
+            conditions.append('a.id > ?')
+            params.append(after_id)
+        if session_keys:
+            conditions.append(f"s.session_key IN ({','.join('?' * len(session_keys))})")
+            params.extend(session_keys)
+        if language:
+            conditions.append('a.language = ?')
+            params.append(language)
+        if user_email is not None:
+            conditions.append('u.email = ?')
+            params.append(user_email)
+        # Keyset pagination: each page starts after the last row of the previous one
+        if by_session:
+            conditions.append('(a.session_id, a.id) > (?, ?)')
+            query += ' WHERE ' + ' AND '.join(conditions) + ' ORDER BY a.session_id, a.id LIMIT ?'
+        else:
+            conditions.append('a.id > ?')
+            query += ' WHERE ' + ' AND '.join(conditions) + ' ORDER BY a.id LIMIT ?'
+
+        last = [0, 0] if by_session else [0]
+        while True:
+            with self.connection() as conn:
+                rows = conn.execute(query, params + last + [batch_size]).fetchall()
+            if not rows:
+                break
+            last = [rows[-1]['session_row_id'], rows[-1]['id']] if by_session else [rows[-1]['id']]
+            for row in rows:
+                yield {
+                    'attempt_id': row['id'],
+                    'user_email': row['user_email'],
+                    'language': row['language'],
+                    'session_id': row['session_key'],
+                    'crop_name': row['crop_name'],
+                    'attempt_number': row['attempt_number'],
+                    'transcript': row['transcript'] or '',
+                    'keyword_detected': bool(row['keyword_detected']),
+                    'timestamp': row['timestamp'] or '',
+                    'reference': row['reference'] or ''
+                }
+
+
+def performance_bucket(correct_count: int) -> str:
+    """Classify a crop as 'well', 'moderate' or 'poor' by its number of correct attempts"""
+    if correct_count >= WELL_PRONOUNCED_MIN_CORRECT:
+        return 'well'
+    if correct_count == MODERATE_CORRECT:
+        return 'moderate'
+    return 'poor'
+
+
+@process_singleton
+def get_results_store() -> ResultsStore:
+    """
+    Shared results store, migrated to the current schema when first opened.
+
+    Configured by RESULTS_DB_PATH, RESULTS_DB_POOL_SIZE and RESULTS_DB_POOL_TIMEOUT.
+
+    Returns:
+        ResultsStore: Shared instance
+    """
+    return ResultsStore(
+        os.environ.get('RESULTS_DB_PATH', 'asr_testing.db'),
+        pool_size=int(os.environ.get('RESULTS_DB_POOL_SIZE', 8)),
+        acquire_timeout=float(os.environ.get('RESULTS_DB_POOL_TIMEOUT', 10))
+    )
@@ -33,6 +33,15 @@ def get_sample_crops(language):
         "અખરોટ", "પિસ્તા", "હળદર", "અદરક", "લસણ", "કોથમીર", "જીરું", "હીંગ", "કાળી મરચાં", "ઇલાયચી"
     ]
     
+    # Punjabi crop names (50 names)
+    punjabi_crops = [
+        "ਚਾਵਲ", "ਕਣਕ", "ਮੱਕੀ", "ਬਾਜਰਾ", "ਜੌਂ", "ਅਰਹਰ", "ਚਣਾ", "ਮਸੂਰ", "ਰਾਜਮਾ", "ਸੋਇਆ",
+        "ਮੂੰਗਫਲੀ", "ਤਿਲ", "ਸਰ੍ਹੋਂ", "ਸੂਰਜਮੁਖੀ", "ਕਪਾਹ", "ਗੰਨਾ", "ਆਲੂ", "ਪਿਆਜ਼", "ਟਮਾਟਰ", "ਬੈਂਗਣ",
+        "ਮਿਰਚ", "ਖੀਰਾ", "ਕੱਦੂ", "ਤਰਬੂਜ਼", "ਖਰਬੂਜ਼ਾ", "ਅੰਗੂਰ", "ਕੇਲਾ", "ਅੰਬ", "ਸੰਤਰਾ", "ਨਿੰਬੂ",
+        "ਅਨਾਰ", "ਸੇਬ", "ਅਮਰੂਦ", "ਪਪੀਤਾ", "ਨਾਰੀਅਲ", "ਕਾਜੂ", "ਬਦਾਮ", "ਅਖਰੋਟ", "ਪਿਸਤਾ", "ਹਲਦੀ",
+        "ਅਦਰਕ", "ਲਸਣ", "ਧਨੀਆ", "ਜੀਰਾ", "ਹੀਂਗ", "ਕਾਲੀ ਮਿਰਚ", "ਇਲਾਇਚੀ", "ਦਾਲਚੀਨੀ", "ਲੌਂਗ", "ਜਾਇਫਲ"
+    ]
+    
     # Language mapping
     crops_by_language = {
         'punjabi': punjabi_crops,
@@ -42,14 +51,3 @@ def get_sample_crops(language):
     }
     
     return crops_by_language.get(language.lower(), [])
-
-
-
-    # Punjabi crop names (50 names)
-    punjabi_crops = [
-        "ਚਾਵਲ", "ਕਣਕ", "ਮੱਕੀ", "ਬਾਜਰਾ", "ਜੌਂ", "ਅਰਹਰ", "ਚਣਾ", "ਮਸੂਰ", "ਰਾਜਮਾ", "ਸੋਇਆ",
-        "ਮੂੰਗਫਲੀ", "ਤਿਲ", "ਸਰ੍ਹੋਂ", "ਸੂਰਜਮੁਖੀ", "ਕਪਾਹ", "ਗੰਨਾ", "ਆਲੂ", "ਪਿਆਜ਼", "ਟਮਾਟਰ", "ਬੈਂਗਣ",
-        "ਮਿਰਚ", "ਖੀਰਾ", "ਕੱਦੂ", "ਤਰਬੂਜ਼", "ਖਰਬੂਜ਼ਾ", "ਅੰਗੂਰ", "ਕੇਲਾ", "ਅੰਬ", "ਸੰਤਰਾ", "ਨਿੰਬੂ",
-        "ਅਨਾਰ", "ਸੇਬ", "ਅਮਰੂਦ", "ਪਪੀਤਾ", "ਨਾਰੀਅਲ", "ਕਾਜੂ", "ਬਦਾਮ", "ਅਖਰੋਟ", "ਪਿਸਤਾ", "ਹਲਦੀ",
-        "ਅਦਰਕ", "ਲਸਣ", "ਧਨੀਆ", "ਜੀਰਾ", "ਹੀਂਗ", "ਕਾਲੀ ਮਿਰਚ", "ਇਲਾਇਚੀ", "ਦਾਲਚੀਨੀ", "ਲੌਂਗ", "ਜਾਇਫਲ"
-    ]
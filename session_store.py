@@ -0,0 +1,211 @@
+"""
+Server-side Flask sessions.
+The cookie carries only a signed session ID; the session data lives in a local
+SQLite file or a Redis-compatible server, so growing results lists no longer
+have to be re-serialized into (and overflow) a 4KB cookie on every request.
+"""
+
+import os
+import time
+import uuid
+import sqlite3
+import logging
+import threading
+from typing import Optional
+
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+_serializer = TaggedJSONSerializer()
+
+
+class ServerSideSession(CallbackDict, SessionMixin):
+    """Session dict that tracks modification and carries its server-side ID"""
+
+    def __init__(self, initial=None, sid: Optional[str] = None, new: bool = False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid or uuid.uuid4().hex
+        self.new = new
+        self.modified = False
+
+
+class SQLiteSessionStore:
+    """
+    Session store backed by a local SQLite file in WAL mode.
+
+    Args:
+        db_path (str): Path of the SQLite file
+        cleanup_interval (float): Seconds between sweeps of expired sessions
+    """
+
+    def __init__(self, db_path: str = 'sessions.db', cleanup_interval: float = 300):
+        self.db_path = db_path
+        self.cleanup_interval = cleanup_interval
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS flask_sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        ''')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid: str) -> Optional[dict]:
+        row = self._connection().execute(
+            'SELECT data FROM flask_sessions WHERE sid = ? AND expires_at > ?', (sid, time.time())
+        ).fetchone()
+        return _serializer.loads(row[0]) if row else None
+
+    def save(self, sid: str, data: dict, ttl: int):
+        now = time.time()
+        self._connection().execute(
+            'INSERT OR REPLACE INTO flask_sessions (sid, data, expires_at) VALUES (?, ?, ?)',
+            (sid, _serializer.dumps(data), now + ttl)
+        )
+        if now - self._last_cleanup > self.cleanup_interval:
+            self._last_cleanup = now
+            self._connection().execute('DELETE FROM flask_sessions WHERE expires_at <= ?', (now,))
+
+    def delete(self, sid: str):
+        self._connection().execute('DELETE FROM flask_sessions WHERE sid = ?', (sid,))
+
+
+class RedisSessionStore:
+    """
+    Session store backed by Redis or any server speaking its protocol.
+
+    Args:
+        url (str): Redis URL, e.g. redis://localhost:6379/0
+        key_prefix (str): Prefix for session keys
+    """
+
+    def __init__(self, url: str, key_prefix: str = 'asr_session:'):
+        try:
+            import redis
+        except ImportError:
+            raise ImportError("SESSION_BACKEND=redis requires the 'redis' package (pip install redis)")
+        self.key_prefix = key_prefix
+        self._client = redis.Redis.from_url(url)
+
+    def load(self, sid: str) -> Optional[dict]:
+        data = self._client.get(self.key_prefix + sid)
+        return _serializer.loads(data.decode('utf-8')) if data is not None else None
+
+    def save(self, sid: str, data: dict, ttl: int):
+        self._client.setex(self.key_prefix + sid, ttl, _serializer.dumps(data))
+
+    def delete(self, sid: str):
+        self._client.delete(self.key_prefix + sid)
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """
+    Flask session interface that keeps session data in a server-side store.
+
+    Args:
+        store: SQLiteSessionStore, RedisSessionStore or any object with load/save/delete
+    """
+
+    session_class = ServerSideSession
+    salt = 'asr-server-session'
+
+    def __init__(self, store):
+        self.store = store
+
+    def _get_signer(self, app) -> Optional[Signer]:
+        if not app.secret_key:
+            return None
+        return Signer(app.secret_key, salt=self.salt)
+
+    def open_session(self, app, request):
+        signer = self._get_signer(app)
+        if signer is None:
+            return None
+
+        signed_sid = request.cookies.get(self.get_cookie_name(app))
+        if signed_sid:
+            try:
+                sid = signer.unsign(signed_sid).decode('utf-8')
+            except BadSignature:
+                sid = None
+            if sid:
+                try:
+                    data = self.store.load(sid)
+                except Exception as e:
+                    logger.error("Failed to load session %s: %s", sid, e)
+                    data = None
+                if data is not None:
+                    return self.session_class(data, sid=sid)
+
+        return self.session_class(new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        with span('session_save'):
+            self.store.save(session.sid, dict(session), ttl)
+
+        signed_sid = self._get_signer(app).sign(session.sid.encode('utf-8')).decode('utf-8')
+        response.set_cookie(
+            name,
+            signed_sid,
+            expires=self.get_expiration_time(app, session),
+            httponly=httponly,
+            domain=domain,
+            path=path,
+            secure=secure,
+            samesite=samesite
+        )
+
+
+def create_session_store(backend: str):
+    """
+    Build the session store selected by SESSION_BACKEND.
+
+    Args:
+        backend (str): 'sqlite' (SESSION_DB_PATH) or 'redis' (SESSION_REDIS_URL)
+
+    Returns:
+        SQLiteSessionStore or RedisSessionStore
+    """
+    if backend == 'sqlite':
+        return SQLiteSessionStore(os.environ.get('SESSION_DB_PATH', 'sessions.db'))
+    if backend == 'redis':
+        return RedisSessionStore(os.environ.get('SESSION_REDIS_URL', 'redis://localhost:6379/0'))
+    raise ValueError(f"Unsupported session backend: {backend}. Supported: cookie, sqlite, redis")
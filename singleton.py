@@ -0,0 +1,56 @@
+"""
+Lazily built process-wide objects.
+Connection pools, executors and background workers are created on first use
+rather than at import, so importing a module (or forking gunicorn workers)
+does not open files or start threads.
+"""
+
+import threading
+from functools import wraps
+from typing import Callable, TypeVar
+
+T = TypeVar('T')
+
+_UNSET = object()
+
+
+def process_singleton(factory: Callable[..., T]) -> Callable[..., T]:
+    """
+    Decorate a factory so it runs at most once per process for each set of arguments.
+
+    The first caller with given (hashable, positional) arguments builds the
+    object under a lock; later callers get the same object without locking.
+    A factory that returns None (e.g. an optional backend that is not
+    installed) is not retried.
+
+    Args:
+        factory (callable): Builds the shared object
+
+    Returns:
+        callable: Getter returning the shared object. getter.peek(*args) returns
+            it without building it (None if not built yet); getter.reset() drops
+            every instance so the next call builds a new one
+    """
+    lock = threading.Lock()
+    instances = {}
+
+    @wraps(factory)
+    def get(*args):
+        instance = instances.get(args, _UNSET)
+        if instance is _UNSET:
+            with lock:
+                instance = instances.get(args, _UNSET)
+                if instance is _UNSET:
+                    instance = instances[args] = factory(*args)
+        return instance
+
+    def peek(*args):
+        return instances.get(args)
+
+    def reset():
+        with lock:
+            instances.clear()
+
+    get.peek = peek
+    get.reset = reset
+    return get
@@ -0,0 +1,169 @@
+"""
+Structured, non-blocking logging.
+Request threads only put records on an in-memory queue; a listener thread
+formats them (JSON lines by default) and writes them out, so message
+formatting and I/O stay off the hot path. Large payloads are logged as
+summaries, with the full payload emitted only at DEBUG and for a sampled
+fraction of calls.
+"""
+
+import os
+import json
+import queue
+import atexit
+import random
+import logging
+import threading
+import logging.handlers
+from datetime import datetime, timezone
+from typing import Optional
+
+# Loggers that log whole HTTP exchanges at INFO
+NOISY_LOGGERS = ('azure.core.pipeline.policies.http_logging_policy',)
+
+LOG_PAYLOAD_SAMPLE_RATE = float(os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message plus any structured fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        fields = getattr(record, 'fields', None)
+        if fields:
+            entry.update(fields)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        elif record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic text lines with structured fields appended as key=value"""
+
+    def __init__(self):
+        super().__init__('%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        fields = getattr(record, 'fields', None)
+        if fields:
+            line += ' ' + ' '.join(f"{key}={value}" for key, value in fields.items())
+        return line
+
+
+class AsyncQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that defers formatting to the listener thread and drops
+    records instead of blocking when the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Only the traceback is rendered here, since it references live frames
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_handler: Optional[AsyncQueueHandler] = None
+_configure_lock = threading.Lock()
+
+
+def configure_logging(level: Optional[str] = None, log_format: Optional[str] = None) -> AsyncQueueHandler:
+    """
+    Route all logging through a bounded queue to a background writer.
+
+    Replaces the root logger's handlers; safe to call more than once.
+    Configured by LOG_LEVEL (default INFO), LOG_FORMAT ('json' or 'text')
+    and LOG_QUEUE_SIZE.
+
+    Returns:
+        AsyncQueueHandler: The root handler, for its dropped-record counter
+    """
+    global _listener, _handler
+    with _configure_lock:
+        if _handler is not None:
+            return _handler
+        level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+        log_format = log_format or os.environ.get('LOG_FORMAT', 'json')
+        if log_format not in ('json', 'text'):
+            raise ValueError(f"Unsupported log format: {log_format}. Supported: json, text")
+
+        output = logging.StreamHandler()
+        output.setFormatter(JSONFormatter() if log_format == 'json' else TextFormatter())
+        log_queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+        _handler = AsyncQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=False)
+
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+        root.addHandler(_handler)
+        root.setLevel(level)
+        for name in NOISY_LOGGERS:
+            logging.getLogger(name).setLevel(max(logging.WARNING, root.level))
+
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _handler
+
+
+def log_event(logger: logging.Logger, level: int, event: str, **fields):
+    """
+    Log a short message with structured fields, skipping all work when the level is off.
+
+        log_event(logger, logging.INFO, "Stored result", crop_name=crop, attempt=n)
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+
+def summarize(payload) -> dict:
+    """Constant-time description of a payload: its type and item count or length"""
+    summary = {'type': type(payload).__name__}
+    if isinstance(payload, (str, bytes, bytearray)):
+        summary['bytes'] = len(payload)
+    elif hasattr(payload, '__len__'):
+        summary['items'] = len(payload)
+    return summary
+
+
+def log_payload(logger: logging.Logger, event: str, payload, sample_rate: Optional[float] = None, **fields):
+    """
+    Log a payload as a summary at INFO; the full payload goes out only at
+    DEBUG, for a sample_rate fraction of calls (LOG_PAYLOAD_SAMPLE_RATE).
+    """
+    log_event(logger, logging.INFO, event, payload=summarize(payload), **fields)
+    if logger.isEnabledFor(logging.DEBUG):
+        rate = LOG_PAYLOAD_SAMPLE_RATE if sample_rate is None else sample_rate
+        if random.random() < rate:
+            # Copied so later mutation does not change what the listener writes
+            snapshot = list(payload) if isinstance(payload, list) else payload
+            logger.debug(event, extra={'fields': dict(fields, payload=snapshot)})
+
+
+def stats() -> dict:
+    """Queue depth and records dropped because the queue was full"""
+    if _handler is None:
+        return {'configured': False}
+    return {'configured': True, 'queue_depth': _handler.queue.qsize(), 'dropped': _handler.dropped}
@@ -0,0 +1,65 @@
+import pytest
+
+from analytics import CropAnalytics
+
+
+def rows(*crops):
+    return [{'crop_name': crop, 'transcript': crop, 'keyword_detected': True,
+             'language': 'hindi', 'timestamp': '2026-01-02 10:00:00'} for crop in crops]
+
+
+class Source:
+    """Local batches with a cursor that advances when the next batch is requested"""
+
+    def __init__(self, analytics, batches, fail_at=None):
+        self.analytics = analytics
+        self.batches = batches
+        self.fail_at = fail_at
+
+    def __call__(self):
+        start = self.analytics._cursors['local_attempt_id']
+        for index in range(start, len(self.batches)):
+            if index == self.fail_at:
+                raise ConnectionError('results DB unavailable')
+            yield self.batches[index]
+            self.analytics._cursors['local_attempt_id'] = index + 1
+
+
+@pytest.fixture
+def state_path(tmp_path):
+    return str(tmp_path / 'analytics.npz')
+
+
+def test_failed_refresh_resumes_without_double_counting(state_path):
+    analytics = CropAnalytics(state_path)
+    batches = [rows('धान', 'धान'), rows('गेहूं'), rows('धान')]
+    analytics._local_batches = Source(analytics, batches, fail_at=2)
+    assert analytics.refresh() == 3
+    assert analytics.stats()['failed_refreshes'] == 1
+
+    analytics._local_batches = Source(analytics, batches)
+    assert analytics.refresh() == 1
+    assert analytics.report('hindi')['attempts'] == 4
+
+    # The saved snapshot holds the counts and the cursor together
+    restored = CropAnalytics(state_path)
+    assert restored.report('hindi')['attempts'] == 4
+    assert restored.stats()['local_attempt_id'] == 3
+
+
+def test_only_one_process_ingests(state_path):
+    ingester = CropAnalytics(state_path)
+    follower = CropAnalytics(state_path)
+    ingester._local_batches = Source(ingester, [rows('धान'), rows('गेहूं')])
+    follower._local_batches = Source(follower, [rows('धान'), rows('गेहूं')])
+
+    with ingester._ingest_lock() as locked:
+        assert locked
+        assert follower.refresh() == 0
+    assert follower.languages() == []
+
+    assert ingester.refresh() == 2
+    # The follower serves the ingester's snapshot and continues from its cursor
+    assert follower.report('hindi')['attempts'] == 2
+    assert follower.refresh() == 0
+    assert follower.stats()['local_attempt_id'] == 2
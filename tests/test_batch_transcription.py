@@ -0,0 +1,86 @@
+import io
+import zipfile
+
+import pytest
+
+from batch_transcription import iter_archive_items, iter_upload_items, run_batch
+
+
+def make_archive(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+class Upload(io.BytesIO):
+    def __init__(self, filename, data=b''):
+        super().__init__(data)
+        self.filename = filename
+
+
+def test_manifest_maps_files_and_numbers_attempts():
+    manifest = 'audio_file,crop_name,attempt_number\na.wav,धान,\nb.wav,धान,\nc.wav,गेहूं,5\n'
+    archive = make_archive({'run/manifest.csv': manifest.encode('utf-8-sig'),
+                            'run/a.wav': b'A', 'run/b.wav': b'B', 'run/c.wav': b'C'})
+    items = list(iter_archive_items(archive))
+    assert [(item['file'], item['crop_name'], item['attempt_number']) for item in items] == [
+        ('a.wav', 'धान', 1), ('b.wav', 'धान', 2), ('c.wav', 'गेहूं', 5)]
+    assert items[1]['load']() == b'B'
+
+
+def test_manifest_skips_bad_rows():
+    manifest = ('audio_file,crop_name,attempt_number\n'
+                'a.wav,धान,first\n'   # non-numeric attempt
+                ',धान,\n'             # no audio file
+                'b.wav,,\n'           # no crop
+                'c.wav,धान,\n'
+                'missing.wav,धान,\n')  # not in the archive
+    archive = make_archive({'manifest.csv': manifest, 'c.wav': b'C'})
+    items = list(iter_archive_items(archive))
+    assert [(item['file'], item['attempt_number']) for item in items] == [('c.wav', 1)]
+
+
+def test_bad_manifest_fails_before_iteration():
+    with pytest.raises(ValueError, match='UTF-8'):
+        iter_archive_items(make_archive({'manifest.csv': 'audio_file,crop_name\na.wav,ध\n'.encode('utf-16')}))
+    with pytest.raises(ValueError, match='crop_name'):
+        iter_archive_items(make_archive({'manifest.csv': 'audio_file,crop\na.wav,rice\n'}))
+    with pytest.raises(ValueError, match='missing columns'):
+        iter_upload_items(io.BytesIO(b''), [])
+
+
+def test_bad_archive_fails_before_iteration():
+    with pytest.raises(zipfile.BadZipFile):
+        iter_archive_items(io.BytesIO(b'not a zip'))
+
+
+def test_archive_without_manifest_uses_crop_directories():
+    archive = make_archive({'धान/2.wav': b'', 'धान/1.wav': b'', 'गेहूं/1.webm': b'',
+                            'loose.wav': b'', 'धान/notes.txt': b''})
+    items = list(iter_archive_items(archive))
+    assert [(item['file'], item['crop_name'], item['attempt_number']) for item in items] == [
+        ('गेहूं/1.webm', 'गेहूं', 1), ('धान/1.wav', 'धान', 1), ('धान/2.wav', 'धान', 2)]
+
+
+def test_upload_items_match_by_filename():
+    manifest = io.BytesIO(b'audio_file,crop_name\na.wav,rice\nb.wav,rice\n')
+    items = list(iter_upload_items(manifest, [Upload('b.wav', b'B')]))
+    assert [(item['file'], item['attempt_number']) for item in items] == [('b.wav', 2)]
+    assert items[0]['load']() == b'B'
+
+
+def test_run_batch_reports_failures_per_item():
+    def score(audio, crop_name, attempt_number, language):
+        if audio == b'bad':
+            raise RuntimeError('ASR failed')
+        return {'crop_name': crop_name, 'transcript': audio.decode()}
+
+    items = [{'file': name, 'crop_name': 'rice', 'attempt_number': n, 'load': lambda name=name: name.encode()}
+             for n, name in enumerate(['ok', 'bad', 'fine'], 1)]
+    results = sorted(run_batch(items, score, 'english', max_workers=2), key=lambda result: result['index'])
+    assert [result.get('transcript') for result in results] == ['ok', None, 'fine']
+    assert results[1]['error'] == 'ASR failed'
+    assert results[1]['attempt_number'] == 2
@@ -0,0 +1,189 @@
+import pytest
+
+import circuit_breaker
+from circuit_breaker import (CLOSED, HALF_OPEN, OPEN, AdaptiveConcurrencyLimiter, ASRGuard, ASRUnavailableError,
+                             CircuitBreaker)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(circuit_breaker.time, 'monotonic', clock)
+    return clock
+
+
+class Response:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+def test_breaker_needs_min_calls_before_tripping(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4)
+    for _ in range(3):
+        breaker.record(True)
+    assert breaker.stats()['state'] == CLOSED
+    breaker.record(True)
+    assert breaker.stats()['state'] == OPEN
+    assert breaker.stats()['trips'] == 1
+
+
+def test_breaker_stays_closed_below_threshold(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4)
+    for failed in (True, False, False, False, True, False):
+        breaker.record(failed)
+    assert breaker.stats()['state'] == CLOSED
+    assert breaker.stats()['failure_rate'] == round(2 / 6, 4)
+
+
+def test_breaker_forgets_failures_outside_window(clock):
+    breaker = CircuitBreaker(failure_threshold=0.5, min_calls=4, window_seconds=10)
+    for _ in range(3):
+        breaker.record(True)
+    clock.now += 11
+    breaker.record(True)
+    assert breaker.stats()['state'] == CLOSED
+    assert breaker.stats()['window_calls'] == 1
+
+
+def test_open_breaker_refuses_until_cool_down(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=15)
+    breaker.record(True)
+    clock.now += 5
+    with pytest.raises(ASRUnavailableError) as refused:
+        breaker.before_call()
+    assert refused.value.retry_after == pytest.approx(10)
+    assert breaker.stats()['rejected'] == 1
+
+
+def test_half_open_probes_close_the_breaker(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=15, probe_calls=2)
+    breaker.record(True)
+    clock.now += 15
+    assert breaker.stats()['state'] == HALF_OPEN
+    assert breaker.before_call() is True
+    assert breaker.before_call() is True
+    with pytest.raises(ASRUnavailableError):
+        breaker.before_call()
+    breaker.record(False, probe=True)
+    breaker.record(False, probe=True)
+    assert breaker.stats()['state'] == CLOSED
+    assert breaker.before_call() is False
+
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=15, probe_calls=2)
+    breaker.record(True)
+    clock.now += 15
+    assert breaker.before_call() is True
+    breaker.record(True, probe=True)
+    assert breaker.stats()['state'] == OPEN
+    assert breaker.stats()['trips'] == 2
+
+
+def test_cancelled_probe_frees_its_slot(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=15, probe_calls=1)
+    breaker.record(True)
+    clock.now += 15
+    assert breaker.before_call() is True
+    breaker.cancel_probe()
+    assert breaker.before_call() is True
+
+
+def test_limiter_refuses_when_full():
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=1, max_wait=0.01)
+    limiter.acquire()
+    limiter.acquire()
+    with pytest.raises(ASRUnavailableError):
+        limiter.acquire()
+    assert limiter.stats()['rejected'] == 1
+
+
+def test_limiter_grows_additively_on_fast_successes(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=4, max_limit=64)
+    for _ in range(4):
+        started = limiter.acquire()
+        clock.now += 0.1
+        limiter.release(started, failed=False)
+    assert limiter.limit == 4
+    # About one full limit's worth of successes adds one slot
+    for _ in range(2):
+        started = limiter.acquire()
+        clock.now += 0.1
+        limiter.release(started, failed=False)
+    assert limiter.limit == 5
+
+
+def test_limiter_halves_once_per_batch_of_failures(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, min_limit=2)
+    in_flight = [limiter.acquire() for _ in range(8)]
+    clock.now += 0.1
+    for started in in_flight:
+        limiter.release(started, failed=True)
+    assert limiter.limit == 8
+    started = limiter.acquire()
+    clock.now += 0.1
+    limiter.release(started, failed=True)
+    assert limiter.limit == 4
+    assert limiter.stats()['decreases'] == 2
+
+
+def test_limiter_treats_slow_calls_as_overload(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=16, latency_tolerance=2.0)
+    started = limiter.acquire()
+    clock.now += 0.1
+    limiter.release(started, failed=False)
+    started = limiter.acquire()
+    clock.now += 1.0
+    limiter.release(started, failed=False)
+    assert limiter.limit == 8
+
+
+def test_limiter_respects_min_limit(clock):
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=2, min_limit=2)
+    started = limiter.acquire()
+    clock.now += 0.1
+    limiter.release(started, failed=True)
+    assert limiter.limit == 2
+
+
+@pytest.mark.parametrize('status_code, failed', [(200, False), (400, False), (429, True), (503, True)])
+def test_guard_classifies_responses(clock, status_code, failed):
+    guard = ASRGuard(CircuitBreaker(min_calls=10), AdaptiveConcurrencyLimiter())
+    assert guard.call(lambda: Response(status_code)).status_code == status_code
+    assert guard.stats()['circuit']['window_failures'] == int(failed)
+    assert guard.stats()['concurrency']['in_flight'] == 0
+
+
+def test_guard_counts_exceptions_and_fails_fast(clock):
+    guard = ASRGuard(CircuitBreaker(min_calls=2), AdaptiveConcurrencyLimiter())
+
+    def timeout():
+        raise TimeoutError('read timeout')
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            guard.call(timeout)
+    sent = []
+    with pytest.raises(ASRUnavailableError):
+        guard.call(lambda: sent.append(1))
+    assert sent == []
+
+
+def test_guard_returns_probe_when_limiter_refuses(clock):
+    breaker = CircuitBreaker(min_calls=1, open_seconds=1, probe_calls=1)
+    limiter = AdaptiveConcurrencyLimiter(initial_limit=1, min_limit=1, max_wait=0)
+    guard = ASRGuard(breaker, limiter)
+    breaker.record(True)
+    clock.now += 1
+    limiter.acquire()
+    with pytest.raises(ASRUnavailableError):
+        guard.call(lambda: Response(200))
+    assert breaker.before_call() is True
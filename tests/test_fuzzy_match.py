@@ -0,0 +1,127 @@
+import random
+
+import pytest
+
+from fuzzy_match import BKTree, CropIndex, levenshtein, phonetic_key, score_transcript, substring_distance
+
+
+def naive_levenshtein(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def naive_substring_distance(pattern, text):
+    return min(naive_levenshtein(pattern, text[start:end])
+               for start in range(len(text) + 1) for end in range(start, len(text) + 1))
+
+
+def random_word(rng, alphabet='abcdक', max_length=12):
+    return ''.join(rng.choice(alphabet) for _ in range(rng.randint(0, max_length)))
+
+
+@pytest.mark.parametrize('a, b, expected', [
+    ('', '', 0),
+    ('', 'abc', 3),
+    ('kitten', 'sitting', 3),
+    ('चावल', 'चावाल', 1),
+    (['basmati', 'rice'], ['rice'], 1),
+])
+def test_levenshtein_known_values(a, b, expected):
+    assert levenshtein(a, b) == expected
+    assert levenshtein(b, a) == expected
+
+
+def test_levenshtein_matches_dynamic_programming():
+    rng = random.Random(3)
+    for _ in range(500):
+        a, b = random_word(rng), random_word(rng)
+        assert levenshtein(a, b) == naive_levenshtein(a, b), (a, b)
+
+
+def test_levenshtein_long_pattern():
+    # Patterns longer than a machine word exercise Python's unbounded int bit vectors
+    rng = random.Random(5)
+    a, b = random_word(rng, max_length=150), random_word(rng, max_length=150)
+    assert levenshtein(a, b) == naive_levenshtein(a, b)
+
+
+def test_levenshtein_max_distance_caps_result():
+    assert levenshtein('kitten', 'sitting', max_distance=2) == 3
+    assert levenshtein('kitten', 'sitting', max_distance=3) == 3
+    assert levenshtein('a', 'abcdef', max_distance=1) == 2
+
+
+def test_substring_distance_matches_brute_force():
+    rng = random.Random(11)
+    for _ in range(200):
+        pattern, text = random_word(rng, max_length=5), random_word(rng, max_length=10)
+        assert substring_distance(pattern, text) == naive_substring_distance(pattern, text), (pattern, text)
+
+
+def test_substring_distance_exact_occurrence_is_zero():
+    assert substring_distance('धान', 'मैंने धान बोया') == 0
+    assert substring_distance('', 'anything') == 0
+
+
+def test_phonetic_key_folds_scripts_and_aspiration():
+    assert phonetic_key('चावल') == 'CBL'
+    # Gurmukhi and Gujarati spellings of the same word share the Devanagari key
+    assert phonetic_key('ਚਾਵਲ') == phonetic_key('ચાવલ') == 'CBL'
+    assert phonetic_key('खीरा') == phonetic_key('कीरा')
+
+
+def test_bk_tree_search_and_nearest_match_brute_force():
+    rng = random.Random(17)
+    words = list({random_word(rng, 'abcde', 8) for _ in range(300)})
+    tree = BKTree(words + words[:10])
+    assert len(tree) == len(words)
+    for _ in range(50):
+        query = random_word(rng, 'abcde', 8)
+        expected = sorted((levenshtein(query, word), word) for word in words if levenshtein(query, word) <= 2)
+        assert tree.search(query, 2) == expected
+        assert tree.nearest(query) == min((levenshtein(query, word), word) for word in words)
+
+
+def test_bk_tree_empty_and_out_of_radius():
+    assert BKTree().nearest('abc') is None
+    assert BKTree().search('abc', 3) == []
+    assert BKTree(['zzzzzz']).nearest('a', max_distance=2) is None
+
+
+@pytest.fixture
+def index():
+    return CropIndex(['गेहूं', 'चावल', 'धान', 'मक्का', 'बासमती चावल'])
+
+
+def test_crop_index_nearest_over_word_windows(index):
+    assert index.nearest('मैंने चावाल बोया') == ('चावल', 1, 'चावाल')
+    assert index.nearest('बासमती चावल') == ('बासमती चावल', 0, 'बासमती चावल')
+    assert index.nearest('') is None
+
+
+def test_score_transcript_exact_hit(index):
+    score = score_transcript('मैंने चावल बोया', 'चावल', index=index)
+    assert score['best_match'] == 'चावल'
+    assert score['crop_cer'] == 0.0
+    assert score['confusion_candidate'] is None
+
+
+def test_score_transcript_reports_confusion(index):
+    score = score_transcript('मैंने धान बोया', 'चावल', index=index)
+    assert score['best_match'] == 'धान'
+    assert score['distance'] == 0
+    assert score['crop_cer'] == 0.75
+    assert score['confusion_candidate'] == 'धान'
+
+
+def test_score_transcript_without_index():
+    score = score_transcript('चावाल', 'चावल')
+    assert score['best_match'] == 'चावल'
+    assert score['distance'] == 1
+    assert score['crop_cer'] == 0.25
+    assert score['confusion_candidate'] is None
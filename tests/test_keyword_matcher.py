@@ -0,0 +1,84 @@
+import random
+
+import pytest
+
+from keyword_matcher import KeywordMatch, KeywordMatcher, compile_matcher, default_normalize
+
+CROPS = ['गेहूं', 'चावल', 'धान', 'बासमती चावल', 'wheat', 'sweet corn', 'corn']
+
+
+def naive_detected(crops, transcript):
+    # The rule check_keyword_match applied before the automaton: whole name, or every word of it
+    text = default_normalize(transcript)
+    detected = set()
+    for crop in crops:
+        name = default_normalize(crop)
+        if not name:
+            continue
+        words = name.split()
+        if name in text or (len(words) > 1 and all(word in text for word in words)):
+            detected.add(crop)
+    return detected
+
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(CROPS)
+
+
+def test_finds_exact_mentions_in_order(matcher):
+    matches = matcher.find_all('मैंने धान और गेहूं बोया')
+    assert [match.crop_name for match in matches] == ['धान', 'गेहूं']
+    assert all(match.exact for match in matches)
+    text = default_normalize('मैंने धान और गेहूं बोया')
+    assert [text[match.start:match.end] for match in matches] == ['धान', 'गेहूं']
+
+
+def test_multi_word_crop_detected_from_separate_words(matcher):
+    matches = {match.crop_name: match for match in matcher.find_all('corn that is sweet')}
+    assert matches['sweet corn'] == KeywordMatch('sweet corn', 0, len('corn that is sweet'), False)
+    assert matches['corn'].exact
+
+
+def test_overlapping_patterns_all_reported(matcher):
+    assert matcher.detected('बासमती चावल') == {'बासमती चावल', 'चावल'}
+
+
+def test_normalization_variants_match(matcher):
+    # Chandrabindu for anusvara and a stray zero-width joiner
+    assert matcher.matches('गेहूँ', 'गेहूं')
+    assert matcher.matches('गे‍हूं', 'गेहूं')
+    assert matcher.matches('WHEAT!', 'wheat')
+
+
+def test_matches_crop_outside_vocabulary(matcher):
+    assert matcher.matches('some barley here', 'barley')
+    assert not matcher.matches('some wheat here', 'barley')
+    assert matcher.matches('anything', '')
+
+
+def test_no_match_and_empty_transcript(matcher):
+    assert matcher.find_all('') == []
+    assert matcher.detected('nothing to see') == set()
+
+
+def test_duplicate_and_empty_names_ignored():
+    matcher = KeywordMatcher(['wheat', 'wheat', '', '  '])
+    assert matcher.crop_names == ['wheat']
+
+
+def test_find_all_many_matches_find_all(matcher):
+    transcripts = ['धान', 'sweet corn', '', 'corn sweet wheat', 'बासमती']
+    assert matcher.find_all_many(transcripts) == [matcher.find_all(text) for text in transcripts]
+
+
+def test_compile_matcher_is_cached():
+    assert compile_matcher(('wheat', 'corn')) is compile_matcher(('wheat', 'corn'))
+
+
+def test_agrees_with_naive_rule_on_random_transcripts(matcher):
+    rng = random.Random(7)
+    words = ['गेहूं', 'चावल', 'धान', 'बासमती', 'wheat', 'sweet', 'corn', 'और', 'the', 'swe', 'हूं']
+    for _ in range(500):
+        transcript = ' '.join(rng.choice(words) for _ in range(rng.randint(0, 6)))
+        assert matcher.detected(transcript) == naive_detected(CROPS, transcript), transcript
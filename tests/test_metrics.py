@@ -0,0 +1,102 @@
+import random
+
+import pytest
+
+from metrics import (aggregate_error_rates, combine_error_rates, edit_distances, error_rates, np, score_attempt,
+                     score_pairs, score_results)
+
+requires_numpy = pytest.mark.skipif(np is None, reason='numpy not installed')
+
+
+def random_texts(rng, count):
+    words = ['गेहूं', 'चावल', 'धान', 'wheat', 'rice', 'और', 'a', '']
+    return [' '.join(rng.choice(words) for _ in range(rng.randint(0, 5))).strip() for _ in range(count)]
+
+
+def test_edit_distances_known_values():
+    assert edit_distances(['kitten', 'abc', ''], ['sitting', 'abc', 'xy']) == [3, 0, 2]
+    assert edit_distances(['basmati rice', 'wheat'], ['rice', 'wheat flour'], unit='word') == [1, 1]
+
+
+def test_edit_distances_rejects_bad_input():
+    with pytest.raises(ValueError):
+        edit_distances(['a'], [])
+    with pytest.raises(ValueError):
+        edit_distances(['a'], ['b'], unit='phoneme')
+    with pytest.raises(ValueError):
+        edit_distances(['a'], ['b'], backend='cuda')
+    assert edit_distances([], []) == []
+
+
+@requires_numpy
+@pytest.mark.parametrize('unit', ['char', 'word'])
+def test_numpy_backend_matches_python(unit):
+    rng = random.Random(13)
+    references, hypotheses = random_texts(rng, 300), random_texts(rng, 300)
+    assert (list(edit_distances(references, hypotheses, unit, backend='numpy')) ==
+            edit_distances(references, hypotheses, unit, backend='python'))
+
+
+def test_error_rates_are_corpus_level():
+    rates = error_rates(['गेहूं', 'बासमती चावल'], ['गेहूं', 'चावल'], backend='python')
+    assert rates['count'] == 2
+    assert (rates['word_errors'], rates['reference_words']) == (1, 3)
+    assert rates['wer'] == round(1 / 3, 4)
+    assert rates['cer'] == round(rates['char_errors'] / rates['reference_chars'], 4)
+
+
+def test_score_pairs_normalizes_punctuation_and_numerals():
+    score = score_pairs(['गेहूं 5'], ['गेहूँ, ५।'], backend='python')[0]
+    assert score['word_errors'] == 0
+    assert score['char_errors'] == 0
+
+
+def test_empty_reference_has_no_rate():
+    score = score_pairs([''], ['anything'], backend='python')[0]
+    assert score['wer'] is None and score['cer'] is None
+
+
+def test_score_attempt_skips_missing_transcript_or_reference():
+    assert score_attempt({'reference': 'मैंने गेहूं', 'transcript': ''})['count'] == 0
+    counts = score_attempt({'reference': 'मैंने गेहूं बोया', 'transcript': 'मैंने गेहूं'})
+    assert counts == {'count': 1, 'word_errors': 1, 'reference_words': 3,
+                      'char_errors': counts['char_errors'], 'reference_chars': len('मैंने गेहूं बोया')}
+
+
+def test_crop_name_is_not_a_reference():
+    # A correct free-form sentence around the keyword must not score as a 500% WER
+    result = {'crop_name': 'गेहूं', 'transcript': 'मैंने अपने खेत में गेहूं लगाया'}
+    assert score_attempt(result)['count'] == 0
+    assert score_results([result])[0]['wer'] is None
+    assert aggregate_error_rates([result])['overall']['wer'] is None
+
+
+def test_combined_attempt_counts_equal_error_rates():
+    rng = random.Random(23)
+    results = [{'reference': reference, 'transcript': transcript}
+               for reference, transcript in zip(random_texts(rng, 100), random_texts(rng, 100))
+               if reference and transcript]
+    combined = combine_error_rates(score_attempt(result) for result in results)
+    expected = error_rates([result['reference'] for result in results],
+                           [result['transcript'] for result in results], backend='python')
+    assert combined == expected
+
+
+def test_score_results_uses_reference():
+    scored = score_results([{'crop_name': 'धान', 'reference': 'चावल', 'transcript': 'चावल'}], backend='python')
+    assert scored[0]['wer'] == 0.0
+
+
+def test_aggregate_error_rates_groups():
+    results = [
+        {'language': 'hindi', 'reference': 'गेहूं', 'transcript': 'गेहूं'},
+        {'language': 'hindi', 'reference': 'धान', 'transcript': 'चावल'},
+        {'reference': 'wheat', 'transcript': 'wheat'},
+        {'language': 'odia', 'crop_name': 'धान', 'transcript': 'धान'},
+    ]
+    report = aggregate_error_rates(results, backend='python')
+    assert report['overall']['count'] == 3
+    assert 'odia' not in report['groups']
+    assert report['groups']['hindi']['wer'] == 0.5
+    assert report['groups']['unknown']['wer'] == 0.0
+    assert aggregate_error_rates(results, group_by=None, backend='python')['groups'] == {}
@@ -0,0 +1,176 @@
+import time
+import sqlite3
+
+import pytest
+
+import result_writer
+from result_writer import ResultWriteBehind
+
+
+class Uploads:
+    def __init__(self):
+        self.calls = []
+        self.failing = set()
+
+    def __call__(self, test_results, user_email, language, session_id):
+        if session_id in self.failing:
+            raise ConnectionError(f'blob for {session_id} unavailable')
+        self.calls.append((session_id, [result['n'] for result in test_results]))
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(result_writer.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def uploads():
+    return Uploads()
+
+
+@pytest.fixture
+def writer(tmp_path, uploads, clock):
+    return ResultWriteBehind(str(tmp_path / 'journal.db'), uploads, batch_size=10,
+                             retry_backoff=5.0, max_retry_backoff=60.0)
+
+
+def enqueue(writer, session_id, *numbers):
+    for n in numbers:
+        writer.enqueue({'n': n}, 'qa@example.com', 'hindi', session_id)
+
+
+def test_flush_groups_rows_per_session_in_order(writer, uploads):
+    enqueue(writer, 's1', 1, 2)
+    enqueue(writer, 's2', 3)
+    enqueue(writer, 's1', 4)
+    assert writer.depth() == 4
+    assert writer.flush() == 4
+    assert sorted(uploads.calls) == [('s1', [1, 2, 4]), ('s2', [3])]
+    assert writer.depth() == 0
+    assert writer.flush() == 0
+
+
+def test_flush_claims_at_most_one_batch(writer, uploads):
+    enqueue(writer, 's1', *range(25))
+    assert writer.flush() == 10
+    assert writer.flush() == 10
+    assert writer.flush() == 5
+    assert [n for _, numbers in uploads.calls for n in numbers] == list(range(25))
+
+
+def test_full_batch_wakes_the_flusher(writer):
+    enqueue(writer, 's1', *range(9))
+    assert not writer._wakeup.is_set()
+    enqueue(writer, 's1', 9)
+    assert writer._wakeup.is_set()
+
+
+def test_failed_session_backs_off_without_blocking_others(writer, uploads, clock):
+    uploads.failing.add('bad')
+    enqueue(writer, 'bad', 1, 2)
+    enqueue(writer, 'good', 3)
+    assert writer.flush() == 1
+    stats = writer.stats()
+    assert stats['queue_depth'] == 2
+    assert stats['retrying'] == 2
+    assert stats['failed_flushes'] == 1
+
+    # Newer rows of the failing session wait with it; other sessions keep flowing
+    enqueue(writer, 'bad', 4)
+    enqueue(writer, 'good', 5)
+    assert writer.flush() == 1
+    assert uploads.calls == [('good', [3]), ('good', [5])]
+
+    clock.now += 5
+    uploads.failing.clear()
+    assert writer.flush() == 3
+    assert uploads.calls[-1] == ('bad', [1, 2, 4])
+    assert writer.stats()['retrying'] == 0
+
+
+def test_backoff_doubles_up_to_the_cap(writer, uploads, clock):
+    uploads.failing.add('bad')
+    enqueue(writer, 'bad', 1)
+    delays = []
+    for _ in range(6):
+        failed_at = clock.now
+        writer.flush()
+        next_attempt_at = writer._conn.execute('SELECT next_attempt_at FROM pending_results').fetchone()[0]
+        delays.append(next_attempt_at - failed_at)
+        clock.now = next_attempt_at
+    assert delays == [5.0, 10.0, 20.0, 40.0, 60.0, 60.0]
+
+
+def test_claimed_rows_wait_for_the_lease(tmp_path, uploads, clock):
+    path = str(tmp_path / 'journal.db')
+    first = ResultWriteBehind(path, uploads, lease_seconds=60)
+    second = ResultWriteBehind(path, uploads, lease_seconds=60)
+    enqueue(first, 's1', 1)
+    assert len(first._claim_batch()) == 1
+    assert second.flush() == 0
+    clock.now += 61
+    assert second.flush() == 1
+
+
+def test_lease_is_renewed_while_uploading(tmp_path, clock):
+    path = str(tmp_path / 'journal.db')
+    claimed_by_second = []
+
+    def slow_upload(test_results, user_email, language, session_id):
+        # The upload outlasts the lease; the renewal keeps the other process out
+        clock.now += 61
+        time.sleep(0.2)
+        claimed_by_second.extend(second._claim_batch())
+
+    first = ResultWriteBehind(path, slow_upload, lease_seconds=0.15)
+    second = ResultWriteBehind(path, Uploads(), lease_seconds=60)
+    enqueue(first, 's1', 1, 2)
+    assert first.flush() == 2
+    assert claimed_by_second == []
+    assert first.depth() == 0
+
+
+def test_rows_survive_a_restart(tmp_path, uploads, clock):
+    path = str(tmp_path / 'journal.db')
+    enqueue(ResultWriteBehind(path, uploads), 's1', 1, 2)
+    restarted = ResultWriteBehind(path, uploads)
+    assert restarted.depth() == 2
+    assert restarted.flush() == 2
+    assert uploads.calls == [('s1', [1, 2])]
+
+
+def test_migrates_journal_without_retry_columns(tmp_path, uploads, clock):
+    path = str(tmp_path / 'journal.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE pending_results (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, user_email TEXT NOT NULL, language TEXT NOT NULL,
+            session_id TEXT NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL,
+            claimed_by TEXT, claimed_at REAL
+        )
+    ''')
+    conn.execute("INSERT INTO pending_results (user_email, language, session_id, payload, created_at) "
+                 "VALUES ('qa@example.com', 'hindi', 's1', '{\"n\": 1}', 0)")
+    conn.commit()
+    conn.close()
+    assert ResultWriteBehind(path, uploads).flush() == 1
+    assert uploads.calls == [('s1', [1])]
+
+
+def test_background_flusher_drains_on_stop(writer, uploads):
+    writer.flush_interval = 60
+    writer.start()
+    enqueue(writer, 's1', 1, 2, 3)
+    writer.stop()
+    assert uploads.calls == [('s1', [1, 2, 3])]
+    assert writer.depth() == 0
@@ -0,0 +1,169 @@
+import sqlite3
+
+import pytest
+
+from results_store import SCHEMA_VERSION, ResultsStore
+
+LEGACY_SCHEMA = '''
+CREATE TABLE qa_users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    email TEXT UNIQUE,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    login_count INTEGER DEFAULT 1
+);
+CREATE TABLE test_sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    qa_user_id INTEGER,
+    language TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE test_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id INTEGER,
+    crop_name TEXT NOT NULL,
+    total_attempts INTEGER DEFAULT 5,
+    correct_attempts INTEGER DEFAULT 0,
+    result_ratio TEXT,
+    log_1_sentence TEXT, log_1_keyword_detected BOOLEAN, log_1_audio_file TEXT,
+    log_2_sentence TEXT, log_2_keyword_detected BOOLEAN, log_2_audio_file TEXT,
+    log_3_sentence TEXT, log_3_keyword_detected BOOLEAN, log_3_audio_file TEXT,
+    log_4_sentence TEXT, log_4_keyword_detected BOOLEAN, log_4_audio_file TEXT,
+    log_5_sentence TEXT, log_5_keyword_detected BOOLEAN, log_5_audio_file TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
+'''
+
+
+def attempt(crop_name, n, detected, transcript='', **extra):
+    return dict(crop_name=crop_name, attempt_number=n, keyword_detected=detected,
+                transcript=transcript or crop_name, timestamp='2026-01-02 10:00:00', **extra)
+
+
+def user_version(path):
+    with sqlite3.connect(path) as conn:
+        return conn.execute('PRAGMA user_version').fetchone()[0]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ResultsStore(str(tmp_path / 'results.db'), pool_size=2)
+
+
+def test_legacy_results_migrate_to_attempts_and_aggregates(tmp_path):
+    path = str(tmp_path / 'legacy.db')
+    with sqlite3.connect(path) as conn:
+        conn.executescript(LEGACY_SCHEMA)
+        conn.execute("INSERT INTO qa_users (name, email) VALUES ('QA', 'qa@example.com')")
+        conn.execute("INSERT INTO test_sessions (qa_user_id, language) VALUES (1, 'hindi')")
+        conn.execute('''
+            INSERT INTO test_results (session_id, crop_name, log_1_sentence, log_1_keyword_detected,
+                                      log_2_sentence, log_2_keyword_detected)
+            VALUES (1, 'धान', 'धान बोया', 1, 'दान', 0)
+        ''')
+
+    store = ResultsStore(path, pool_size=2)
+    assert user_version(path) == SCHEMA_VERSION
+    rows = list(store.iter_attempts())
+    assert [(row['crop_name'], row['attempt_number'], row['transcript'], row['keyword_detected'])
+            for row in rows] == [('धान', 1, 'धान बोया', True), ('धान', 2, 'दान', False)]
+    assert rows[0]['user_email'] == 'qa@example.com'
+
+    with store.connection() as conn:
+        crop = conn.execute('SELECT correct_count, total_attempts, bucket, scored_attempts FROM crop_results').fetchone()
+    # No prompted reference text, so nothing is scored
+    assert tuple(crop) == (1, 2, 'poor', 0)
+
+    # Reopening an up-to-date DB is a no-op
+    ResultsStore(path, pool_size=1)
+    assert len(list(store.iter_attempts())) == 2
+
+
+def test_record_attempt_updates_crop_aggregates(store):
+    for n, detected in enumerate([True, False, True, True], 1):
+        store.record_attempt('s1', attempt('धान', n, detected, confusion_candidate='दान'), 'hindi', 'qa@example.com')
+    store.record_attempt('s1', attempt('गेहूं', 1, False, 'मैंने गेहूं बोया', reference='मैंने गेहूं बोया'),
+                         'hindi', 'qa@example.com')
+
+    summaries = store.get_crop_summaries('s1')
+    assert [(crop['crop_name'], crop['result_ratio'], crop['bucket']) for crop in summaries] == [
+        ('धान', '3/4', 'well'), ('गेहूं', '0/1', 'poor')]
+    assert [log['detected'] for log in summaries[0]['logs']] == [True, False, True, True]
+    assert summaries[0]['error_counts']['count'] == 0
+    assert summaries[1]['error_counts'] == {'count': 1, 'word_errors': 0, 'reference_words': 3,
+                                            'char_errors': 0, 'reference_chars': len('मैंने गेहूं बोया')}
+
+    results = store.get_session_results('s1')
+    assert [result['attempt_number'] for result in results] == [1, 2, 3, 4, 1]
+    assert results[-1]['reference'] == 'मैंने गेहूं बोया'
+    assert 'reference' not in results[0]
+
+
+def test_record_attempt_updates_model_totals(store):
+    latencies = [120.0, 480.0, 2600.0, 40000.0]
+    for n, latency in enumerate(latencies, 1):
+        store.record_attempt('s1', attempt('धान', n, True, model_results={
+            'saarika:v2.5': {'transcript': 'धान', 'keyword_detected': n % 2 == 1, 'latency_ms': latency},
+            'saarika:v2': {'error': 'timeout', 'latency_ms': None}
+        }), 'hindi')
+
+    totals = store.get_model_totals('s1')
+    primary = totals['saarika:v2.5']
+    assert (primary['attempts'], primary['detected'], primary['errors']) == (4, 2, 0)
+    assert primary['latency_count'] == 4
+    assert primary['latency_sum_ms'] == sum(latencies)
+    assert primary['latency_max_ms'] == 40000.0
+    assert sum(primary['latency_buckets']) == 4
+    assert primary['latency_buckets'][-1] == 1
+    assert (totals['saarika:v2']['errors'], totals['saarika:v2']['latency_count']) == (4, 0)
+
+
+def test_v6_latency_arrays_are_rebuilt_as_aggregates(tmp_path):
+    path = str(tmp_path / 'results.db')
+    store = ResultsStore(path, pool_size=1)
+    store.record_attempt('s1', attempt('धान', 1, True, model_results={
+        'saarika:v2.5': {'transcript': 'धान', 'keyword_detected': True, 'latency_ms': 300.0}}), 'hindi')
+    expected = store.get_model_totals('s1')
+
+    # Put model_totals back in its v6 shape
+    with sqlite3.connect(path) as conn:
+        conn.executescript('''
+            DROP TABLE model_totals;
+            CREATE TABLE model_totals (session_id INTEGER NOT NULL, model TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0, detected INTEGER NOT NULL DEFAULT 0,
+                errors INTEGER NOT NULL DEFAULT 0, latencies TEXT NOT NULL DEFAULT '[]',
+                PRIMARY KEY (session_id, model));
+            INSERT INTO model_totals VALUES (1, 'saarika:v2.5', 1, 1, 0, '[300.0]');
+            PRAGMA user_version = 6;
+        ''')
+
+    migrated = ResultsStore(path, pool_size=1)
+    assert user_version(path) == SCHEMA_VERSION
+    assert migrated.get_model_totals('s1') == expected
+
+
+def test_get_session_info(store):
+    store.upsert_user('QA@example.com', 'QA Tester')
+    store.record_attempt('s1', attempt('धान', 1, True), 'odia', 'QA@example.com')
+    store.record_attempt('s2', attempt('धान', 1, True), 'hindi')
+    assert store.get_session_info('s1') == {'user_email': 'QA@example.com', 'qa_name': 'QA Tester',
+                                            'language': 'odia'}
+    assert store.get_session_info('s2') == {'user_email': '', 'qa_name': '', 'language': 'hindi'}
+    assert store.get_session_info('missing') is None
+
+
+def test_iter_attempts_pages_and_filters(store):
+    for n in range(1, 8):
+        store.record_attempt('a', attempt('धान', n, True), 'hindi', 'a@example.com')
+        store.record_attempt('b', attempt('गेहूं', n, False), 'odia', 'b@example.com')
+
+    by_session = list(store.iter_attempts(batch_size=3))
+    assert [row['session_id'] for row in by_session] == ['a'] * 7 + ['b'] * 7
+    by_id = list(store.iter_attempts(batch_size=3, by_session=False))
+    assert [row['attempt_id'] for row in by_id] == list(range(1, 15))
+
+    assert {row['session_id'] for row in store.iter_attempts(user_email='b@example.com')} == {'b'}
+    assert {row['session_id'] for row in store.iter_attempts(language='hindi', batch_size=2)} == {'a'}
+    assert [row['attempt_number'] for row in store.iter_attempts(session_keys=['b'], batch_size=4)] == list(range(1, 8))
+    assert [row['attempt_id'] for row in store.iter_attempts(after_id=10, by_session=False)] == [11, 12, 13, 14]
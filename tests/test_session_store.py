@@ -0,0 +1,105 @@
+import pytest
+from flask import Flask, session
+
+import session_store
+from session_store import ServerSideSessionInterface, SQLiteSessionStore
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(session_store.time, 'time', clock)
+    return clock
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    return SQLiteSessionStore(str(tmp_path / 'sessions.db'), cleanup_interval=60)
+
+
+def test_round_trip_keeps_tagged_types(store):
+    data = {'user': {'email': 'qa@example.com'}, 'crops': ('धान', 'गेहूं'), 'raw': b'\x00\x01'}
+    store.save('sid1', data, ttl=3600)
+    assert store.load('sid1') == data
+    assert store.load('missing') is None
+    store.delete('sid1')
+    assert store.load('sid1') is None
+
+
+def test_expired_sessions_are_not_loaded_and_get_swept(store, clock):
+    store.save('old', {'n': 1}, ttl=10)
+    clock.now += 11
+    assert store.load('old') is None
+
+    # The next save past the cleanup interval deletes expired rows
+    clock.now += 60
+    store.save('new', {'n': 2}, ttl=10)
+    rows = store._connection().execute('SELECT sid FROM flask_sessions').fetchall()
+    assert rows == [('new',)]
+
+
+def test_save_extends_expiry(store, clock):
+    store.save('sid', {'n': 1}, ttl=10)
+    clock.now += 8
+    store.save('sid', {'n': 2}, ttl=10)
+    clock.now += 8
+    assert store.load('sid') == {'n': 2}
+
+
+@pytest.fixture
+def app(store):
+    app = Flask(__name__)
+    app.secret_key = 'test-secret'
+    app.session_interface = ServerSideSessionInterface(store)
+
+    @app.route('/set/<value>')
+    def set_value(value):
+        session['value'] = value
+        return 'ok'
+
+    @app.route('/get')
+    def get_value():
+        return session.get('value', '')
+
+    @app.route('/clear')
+    def clear():
+        session.clear()
+        return 'ok'
+
+    return app
+
+
+def test_cookie_carries_only_a_signed_id(app, store):
+    client = app.test_client()
+    client.get('/set/' + 'x' * 5000)
+    cookie = client.get_cookie('session')
+    assert len(cookie.value) < 100
+    assert client.get('/get').get_data(as_text=True) == 'x' * 5000
+
+    sid = cookie.value.rsplit('.', 1)[0]
+    assert store.load(sid) == {'value': 'x' * 5000}
+
+
+def test_tampered_cookie_starts_a_new_session(app):
+    client = app.test_client()
+    client.get('/set/secret')
+    sid = client.get_cookie('session').value.rsplit('.', 1)[0]
+    client.set_cookie('session', sid + '.forged')
+    assert client.get('/get').get_data(as_text=True) == ''
+
+
+def test_clearing_the_session_deletes_it(app, store):
+    client = app.test_client()
+    client.get('/set/1')
+    sid = client.get_cookie('session').value.rsplit('.', 1)[0]
+    client.get('/clear')
+    assert store.load(sid) is None
+    assert client.get_cookie('session') is None
@@ -0,0 +1,60 @@
+import threading
+import time
+
+from singleton import process_singleton
+
+
+def test_factory_runs_once_across_threads():
+    calls = []
+
+    @process_singleton
+    def get_thing():
+        calls.append(1)
+        time.sleep(0.01)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_thing())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_none_result_is_not_retried():
+    calls = []
+
+    @process_singleton
+    def get_optional():
+        calls.append(1)
+        return None
+
+    assert get_optional() is None
+    assert get_optional() is None
+    assert len(calls) == 1
+
+
+def test_peek_and_reset():
+    @process_singleton
+    def get_thing():
+        return object()
+
+    assert get_thing.peek() is None
+    first = get_thing()
+    assert get_thing.peek() is first
+    get_thing.reset()
+    assert get_thing.peek() is None
+    assert get_thing() is not first
+
+
+def test_one_instance_per_argument():
+    @process_singleton
+    def get_client(url):
+        return [url]
+
+    assert get_client('a') is get_client('a')
+    assert get_client('a') is not get_client('b')
+    assert get_client.peek('c') is None
+    assert get_client.peek('b') == ['b']
@@ -0,0 +1,99 @@
+import json
+
+import pytest
+
+import transcription_cache
+from transcription_cache import TranscriptionCache, cache_key
+
+
+class FakeTime:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(transcription_cache.time, 'time', clock)
+    return clock
+
+
+def response(text, padding=0):
+    return {'transcript': text, 'padding': 'x' * padding}
+
+
+def size_of(value):
+    return len(json.dumps(value, ensure_ascii=False).encode('utf-8'))
+
+
+def test_cache_key_covers_audio_language_and_model():
+    key = cache_key(b'audio', 'hi-IN', 'saarika:v2')
+    assert key == cache_key(b'audio', 'hi-IN', 'saarika:v2')
+    assert len({key, cache_key(b'audio2', 'hi-IN', 'saarika:v2'), cache_key(b'audio', 'od-IN', 'saarika:v2'),
+                cache_key(b'audio', 'hi-IN', 'saarika:v1')}) == 4
+    # The separator keeps the fields from running into each other
+    assert cache_key(b'a', 'b', 'c') != cache_key(b'a', 'bc', '')
+
+
+def test_put_then_get(tmp_path, clock):
+    cache = TranscriptionCache(str(tmp_path / 'cache.db'))
+    assert cache.get('k') is None
+    cache.put('k', 'hi-IN', 'saarika:v2', {'transcript': 'गेहूं'})
+    assert cache.get('k') == {'transcript': 'गेहूं'}
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['stores'], stats['entries']) == (1, 1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_expired_entries_miss_and_are_removed(tmp_path, clock):
+    cache = TranscriptionCache(str(tmp_path / 'cache.db'), ttl=60)
+    cache.put('k', 'hi-IN', 'saarika:v2', response('old'))
+    clock.now += 61
+    assert cache.get('k') is None
+    stats = cache.stats()
+    assert (stats['expired'], stats['entries'], stats['bytes']) == (1, 0, 0)
+
+
+def test_replacing_an_entry_does_not_double_count_bytes(tmp_path, clock):
+    cache = TranscriptionCache(str(tmp_path / 'cache.db'))
+    cache.put('k', 'hi-IN', 'saarika:v2', response('a', 100))
+    cache.put('k', 'hi-IN', 'saarika:v2', response('b', 10))
+    assert cache.stats()['bytes'] == size_of(response('b', 10))
+
+
+def test_evicts_least_recently_used_past_the_cap(tmp_path, clock):
+    entry_size = size_of(response('0', 100))
+    cache = TranscriptionCache(str(tmp_path / 'cache.db'), max_bytes=entry_size * 4)
+    for n in range(4):
+        cache.put(str(n), 'hi-IN', 'saarika:v2', response(str(n), 100))
+        clock.now += 1
+    # Touch the oldest entry so the second oldest becomes the LRU victim
+    assert cache.get('0') is not None
+    clock.now += 1
+    cache.put('4', 'hi-IN', 'saarika:v2', response('4', 100))
+
+    # Evicts down to 90% of the cap: two entries go
+    assert cache.get('1') is None
+    assert cache.get('2') is None
+    assert cache.get('0') is not None
+    assert cache.get('4') is not None
+    stats = cache.stats()
+    assert stats['evictions'] == 2
+    assert stats['bytes'] == entry_size * 3 <= cache.max_bytes
+
+
+def test_size_total_survives_reopen(tmp_path, clock):
+    path = str(tmp_path / 'cache.db')
+    TranscriptionCache(path).put('k', 'hi-IN', 'saarika:v2', response('a', 50))
+    reopened = TranscriptionCache(path)
+    assert reopened.stats()['bytes'] == size_of(response('a', 50))
+    assert reopened.get('k') == response('a', 50)
+
+
+def test_record_bypass(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / 'cache.db'))
+    cache.record_bypass()
+    assert cache.stats()['bypasses'] == 1
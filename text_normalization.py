@@ -0,0 +1,119 @@
+"""
+Unicode normalization for Indic transcripts and crop names.
+str.lower() is a no-op for Devanagari, Gurmukhi, Gujarati, Odia and Malayalam,
+so spelling variants the ASR emits (nukta forms, ZWJ/ZWNJ, chandrabindu vs
+anusvara) would otherwise count as misses.
+"""
+
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Iterable
+
+# Zero-width characters that change rendering but not the word (ZWSP, ZWNJ, ZWJ, WJ, BOM)
+ZERO_WIDTH_CHARS = '\u200b\u200c\u200d\u2060\ufeff'
+
+# Nukta signs (Devanagari, Bengali, Gurmukhi, Gujarati, Odia); after NFC most nukta
+# letters are a base consonant plus one of these combining marks
+NUKTA_CHARS = '\u093c\u09bc\u0a3c\u0abc\u0b3c'
+
+# The nukta letters NFC keeps precomposed, mapped to their base consonant
+NUKTA_LETTER_FOLDS = {
+    '\u0929': '\u0928',  # NNNA -> NA
+    '\u0931': '\u0930',  # RRA -> RA
+    '\u0934': '\u0933',  # LLLA -> LLA
+}
+
+# Nasalization marks folded onto the anusvara/bindi of the same script
+NASAL_FOLDS = {
+    '\u0901': '\u0902',  # Devanagari chandrabindu -> anusvara
+    '\u0981': '\u0982',  # Bengali candrabindu -> anusvara
+    '\u0a01': '\u0a02',  # Gurmukhi adak bindi -> bindi
+    '\u0a70': '\u0a02',  # Gurmukhi tippi -> bindi
+    '\u0a81': '\u0a82',  # Gujarati candrabindu -> anusvara
+    '\u0b01': '\u0b02',  # Odia candrabindu -> anusvara
+    '\u0d01': '\u0d02',  # Malayalam candrabindu -> anusvara
+}
+
+# Danda, double danda and common ASCII/Unicode punctuation
+PUNCTUATION_CHARS = '\u0964\u0965' + '!"#$%&\'()*+,-./:;<=>?@[\\]^_`{|}~' + '\u2018\u2019\u201c\u201d\u2013\u2014\u2026'
+
+# Separates texts in a batch; it is never touched by the translation tables
+_BATCH_SEPARATOR = '\x00'
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _build_table(fold_numerals: bool, fold_punctuation: bool) -> dict:
+    table = {ord(char): None for char in ZERO_WIDTH_CHARS + NUKTA_CHARS}
+    table.update({ord(src): dst for src, dst in NUKTA_LETTER_FOLDS.items()})
+    table.update({ord(src): dst for src, dst in NASAL_FOLDS.items()})
+    if fold_numerals:
+        # Every Unicode decimal digit (Devanagari, Gurmukhi, Gujarati, Odia, Malayalam, ...) to ASCII
+        for codepoint in range(0x0900, 0x0e00):
+            char = chr(codepoint)
+            if unicodedata.category(char) == 'Nd':
+                table[codepoint] = str(unicodedata.digit(char))
+    if fold_punctuation:
+        table.update({ord(char): ' ' for char in PUNCTUATION_CHARS})
+    return table
+
+
+_TABLES = {
+    (fold_numerals, fold_punctuation): _build_table(fold_numerals, fold_punctuation)
+    for fold_numerals in (False, True)
+    for fold_punctuation in (False, True)
+}
+
+
+def normalize_text(text: str, fold_numerals: bool = False, fold_punctuation: bool = False) -> str:
+    """
+    Normalize a transcript or crop name for matching.
+
+    Applies NFC, strips zero-width characters, drops nukta signs, folds
+    chandrabindu/tippi onto anusvara/bindi, lowercases Latin text and collapses
+    whitespace.
+
+    Args:
+        text (str): Text to normalize
+        fold_numerals (bool): Map Indic digits to ASCII digits
+        fold_punctuation (bool): Replace dandas and punctuation with spaces
+
+    Returns:
+        str: Normalized text
+    """
+    text = unicodedata.normalize('NFC', text).translate(_TABLES[fold_numerals, fold_punctuation])
+    return _WHITESPACE_RE.sub(' ', text.lower()).strip()
+
+
+def normalize_batch(texts: Iterable[str], fold_numerals: bool = False,
+                    fold_punctuation: bool = False) -> list:
+    """
+    Normalize many transcripts in one pass.
+
+    The texts are joined into a single string so NFC, the translation table,
+    lowercasing and whitespace collapsing each run once over the whole batch
+    instead of once per transcript.
+
+    Returns:
+        list: Normalized texts, in input order
+    """
+    texts = [text.replace(_BATCH_SEPARATOR, ' ') for text in texts]
+    if not texts:
+        return []
+    joined = normalize_text(_BATCH_SEPARATOR.join(texts), fold_numerals, fold_punctuation)
+    return [part.strip() for part in joined.split(_BATCH_SEPARATOR)]
+
+
+@lru_cache(maxsize=256)
+def normalize_vocabulary(crop_names: tuple, fold_numerals: bool = False,
+                         fold_punctuation: bool = False) -> tuple:
+    """
+    Normalize a crop list once and cache the result.
+
+    Args:
+        crop_names (tuple): Crop names; must be hashable
+
+    Returns:
+        tuple: Normalized names, aligned with crop_names
+    """
+    return tuple(normalize_batch(crop_names, fold_numerals, fold_punctuation))
@@ -0,0 +1,247 @@
+"""
+Per-stage timing for the recording hot path.
+Stages are timed with a monotonic clock and folded into fixed-bucket
+histograms labelled by stage, language and model, rendered for Prometheus at
+/metrics. A request-level trace collects the stages of one request, logs a
+breakdown when the request is slow and, when the OpenTelemetry SDK is
+installed and OTEL_EXPORTER_OTLP_ENDPOINT is set, exports it as spans.
+
+Histograms are per process by default, so under gunicorn /metrics only
+shows the worker that served the scrape. Set PROMETHEUS_MULTIPROC_DIR (and
+`pip install prometheus-client`) to record them with prometheus_client's
+multiprocess mode instead, where every worker writes to files in that
+directory and /metrics sums them; gunicorn.conf.py clears the directory at
+startup and marks exited workers dead.
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from typing import Optional
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+TRACING = os.environ.get('TRACING', 'true').lower() == 'true'
+# Requests slower than this log their stage breakdown
+TRACE_SLOW_SECONDS = float(os.environ.get('TRACE_SLOW_SECONDS', 5))
+
+# Upper bounds in seconds; ASR calls sit in the 0.1-10 s range, local stages well below
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+METRIC_NAME = 'asr_stage_duration_seconds'
+METRIC_HELP = 'Time spent in each stage of recording processing'
+
+# Shared by all gunicorn workers; must be set before the workers start
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+
+
+class StageHistograms:
+    """Cumulative latency histograms keyed by (stage, language, model)"""
+
+    def __init__(self, buckets: tuple = STAGE_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, stage: str, seconds: float, language: str = '', model: str = ''):
+        index = bisect.bisect_left(self.buckets, seconds)
+        key = (stage, language, model)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += seconds
+
+    def snapshot(self) -> dict:
+        """(stage, language, model) -> (per-bucket counts, sum); the last count is the +Inf overflow"""
+        with self._lock:
+            return {key: (list(counts), total) for key, (counts, total) in self._series.items()}
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = [
+            f"# HELP {METRIC_NAME} {METRIC_HELP}",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for (stage, language, model), (counts, total) in sorted(self.snapshot().items()):
+            labels = f'stage="{_escape(stage)}",language="{_escape(language)}",model="{_escape(model)}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{{labels}}} {total:.6f}')
+            lines.append(f'{METRIC_NAME}_count{{{labels}}} {cumulative}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MultiProcessHistograms:
+    """
+    Stage histograms recorded with prometheus_client in multiprocess mode, so
+    /metrics reports the sum over all gunicorn workers rather than one worker
+    """
+
+    def __init__(self, buckets: tuple = STAGE_BUCKETS):
+        try:
+            from prometheus_client import CollectorRegistry, Histogram, generate_latest
+            from prometheus_client import multiprocess
+        except ImportError:
+            raise ImportError("PROMETHEUS_MULTIPROC_DIR requires the 'prometheus-client' package "
+                              "(pip install prometheus-client)")
+        self.buckets = buckets
+        self._histogram = Histogram(METRIC_NAME, METRIC_HELP, ['stage', 'language', 'model'], buckets=buckets)
+        self._registry_class = CollectorRegistry
+        self._collector_class = multiprocess.MultiProcessCollector
+        self._generate_latest = generate_latest
+
+    def observe(self, stage: str, seconds: float, language: str = '', model: str = ''):
+        self._histogram.labels(stage, language, model).observe(seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition format, aggregated over every live and exited worker"""
+        registry = self._registry_class()
+        self._collector_class(registry)
+        return self._generate_latest(registry).decode('utf-8')
+
+
+histograms = MultiProcessHistograms() if PROMETHEUS_MULTIPROC_DIR else StageHistograms()
+
+
+class Trace:
+    """
+    Stages of one request.
+
+    Attributes:
+        name (str): Request name, recorded as its own stage when the trace ends
+        labels (dict): language/model defaults for spans inside the trace
+        spans (list): (stage, start offset, seconds) in completion order
+    """
+
+    def __init__(self, name: str, **labels):
+        self.name = name
+        self.labels = labels
+        self.spans = []
+        self.started_ns = time.time_ns()
+        self._started = time.perf_counter()
+
+    def offset(self) -> float:
+        return time.perf_counter() - self._started
+
+    def breakdown(self) -> str:
+        return ', '.join(f"{stage}={seconds * 1000:.0f}ms" for stage, _, seconds in self.spans)
+
+
+_current: contextvars.ContextVar = contextvars.ContextVar('trace', default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def start_trace(name: str, **labels) -> Optional[Trace]:
+    """Begin a request trace in the current context (None if tracing is off)"""
+    if not TRACING:
+        return None
+    trace = Trace(name, **labels)
+    _current.set(trace)
+    return trace
+
+
+def end_trace(trace: Optional[Trace] = None):
+    """Record the request total, log slow requests and export the trace"""
+    trace = trace or _current.get()
+    if trace is None:
+        return
+    _current.set(None)
+    seconds = trace.offset()
+    histograms.observe(trace.name, seconds, trace.labels.get('language', ''), trace.labels.get('model', ''))
+    if seconds >= TRACE_SLOW_SECONDS:
+        logger.warning("Slow %s: %.0fms (%s)", trace.name, seconds * 1000, trace.breakdown())
+    exporter = get_otel_exporter()
+    if exporter is not None:
+        exporter.export(trace, seconds)
+
+
+@contextmanager
+def span(stage: str, language: Optional[str] = None, model: Optional[str] = None):
+    """
+    Time a stage; labels not given are taken from the current trace.
+
+        with span('asr_request', language=language, model=model_name):
+            ...
+    """
+    if not TRACING:
+        yield
+        return
+    trace = _current.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        if trace is not None:
+            language = trace.labels.get('language', '') if language is None else language
+            model = trace.labels.get('model', '') if model is None else model
+            trace.spans.append((stage, started - trace._started, seconds))
+        histograms.observe(stage, seconds, language or '', model or '')
+
+
+class OTelExporter:
+    """Replays finished traces as OpenTelemetry spans (parent request span, child per stage)"""
+
+    def __init__(self, service_name: str):
+        from opentelemetry import trace as otel_trace
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+        provider = TracerProvider(resource=Resource.create({'service.name': service_name}))
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter()))
+        self._otel_trace = otel_trace
+        self._tracer = provider.get_tracer(__name__)
+
+    def export(self, trace: Trace, seconds: float):
+        attributes = {key: value for key, value in trace.labels.items() if value}
+        end_ns = trace.started_ns + int(seconds * 1e9)
+        parent = self._tracer.start_span(trace.name, start_time=trace.started_ns, attributes=attributes)
+        context = self._otel_trace.set_span_in_context(parent)
+        for stage, offset, stage_seconds in trace.spans:
+            start_ns = trace.started_ns + int(offset * 1e9)
+            child = self._tracer.start_span(stage, context=context, start_time=start_ns, attributes=attributes)
+            child.end(end_time=start_ns + int(stage_seconds * 1e9))
+        parent.end(end_time=end_ns)
+
+
+@process_singleton
+def get_otel_exporter() -> Optional[OTelExporter]:
+    """
+    The OpenTelemetry exporter if OTEL_EXPORTER_OTLP_ENDPOINT is set and the
+    opentelemetry-sdk and OTLP/HTTP exporter packages are installed.
+
+    Returns:
+        OTelExporter: Shared exporter, or None
+    """
+    if not os.environ.get('OTEL_EXPORTER_OTLP_ENDPOINT'):
+        return None
+    try:
+        exporter = OTelExporter(os.environ.get('OTEL_SERVICE_NAME', 'asr-testing-platform'))
+    except ImportError:
+        logger.warning("OTEL_EXPORTER_OTLP_ENDPOINT is set but OpenTelemetry is not installed "
+                       "(pip install opentelemetry-sdk opentelemetry-exporter-otlp-proto-http)")
+        return None
+    logger.info("Exporting traces over OTLP")
+    return exporter
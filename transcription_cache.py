@@ -0,0 +1,176 @@
+"""
+Content-addressed cache of ASR responses.
+Entries are keyed by a SHA-256 of the uploaded (normalized) audio bytes plus
+language_code and model name, and kept in a local SQLite file with TTL expiry
+and least-recently-used eviction under a total size cap.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import logging
+import threading
+from typing import Optional
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(audio_data: bytes, language_code: str, model_name: str) -> str:
+    """SHA-256 over the audio bytes, language code and model name"""
+    digest = hashlib.sha256(audio_data)
+    digest.update(b'\x00' + language_code.encode('utf-8') + b'\x00' + model_name.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """
+    On-disk ASR response cache.
+
+    Args:
+        db_path (str): SQLite file
+        ttl (float): Seconds an entry stays valid after it was stored
+        max_bytes (int): Cap on the total size of stored responses; least
+            recently used entries are evicted beyond it
+    """
+
+    def __init__(self, db_path: str = 'transcription_cache.db', ttl: float = 7 * 24 * 3600,
+                 max_bytes: int = 256 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._metrics = {'hits': 0, 'misses': 0, 'bypasses': 0, 'stores': 0, 'evictions': 0, 'expired': 0}
+
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transcriptions (
+                key TEXT PRIMARY KEY,
+                language_code TEXT NOT NULL,
+                model_name TEXT NOT NULL,
+                response TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        ''')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_transcriptions_last_access ON transcriptions (last_access)')
+        self._total_bytes = conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcriptions').fetchone()[0]
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def _count(self, metric: str, amount: int = 1):
+        with self._lock:
+            self._metrics[metric] += amount
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Look up a response, refreshing its LRU position.
+
+        Returns:
+            dict: Cached response, or None on a miss or expired entry
+        """
+        conn = self._connection()
+        row = conn.execute('SELECT response, created_at, size FROM transcriptions WHERE key = ?', (key,)).fetchone()
+        now = time.time()
+        if row is None:
+            self._count('misses')
+            return None
+        response, created_at, size = row
+        if now - created_at > self.ttl:
+            if conn.execute('DELETE FROM transcriptions WHERE key = ?', (key,)).rowcount:
+                with self._lock:
+                    self._total_bytes -= size
+            self._count('expired')
+            self._count('misses')
+            return None
+        conn.execute('UPDATE transcriptions SET last_access = ? WHERE key = ?', (now, key))
+        self._count('hits')
+        return json.loads(response)
+
+    def put(self, key: str, language_code: str, model_name: str, response: dict):
+        """Store a response, evicting least recently used entries past max_bytes"""
+        payload = json.dumps(response, ensure_ascii=False)
+        size = len(payload.encode('utf-8'))
+        now = time.time()
+        conn = self._connection()
+        previous = conn.execute('SELECT size FROM transcriptions WHERE key = ?', (key,)).fetchone()
+        conn.execute(
+            'INSERT OR REPLACE INTO transcriptions (key, language_code, model_name, response, size, created_at, last_access) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (key, language_code, model_name, payload, size, now, now)
+        )
+        with self._lock:
+            self._metrics['stores'] += 1
+            self._total_bytes += size - (previous[0] if previous else 0)
+            over = self._total_bytes > self.max_bytes
+        if over:
+            self._evict()
+
+    def _evict(self):
+        conn = self._connection()
+        # Expired entries go first, then the least recently used until 90% of the cap
+        expired = conn.execute('DELETE FROM transcriptions WHERE created_at < ?', (time.time() - self.ttl,)).rowcount
+        target = int(self.max_bytes * 0.9)
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM transcriptions').fetchone()[0]
+        evicted = 0
+        if total > target:
+            rows = conn.execute('SELECT key, size FROM transcriptions ORDER BY last_access').fetchall()
+            victims = []
+            for key, size in rows:
+                if total <= target:
+                    break
+                victims.append((key,))
+                total -= size
+            conn.executemany('DELETE FROM transcriptions WHERE key = ?', victims)
+            evicted = len(victims)
+        with self._lock:
+            self._total_bytes = total
+            self._metrics['expired'] += expired
+            self._metrics['evictions'] += evicted
+        logger.info("Transcription cache evicted %s entries (%s expired)", evicted, expired)
+
+    def record_bypass(self):
+        self._count('bypasses')
+
+    def stats(self) -> dict:
+        entries = self._connection().execute('SELECT COUNT(*) FROM transcriptions').fetchone()[0]
+        with self._lock:
+            metrics = dict(self._metrics)
+            metrics['bytes'] = self._total_bytes
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = metrics['hits'] / lookups if lookups else 0.0
+        metrics['entries'] = entries
+        metrics['max_bytes'] = self.max_bytes
+        metrics['ttl'] = self.ttl
+        return metrics
+
+
+@process_singleton
+def get_transcription_cache() -> TranscriptionCache:
+    """
+    Shared transcription cache.
+
+    Configured by TRANSCRIPTION_CACHE_PATH, TRANSCRIPTION_CACHE_TTL (seconds)
+    and TRANSCRIPTION_CACHE_MAX_MB.
+
+    Returns:
+        TranscriptionCache: Shared instance
+    """
+    return TranscriptionCache(
+        os.environ.get('TRANSCRIPTION_CACHE_PATH', 'transcription_cache.db'),
+        ttl=float(os.environ.get('TRANSCRIPTION_CACHE_TTL', 7 * 24 * 3600)),
+        max_bytes=int(float(os.environ.get('TRANSCRIPTION_CACHE_MAX_MB', 256)) * 1024 * 1024)
+    )
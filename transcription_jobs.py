@@ -0,0 +1,287 @@
+"""
+Background job queue for recording transcription.
+Lets /submit_recording hand the ASR round trip to a bounded worker pool and
+return a job ID straight away; the browser polls /job_status for the result.
+Job state is mirrored to a SQLite file so a poll answered by another gunicorn
+worker on the same host still finds the job.
+"""
+
+import os
+import json
+import uuid
+import time
+import sqlite3
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the queue already holds its maximum number of pending jobs"""
+
+
+class TranscriptionJob:
+    """
+    A single queued transcription.
+
+    Attributes:
+        job_id (str): Unique job identifier
+        status (str): One of queued, running, done, failed
+        result (dict): Return value of the job function once done
+        error (str): Error message if the job failed
+        metadata (dict): Caller-supplied context (session ID, crop, attempt)
+    """
+
+    def __init__(self, metadata: Optional[dict] = None):
+        self.job_id = uuid.uuid4().hex
+        self.status = 'queued'
+        self.result = None
+        self.error = None
+        self.metadata = metadata or {}
+        self.created_at = time.time()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in ('done', 'failed')
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes or the timeout elapses"""
+        return self._done.wait(timeout)
+
+    def to_dict(self) -> dict:
+        """Serialize job state for the status endpoint"""
+        data = {
+            'job_id': self.job_id,
+            'status': self.status,
+            'created_at': self.created_at,
+            'finished_at': self.finished_at
+        }
+        if self.status == 'done':
+            data['result'] = self.result
+        elif self.status == 'failed':
+            data['error'] = self.error
+        return data
+
+
+class SQLiteJobStore:
+    """
+    Job state shared between the worker processes of one host.
+
+    Args:
+        db_path (str): Path of the SQLite file
+    """
+
+    def __init__(self, db_path: str = 'transcription_jobs.db'):
+        self.db_path = db_path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS transcription_jobs (
+                job_id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                result TEXT,
+                error TEXT,
+                metadata TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                finished_at REAL
+            )
+        ''')
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, isolation_level=None)
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA busy_timeout=5000')
+            self._local.conn = conn
+        return conn
+
+    def save(self, job: TranscriptionJob):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO transcription_jobs VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (job.job_id, job.status,
+             json.dumps(job.result, ensure_ascii=False) if job.result is not None else None,
+             job.error, json.dumps(job.metadata, ensure_ascii=False), job.created_at, job.finished_at)
+        )
+
+    def load(self, job_id: str) -> Optional[TranscriptionJob]:
+        row = self._connection().execute(
+            'SELECT status, result, error, metadata, created_at, finished_at '
+            'FROM transcription_jobs WHERE job_id = ?', (job_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        job = TranscriptionJob(json.loads(row[3]))
+        job.job_id = job_id
+        job.status, job.error, job.created_at, job.finished_at = row[0], row[2], row[4], row[5]
+        job.result = json.loads(row[1]) if row[1] is not None else None
+        if job.finished:
+            job._done.set()
+        return job
+
+    def purge(self, cutoff: float):
+        self._connection().execute(
+            'DELETE FROM transcription_jobs WHERE finished_at IS NOT NULL AND finished_at < ?', (cutoff,)
+        )
+
+
+class TranscriptionJobQueue:
+    """
+    Bounded worker pool for transcription jobs.
+
+    Args:
+        max_workers (int): Maximum number of concurrent ASR calls
+        max_pending (int): Maximum number of queued plus running jobs
+        job_ttl (float): Seconds to keep finished jobs for polling
+        store (SQLiteJobStore, optional): Shared job state for polls served by other processes
+        poll_interval (float): Seconds between store reads while waiting on another process's job
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 100, job_ttl: float = 3600,
+                 store: Optional[SQLiteJobStore] = None, poll_interval: float = 0.25):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.job_ttl = job_ttl
+        self.store = store
+        self.poll_interval = poll_interval
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='asr-job')
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable, *args, metadata: Optional[dict] = None, **kwargs) -> TranscriptionJob:
+        """
+        Queue fn(*args, **kwargs) on the worker pool.
+
+        Args:
+            fn (callable): Function that performs the transcription and returns a result dict
+            metadata (dict, optional): Context stored on the job
+
+        Returns:
+            TranscriptionJob: The queued job
+
+        Raises:
+            QueueFullError: If max_pending jobs are already in flight
+        """
+        if not self._slots.acquire(blocking=False):
+            raise QueueFullError(f"Transcription queue is full ({self.max_pending} pending jobs)")
+
+        job = TranscriptionJob(metadata)
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job.job_id] = job
+        self._save(job)
+
+        try:
+            self._executor.submit(self._run, job, fn, args, kwargs)
+        except Exception:
+            self._slots.release()
+            with self._lock:
+                self._jobs.pop(job.job_id, None)
+            raise
+        return job
+
+    def _save(self, job: TranscriptionJob):
+        if self.store is None:
+            return
+        try:
+            self.store.save(job)
+        except Exception as e:
+            # Polls on this process still see the job
+            logger.error("Saving job %s to the shared store failed: %s", job.job_id, e)
+
+    def _run(self, job: TranscriptionJob, fn: Callable, args: tuple, kwargs: dict):
+        job.status = 'running'
+        self._save(job)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = 'done'
+        except Exception as e:
+            logger.error("Transcription job %s failed: %s", job.job_id, e)
+            job.error = str(e)
+            job.status = 'failed'
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            self._slots.release()
+            job._done.set()
+
+    def get(self, job_id: str) -> Optional[TranscriptionJob]:
+        """Look up a job by ID, in this process or, failing that, in the shared store"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None and self.store is not None:
+            job = self.store.load(job_id)
+        return job
+
+    def wait(self, job_id: str, timeout: float) -> Optional[TranscriptionJob]:
+        """
+        Wait up to timeout seconds for a job to finish.
+
+        Returns:
+            TranscriptionJob: Latest job state (possibly still queued or running),
+                or None if the job is unknown
+        """
+        job = self.get(job_id)
+        if job is None or job.finished or timeout <= 0:
+            return job
+        with self._lock:
+            local = job_id in self._jobs
+        if local:
+            job.wait(timeout)
+            return job
+        # Running in another process: poll the shared store
+        deadline = time.monotonic() + timeout
+        while not job.finished and time.monotonic() < deadline:
+            time.sleep(min(self.poll_interval, max(deadline - time.monotonic(), 0)))
+            job = self.store.load(job_id) or job
+        return job
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.job_ttl
+        expired = [job_id for job_id, job in self._jobs.items()
+                   if job.finished_at is not None and job.finished_at < cutoff]
+        for job_id in expired:
+            del self._jobs[job_id]
+        if expired and self.store is not None:
+            try:
+                self.store.purge(cutoff)
+            except Exception as e:
+                logger.warning("Purging expired jobs from the shared store failed: %s", e)
+
+    def stats(self) -> dict:
+        """Report queue depth by job status"""
+        with self._lock:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+        counts['max_workers'] = self.max_workers
+        counts['max_pending'] = self.max_pending
+        return counts
+
+
+@process_singleton
+def get_job_queue() -> TranscriptionJobQueue:
+    """
+    Shared job queue for this process's transcription workers.
+
+    Sized from ASR_JOB_WORKERS, ASR_JOB_MAX_PENDING and ASR_JOB_TTL; job state
+    is shared between worker processes through ASR_JOB_DB_PATH.
+
+    Returns:
+        TranscriptionJobQueue: Shared queue instance
+    """
+    return TranscriptionJobQueue(
+        max_workers=int(os.environ.get('ASR_JOB_WORKERS', 4)),
+        max_pending=int(os.environ.get('ASR_JOB_MAX_PENDING', 100)),
+        job_ttl=float(os.environ.get('ASR_JOB_TTL', 3600)),
+        store=SQLiteJobStore(os.environ.get('ASR_JOB_DB_PATH', 'transcription_jobs.db'))
+    )
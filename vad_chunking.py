@@ -0,0 +1,197 @@
+"""
+Voice-activity-based chunking of long recordings.
+Long attempts are cut at the quietest points between words into chunks of at
+most ASR_CHUNK_SECONDS, transcribed concurrently and stitched back together in
+order, so a long recording takes about as long as its slowest chunk.
+"""
+
+import os
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, NamedTuple, Optional
+
+import numpy as np
+
+from audio_processing import OUTPUT_FORMATS, encode_audio
+from circuit_breaker import ASRUnavailableError
+from singleton import process_singleton
+
+logger = logging.getLogger(__name__)
+
+# Recordings longer than this are chunked
+CHUNKING_MIN_SECONDS = float(os.environ.get('ASR_CHUNKING_MIN_SECONDS', 10))
+# Upper bound on a chunk; the backend model is served with 5 s chunks
+MAX_CHUNK_SECONDS = float(os.environ.get('ASR_CHUNK_SECONDS', 5))
+# No cut is placed closer than this to the previous one
+MIN_CHUNK_SECONDS = 1.0
+
+FRAME_SECONDS = 0.03
+
+
+class Chunk(NamedTuple):
+    """
+    One piece of a recording.
+
+    Attributes:
+        index (int): Position in the recording
+        start (int): First sample
+        end (int): Sample after the last one
+    """
+    index: int
+    start: int
+    end: int
+
+
+def frame_levels(samples: np.ndarray, sample_rate: int, frame_seconds: float = FRAME_SECONDS) -> np.ndarray:
+    """RMS level of each frame in dB relative to full scale"""
+    frame = max(int(sample_rate * frame_seconds), 1)
+    frames = len(samples) // frame
+    if not frames:
+        return np.zeros(0)
+    energy = np.mean(samples[:frames * frame].reshape(frames, frame) ** 2, axis=1)
+    return 10 * np.log10(energy + 1e-10)
+
+
+def speech_mask(levels: np.ndarray, margin_db: float = 12.0, hangover_frames: int = 3) -> np.ndarray:
+    """
+    Classify frames as speech when they are margin_db above the noise floor.
+
+    The noise floor is the 10th percentile level; speech runs are extended by
+    hangover_frames so short pauses inside a word do not count as silence.
+    """
+    if not len(levels):
+        return np.zeros(0, dtype=bool)
+    noise_floor = np.percentile(levels, 10)
+    if levels.max() - noise_floor < margin_db:
+        # No dynamic range to tell pauses from speech: treat it all as speech
+        return np.ones(len(levels), dtype=bool)
+    threshold = max(noise_floor + margin_db, levels.max() - 45.0)
+    mask = levels > threshold
+    if hangover_frames and mask.any():
+        # Dilate: a frame is speech if any frame within hangover_frames is
+        kernel = np.ones(2 * hangover_frames + 1, dtype=int)
+        mask = np.convolve(mask.astype(int), kernel, mode='same') > 0
+    return mask
+
+
+def split_on_silence(samples: np.ndarray, sample_rate: int, max_chunk_seconds: float = MAX_CHUNK_SECONDS,
+                     min_chunk_seconds: float = MIN_CHUNK_SECONDS) -> list:
+    """
+    Cut a recording into chunks no longer than max_chunk_seconds.
+
+    Each cut is placed in the middle of the longest pause (or, failing that, at
+    the quietest frame) between min_chunk_seconds and max_chunk_seconds after
+    the previous cut.
+
+    Returns:
+        list: Chunk entries covering the whole recording, in order
+    """
+    frame = max(int(sample_rate * FRAME_SECONDS), 1)
+    levels = frame_levels(samples, sample_rate)
+    max_frames = max(int(max_chunk_seconds / FRAME_SECONDS), 1)
+    min_frames = min(max(int(min_chunk_seconds / FRAME_SECONDS), 1), max_frames)
+    if len(levels) <= max_frames:
+        return [Chunk(0, 0, len(samples))]
+
+    silent = ~speech_mask(levels)
+    # Distance from each silent frame to the nearest speech frame, so cuts land mid-pause
+    run_depth = np.zeros(len(levels))
+    depth = 0
+    for i in range(len(levels)):
+        depth = depth + 1 if silent[i] else 0
+        run_depth[i] = depth
+    depth = 0
+    for i in range(len(levels) - 1, -1, -1):
+        depth = depth + 1 if silent[i] else 0
+        run_depth[i] = min(run_depth[i], depth)
+
+    cuts = []
+    start = 0
+    while len(levels) - start > max_frames:
+        window = slice(start + min_frames, start + max_frames + 1)
+        depths = run_depth[window]
+        # Among equally good cut points take the latest, so chunks stay long and few
+        if depths.max() > 0:
+            cut = window.start + len(depths) - 1 - int(depths[::-1].argmax())
+        else:
+            window_levels = levels[window]
+            quietest = len(depths) - 1 - int(window_levels[::-1].argmin())
+            # No pause at all: cut at a clearly quieter frame, else at the length limit
+            if window_levels[quietest] < np.median(window_levels) - 6.0:
+                cut = window.start + quietest
+            else:
+                cut = window.start + len(depths) - 1
+        cuts.append(cut)
+        start = cut
+
+    boundaries = [0] + [cut * frame for cut in cuts] + [len(samples)]
+    return [Chunk(index, boundaries[index], boundaries[index + 1]) for index in range(len(boundaries) - 1)]
+
+
+@process_singleton
+def get_chunk_executor() -> ThreadPoolExecutor:
+    """
+    Pool for chunk transcription (ASR_CHUNK_WORKERS, default 8).
+
+    Returns:
+        ThreadPoolExecutor: Shared executor
+    """
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get('ASR_CHUNK_WORKERS', 8)),
+        thread_name_prefix='asr-chunk'
+    )
+
+
+def transcribe_chunked(samples: np.ndarray, sample_rate: int, transcribe_fn: Callable,
+                       output_format: str = 'wav', chunks: Optional[list] = None) -> dict:
+    """
+    Transcribe a long recording chunk by chunk, concurrently.
+
+    Args:
+        samples (np.ndarray): Mono float samples
+        sample_rate (int): Sample rate of samples
+        transcribe_fn (callable): transcribe_fn(audio_bytes, filename, content_type) -> dict
+            with a 'transcript', e.g. a partial of transcribe_audio
+        output_format (str): Encoding for the chunk uploads, see audio_processing.OUTPUT_FORMATS
+        chunks (list, optional): Precomputed chunks; split_on_silence by default
+
+    Returns:
+        dict: The first chunk's response fields, with 'transcript' replaced by the
+            stitched transcript and 'segments' listing each chunk's start/end
+            offsets in seconds and its transcript
+    """
+    if chunks is None:
+        chunks = split_on_silence(samples, sample_rate)
+    _, _, filename, content_type = OUTPUT_FORMATS[output_format]
+
+    def run(chunk):
+        data = encode_audio(samples[chunk.start:chunk.end], sample_rate, output_format)
+        return transcribe_fn(data, filename, content_type)
+
+    executor = get_chunk_executor()
+    futures = [executor.submit(run, chunk) for chunk in chunks]
+    responses = []
+    for chunk, future in zip(chunks, futures):
+        try:
+            responses.append(future.result())
+        except ASRUnavailableError:
+            # Refused without reaching the API; keep the type so callers can answer 503
+            for pending in futures:
+                pending.cancel()
+            raise
+        except Exception as e:
+            for pending in futures:
+                pending.cancel()
+            raise Exception(f"Chunk {chunk.index + 1}/{len(chunks)} failed: {str(e)}")
+
+    segments = [{
+        'start': round(chunk.start / float(sample_rate), 3),
+        'end': round(chunk.end / float(sample_rate), 3),
+        'transcript': (response.get('transcript') or '').strip()
+    } for chunk, response in zip(chunks, responses)]
+    logger.info("Transcribed %s chunks of a %.1fs recording", len(chunks), len(samples) / float(sample_rate))
+
+    result = dict(responses[0]) if responses else {}
+    result['transcript'] = ' '.join(segment['transcript'] for segment in segments if segment['transcript'])
+    result['segments'] = segments
+    return result